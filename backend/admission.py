@@ -0,0 +1,202 @@
+"""Admission control for synthesis-backed `play` streams.
+
+Capacity is estimated from the engine's measured real-time factor (RTF,
+inference seconds per second of audio) and its inference slots: one live
+listener needs RTF slot-seconds of synthesis per second, so the node can
+sustain about `slots / RTF * ADMISSION_HEADROOM` live streams. Beyond that
+
+- new live plays wait in a bounded FIFO queue for a stream to finish, and
+  are rejected with a retry-after hint when the queue is full or they time
+  out;
+- downloads are downgraded to the lowest synthesis priority (below render
+  jobs), so they only use what live listeners leave, and new ones are
+  rejected while live plays are queued.
+
+Plays of already rendered chapters need no synthesis and bypass admission.
+Until ADMISSION_MIN_SAMPLES inferences have been timed, everything is
+admitted.
+"""
+import asyncio
+import math
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+
+ADMISSION = os.getenv("ADMISSION", "1") == "1"
+ADMISSION_HEADROOM = float(os.getenv("ADMISSION_HEADROOM", "0.85") or "0.85")
+ADMISSION_QUEUE_MAX = max(0, int(os.getenv("ADMISSION_QUEUE_MAX", "8") or "0"))
+ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "30") or "0")
+ADMISSION_RETRY_AFTER_S = float(os.getenv("ADMISSION_RETRY_AFTER_S", "15") or "15")
+ADMISSION_MIN_SAMPLES = max(1, int(os.getenv("ADMISSION_MIN_SAMPLES", "20") or "1"))
+# Synthesis priority of downloads while the node is saturated.
+DEGRADED_PRIORITY = 0
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after_s: int):
+        super().__init__(f"Server is at synthesis capacity, retry in {retry_after_s}s")
+        self.retry_after_s = retry_after_s
+
+
+class Grant:
+    """An admitted stream. Downloads read their synthesis priority from it
+    (see priority.synthesis_priority): the stream's current priority, or
+    DEGRADED_PRIORITY while the node is saturated."""
+
+    def __init__(self, controller: "AdmissionController", kind: str, stream: Any):
+        self.controller = controller
+        self.kind = kind
+        # Any object with an int `priority` (a MuxStream), read on each use
+        # so priority commands still apply.
+        self.stream = stream
+        self.released = False
+
+    @property
+    def priority(self) -> int:
+        if self.kind == "download" and self.controller.saturated():
+            return DEGRADED_PRIORITY
+        return self.stream.priority
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        measure: Callable[[], Tuple[Optional[float], int, int]],
+        *,
+        enabled: bool = ADMISSION,
+        headroom: float = ADMISSION_HEADROOM,
+        queue_max: int = ADMISSION_QUEUE_MAX,
+        queue_timeout_s: float = ADMISSION_QUEUE_TIMEOUT_S,
+        retry_after_s: float = ADMISSION_RETRY_AFTER_S,
+        min_samples: int = ADMISSION_MIN_SAMPLES,
+    ):
+        # measure() -> (RTF or None, samples behind it, inference slots).
+        self._measure = measure
+        self.enabled = enabled
+        self.headroom = headroom
+        self.queue_max = queue_max
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after_s = retry_after_s
+        self.min_samples = min_samples
+        self.live = 0
+        self.downloads = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+
+    def capacity(self) -> Optional[float]:
+        """Sustainable concurrent live streams, or None while unmeasured."""
+        rtf, samples, slots = self._measure()
+        if not self.enabled or rtf is None or samples < self.min_samples or rtf <= 0:
+            return None
+        return max(1.0, slots / rtf * self.headroom)
+
+    def saturated(self) -> bool:
+        """Whether live streams use (or wait for) all estimated capacity."""
+        cap = self.capacity()
+        return cap is not None and (self.live >= math.floor(cap) or bool(self._waiters))
+
+    async def admit(
+        self, kind: str, stream: Any, on_queued: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Grant:
+        """Admit a "live" or "download" stream, waiting in the live queue if
+        needed. Raises Overloaded with a retry-after hint when shedding."""
+        if kind == "download":
+            if self._waiters:
+                self._reject()
+            return self._grant(kind, stream)
+        self._wake()
+        cap = self.capacity()
+        if cap is None or (not self._waiters and self.live < math.floor(cap)):
+            return self._grant(kind, stream)
+        if len(self._waiters) >= self.queue_max:
+            self._reject()
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._queued += 1
+        admitted = False
+        try:
+            if on_queued is not None:
+                await on_queued(len(self._waiters))
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout_s)
+            admitted = True
+        except asyncio.TimeoutError:
+            self._reject()
+        finally:
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+            elif not admitted:
+                # Woken with a reserved slot but gave up meanwhile: pass it on.
+                self.live -= 1
+                self._wake()
+        # _wake() already counted this stream as live.
+        self._admitted += 1
+        return Grant(self, kind, stream)
+
+    def metrics(self) -> dict:
+        rtf, samples, slots = self._measure()
+        cap = self.capacity()
+        if cap is None:
+            state = "unmeasured" if self.enabled else "disabled"
+        elif self._waiters:
+            state = "overloaded"
+        elif self.live >= math.floor(cap):
+            state = "saturated"
+        else:
+            state = "ok"
+        return {
+            "state": state,
+            "accepting_live": state in ("ok", "unmeasured", "disabled"),
+            "rtf": round(rtf, 3) if rtf is not None else None,
+            "rtf_samples": samples,
+            "inference_slots": slots,
+            "capacity_streams": round(cap, 2) if cap is not None else None,
+            "live_active": self.live,
+            "downloads_active": self.downloads,
+            "downloads_degraded": self.downloads if self.saturated() else 0,
+            "queued_now": len(self._waiters),
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "rejected": self._rejected,
+            "retry_after_s": self._retry_after(),
+        }
+
+    # -- internals -------------------------------------------------------------
+
+    def _grant(self, kind: str, stream: Any) -> Grant:
+        if kind == "live":
+            self.live += 1
+        else:
+            self.downloads += 1
+        self._admitted += 1
+        return Grant(self, kind, stream)
+
+    def _release(self, grant: Grant) -> None:
+        if grant.kind == "live":
+            self.live -= 1
+            self._wake()
+        else:
+            self.downloads -= 1
+
+    def _wake(self) -> None:
+        """Admit queued live streams while there is capacity, reserving their slots."""
+        cap = self.capacity()
+        while self._waiters and (cap is None or self.live < math.floor(cap)):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.live += 1
+                fut.set_result(True)
+
+    def _retry_after(self) -> int:
+        # Roughly one retry interval per queued listener ahead.
+        return int(math.ceil(self.retry_after_s * (1 + len(self._waiters) / max(1, self.queue_max))))
+
+    def _reject(self) -> None:
+        self._rejected += 1
+        raise Overloaded(self._retry_after())
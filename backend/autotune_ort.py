@@ -0,0 +1,202 @@
+"""Benchmark ORT threading settings on this host and save the best one.
+
+The right ORT_INTRA_OP_THREADS / ORT_INTER_OP_THREADS / ORT_ALLOW_SPINNING
+values depend on the core count, on how many inference threads share a
+session (TTS_INFERENCE_THREADS) and on how many uvicorn workers run on the
+box. This tool runs the fixed sentence workload from compare_model_variants.py
+in `--workers` parallel processes for every point of a settings grid,
+measures aggregate throughput and per-sentence real-time factor, and writes
+the winner to models/ort_tuning.json (TTS_ORT_TUNING_FILE), which TTSEngine
+reads at startup. Explicit ORT_* environment variables still override it.
+
+Selection: the configuration with the highest throughput (audio seconds per
+wall second, summed over workers) among those whose p95 per-sentence RTF stays
+under --max-rtf, so live listeners keep up; if none qualifies, the lowest p95.
+
+Usage:
+    python autotune_ort.py --workers 2
+    python autotune_ort.py --intra 1,2,4 --spinning 0 --sessions 1 --dry-run
+"""
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+
+def _default_intra_grid(cpus: int, workers: int) -> list[int]:
+    share = max(1, cpus // max(1, workers))
+    return sorted({1, 2, max(1, share // 2), share} - {0})
+
+
+def _parse_int_list(raw: str) -> list[int]:
+    return [int(x) for x in raw.split(",") if x.strip()]
+
+
+def _bench_worker(config: dict, sentences: list[str], voice: str, repeats: int, barrier, results) -> None:
+    """Run in a child process: build an engine with `config`, then time the workload."""
+    try:
+        _bench(config, sentences, voice, repeats, barrier, results)
+    except Exception as e:
+        # Release the siblings waiting on the barrier and report to the parent.
+        barrier.abort()
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def _bench(config: dict, sentences: list[str], voice: str, repeats: int, barrier, results) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    os.environ["ORT_INTRA_OP_THREADS"] = str(config["intra_op_threads"])
+    os.environ["ORT_INTER_OP_THREADS"] = str(config["inter_op_threads"])
+    os.environ["ORT_ALLOW_SPINNING"] = str(config["allow_spinning"])
+    os.environ["TTS_INFERENCE_THREADS"] = str(config["sessions"])
+    os.environ["TTS_SESSION_RECYCLE_MODE"] = "off"
+    os.environ["TTS_SESSION_STANDBY"] = "0"
+
+    from tts import TTSEngine
+
+    engine = TTSEngine()
+    voices = engine.list_voices()
+    v = voice if voice in voices else (voices[0] if voices else voice)
+    kokoro = engine.kokoro
+    kokoro.create(sentences[0], v, 1.0)  # Warm-up outside the timed region.
+
+    def one(sentence: str) -> tuple[float, float]:
+        t0 = time.perf_counter()
+        audio, sr = kokoro.create(sentence, v, 1.0)
+        return time.perf_counter() - t0, len(audio) / float(sr)
+
+    work = sentences * max(1, repeats)
+    barrier.wait(timeout=600)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config["sessions"]) as pool:
+        timings = list(pool.map(one, work))
+    wall = time.perf_counter() - t0
+    results.put(
+        {
+            "wall_s": wall,
+            "audio_s": sum(a for _, a in timings),
+            "rtfs": [s / a for s, a in timings if a > 0],
+        }
+    )
+
+
+def run_trial(config: dict, workers: int, sentences: list[str], voice: str, repeats: int) -> dict:
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_bench_worker, args=(config, sentences, voice, repeats, barrier, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    outs = []
+    try:
+        for _ in range(workers):
+            outs.append(results.get(timeout=1800))
+    finally:
+        for p in procs:
+            p.join(timeout=30)
+            if p.is_alive():
+                p.kill()
+
+    errors = [o["error"] for o in outs if "error" in o]
+    if errors:
+        raise RuntimeError(f"benchmark worker failed: {errors[0]}")
+    rtfs = sorted(r for o in outs for r in o["rtfs"])
+    p95 = rtfs[min(len(rtfs) - 1, int(round(0.95 * (len(rtfs) - 1))))] if rtfs else float("inf")
+    wall = max(o["wall_s"] for o in outs)
+    return {
+        "config": config,
+        "throughput": sum(o["audio_s"] for o in outs) / wall if wall > 0 else 0.0,
+        "rtf_mean": sum(rtfs) / len(rtfs) if rtfs else float("inf"),
+        "rtf_p95": p95,
+    }
+
+
+def pick_best(trials: list[dict], max_rtf: float) -> dict:
+    ok = [t for t in trials if t["rtf_p95"] <= max_rtf]
+    if ok:
+        return max(ok, key=lambda t: t["throughput"])
+    return min(trials, key=lambda t: t["rtf_p95"])
+
+
+def main(argv: list[str] | None = None) -> int:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes that will share this host")
+    parser.add_argument("--intra", default="", help="intra-op thread counts to try (default: derived from core count)")
+    parser.add_argument("--inter", default="1", help="inter-op thread counts to try")
+    parser.add_argument("--spinning", default="0,1", help="allow_spinning values to try")
+    parser.add_argument("--sessions", default="1,2", help="inference threads per process (TTS_INFERENCE_THREADS)")
+    parser.add_argument("--voice", default="af_bella")
+    parser.add_argument("--repeats", type=int, default=1, help="passes over the sentence set per trial")
+    parser.add_argument("--max-rtf", type=float, default=0.8, help="p95 per-sentence RTF a config must stay under")
+    parser.add_argument("--output", default=None, help="tuning file (default: TTS_ORT_TUNING_FILE or models/ort_tuning.json)")
+    parser.add_argument("--dry-run", action="store_true", help="print the result without writing the file")
+    args = parser.parse_args(argv)
+
+    from compare_model_variants import SENTENCES
+    from tts import ORT_TUNING_FILE
+
+    intra_grid = _parse_int_list(args.intra) if args.intra else _default_intra_grid(cpus, args.workers)
+    grid = [
+        {"intra_op_threads": i, "inter_op_threads": j, "allow_spinning": s, "sessions": n}
+        for i, j, s, n in itertools.product(
+            intra_grid,
+            _parse_int_list(args.inter),
+            _parse_int_list(args.spinning),
+            _parse_int_list(args.sessions),
+        )
+    ]
+    print(f"{cpus} CPUs, {args.workers} worker(s), {len(grid)} configurations")
+
+    trials = []
+    for config in grid:
+        t = run_trial(config, args.workers, SENTENCES, args.voice, args.repeats)
+        trials.append(t)
+        print(
+            f"intra={config['intra_op_threads']:<3} inter={config['inter_op_threads']:<2} "
+            f"spin={config['allow_spinning']} sessions={config['sessions']}  "
+            f"throughput={t['throughput']:.2f}x  rtf_mean={t['rtf_mean']:.3f}  rtf_p95={t['rtf_p95']:.3f}"
+        )
+
+    best = pick_best(trials, args.max_rtf)
+    out = {
+        "config": best["config"],
+        "host": {
+            "cpu_count": cpus,
+            "machine": platform.machine(),
+            "workers": args.workers,
+        },
+        "measured": {
+            "throughput": round(best["throughput"], 3),
+            "rtf_mean": round(best["rtf_mean"], 4),
+            "rtf_p95": round(best["rtf_p95"], 4),
+            "max_rtf": args.max_rtf,
+            "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+    }
+    print("Best:", json.dumps(out["config"]))
+    if args.dry_run:
+        print(json.dumps(out, indent=2))
+        return 0
+
+    path = Path(args.output or os.getenv("TTS_ORT_TUNING_FILE") or ORT_TUNING_FILE)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(out, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+    print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Benchmark the phoneme cache against plain espeak phonemization.
+
+Phonemizes a text (the built-in sentence set, or a chapter saved as a text
+file) three ways and reports milliseconds per sentence:
+
+- espeak: Kokoro's own tokenizer.phonemize, what every create() call did before
+- cold: PhonemeCache on first sight (lexicon fast path + batched espeak misses)
+- warm: PhonemeCache on a second pass (sentence LRU hits)
+
+Also prints how many words the lexicon resolved and how many still needed
+espeak. With --synth it additionally times kokoro.create on text vs. on cached
+phonemes, which shows how much of a sentence's CPU time phonemization was.
+
+Usage:
+    python bench_phonemes.py
+    python bench_phonemes.py --text chapter.txt --repeats 5
+    python bench_phonemes.py --synth --voice af_bella
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Measure the cache itself, not background session rebuilds.
+os.environ.setdefault("TTS_SESSION_RECYCLE_MODE", "off")
+os.environ.setdefault("TTS_SESSION_STANDBY", "0")
+
+from phonemes import PhonemeCache  # noqa: E402
+
+
+def load_sentences(path: str | None) -> list[str]:
+    if not path:
+        from compare_model_variants import SENTENCES
+
+        return list(SENTENCES)
+    from tts import TTSEngine
+
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return [s for s in TTSEngine.split_sentences(TTSEngine.__new__(TTSEngine), text) if s.strip()]
+
+
+def time_per_sentence(fn, sentences: list[str], repeats: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(max(1, repeats)):
+        for s in sentences:
+            fn(s)
+    return (time.perf_counter() - t0) * 1000 / (len(sentences) * max(1, repeats))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--text", default=None, help="text file to split into sentences (default: built-in set)")
+    parser.add_argument("--repeats", type=int, default=3, help="passes for the espeak and warm timings")
+    parser.add_argument("--synth", action="store_true", help="also time kokoro.create on text vs. phonemes")
+    parser.add_argument("--voice", default="af_bella")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    from kokoro_onnx.tokenizer import Tokenizer
+
+    sentences = load_sentences(args.text)
+    tokenizer = Tokenizer()
+
+    def espeak(t: str) -> str:
+        return tokenizer.phonemize(t, "en-us")
+
+    espeak(sentences[0])  # Load espeak outside the timed region.
+    result: dict = {"sentences": len(sentences)}
+    result["espeak_ms"] = time_per_sentence(espeak, sentences, args.repeats)
+
+    t0 = time.perf_counter()
+    cache = PhonemeCache.from_env()
+    result["lexicon_load_ms"] = (time.perf_counter() - t0) * 1000
+    result["cold_ms"] = time_per_sentence(lambda s: cache.phonemize(s, espeak), sentences, 1)
+    cold = cache.metrics()
+    result["warm_ms"] = time_per_sentence(lambda s: cache.phonemize(s, espeak), sentences, args.repeats)
+    result["lexicon_words"] = cold["lexicon_words"]
+    result["espeak_words"] = cold["espeak_words"]
+    result["espeak_sentences"] = cold["espeak_sentences"]
+
+    if args.synth:
+        from tts import TTSEngine
+
+        engine = TTSEngine()
+        voices = engine.list_voices()
+        voice = args.voice if args.voice in voices else (voices[0] if voices else args.voice)
+        kokoro = engine.kokoro
+        kokoro.create(sentences[0], voice, 1.0)
+        phonemes = {s: cache.phonemize(s, espeak) for s in sentences}
+        result["create_text_ms"] = time_per_sentence(lambda s: kokoro.create(s, voice, 1.0), sentences, 1)
+        result["create_phonemes_ms"] = time_per_sentence(
+            lambda s: kokoro.create(phonemes[s], voice, 1.0, is_phonemes=True), sentences, 1
+        )
+
+    result = {k: round(v, 3) if isinstance(v, float) else v for k, v in result.items()}
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"{result['sentences']} sentences, lexicon loaded in {result['lexicon_load_ms']:.0f}ms")
+    print(f"espeak        {result['espeak_ms']:8.3f} ms/sentence")
+    print(f"cache (cold)  {result['cold_ms']:8.3f} ms/sentence")
+    print(f"cache (warm)  {result['warm_ms']:8.3f} ms/sentence")
+    print(
+        f"words: {result['lexicon_words']} from lexicon, {result['espeak_words']} via espeak; "
+        f"{result['espeak_sentences']} sentences sent to espeak whole"
+    )
+    if args.synth:
+        print(f"create(text)      {result['create_text_ms']:8.1f} ms/sentence")
+        print(f"create(phonemes)  {result['create_phonemes_ms']:8.1f} ms/sentence")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
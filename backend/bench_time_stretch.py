@@ -0,0 +1,101 @@
+"""Benchmark TTS_SPEED_MODE=stretch against re-synthesis at each speed.
+
+For every speed this reports the CPU time per second of output audio of:
+
+- stretch: time_stretch() applied to audio synthesized once at 1.0x
+- resynth: kokoro.create at that speed (skipped with --no-model)
+
+Without a model (or with --no-model) a synthetic voiced signal stands in
+for speech, which is enough to measure the stretch cost.
+
+Usage:
+    python bench_time_stretch.py
+    python bench_time_stretch.py --speeds 0.8,1.25,1.5,2.0 --voice af_bella
+    python bench_time_stretch.py --no-model
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Measure synthesis itself, not background session rebuilds.
+os.environ.setdefault("TTS_SESSION_RECYCLE_MODE", "off")
+os.environ.setdefault("TTS_SESSION_STANDBY", "0")
+
+from timestretch import time_stretch  # noqa: E402
+
+SAMPLE_RATE = 24000
+
+
+def synthetic_speech(seconds: float = 5.0, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Harmonic signal with a gliding pitch and syllable-rate envelope."""
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140 + 25 * np.sin(2 * np.pi * 0.6 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 10))
+    envelope = (0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t)) ** 2
+    return (0.3 * voiced * envelope).astype(np.float32)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speeds", default="0.75,1.25,1.5,2.0")
+    parser.add_argument("--voice", default="af_bella")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-model", action="store_true", help="use a synthetic signal; skip re-synthesis")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+    speeds = [float(x) for x in args.speeds.split(",") if x.strip()]
+
+    kokoro = None
+    voice = args.voice
+    if args.no_model:
+        clips = [synthetic_speech()]
+    else:
+        from compare_model_variants import SENTENCES
+        from tts import TTSEngine
+
+        engine = TTSEngine()
+        voices = engine.list_voices()
+        voice = voice if voice in voices else (voices[0] if voices else voice)
+        kokoro = engine.kokoro
+        kokoro.create(SENTENCES[0], voice, 1.0)
+        clips = [np.asarray(kokoro.create(s, voice, 1.0)[0], dtype=np.float32) for s in SENTENCES]
+
+    results = []
+    for speed in speeds:
+        row: dict = {"speed": speed}
+        t0 = time.perf_counter()
+        out_s = 0.0
+        for _ in range(max(1, args.repeats)):
+            for clip in clips:
+                out_s += time_stretch(clip, speed, SAMPLE_RATE).size / SAMPLE_RATE
+        row["stretch_ms_per_s"] = (time.perf_counter() - t0) * 1000 / out_s
+
+        if kokoro is not None:
+            from compare_model_variants import SENTENCES
+
+            t0 = time.perf_counter()
+            out_s = 0.0
+            for s in SENTENCES:
+                out_s += len(kokoro.create(s, voice, speed)[0]) / SAMPLE_RATE
+            row["resynth_ms_per_s"] = (time.perf_counter() - t0) * 1000 / out_s
+            row["speedup"] = row["resynth_ms_per_s"] / row["stretch_ms_per_s"]
+        results.append({k: round(v, 2) if isinstance(v, float) else v for k, v in row.items()})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'speed':>6} {'stretch ms/s':>13} {'resynth ms/s':>13} {'speedup':>8}")
+    for r in results:
+        resynth = f"{r['resynth_ms_per_s']:>13.1f}" if "resynth_ms_per_s" in r else f"{'-':>13}"
+        speedup = f"{r['speedup']:>8.1f}" if "speedup" in r else f"{'-':>8}"
+        print(f"{r['speed']:>6.2f} {r['stretch_ms_per_s']:>13.2f} {resynth} {speedup}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
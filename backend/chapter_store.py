@@ -0,0 +1,213 @@
+"""Persistent store of parsed chapters (used by NovelCoolScraper.scrape_chapter).
+
+One SQLite row per chapter URL holds the parsed record (title, paragraphs,
+next/prev URLs) as a compressed JSON blob, its content hash, the HTTP
+validators of the page and when it was fetched. Sentence segment tables are
+stored per content hash and segmenter version, so a repeated `play` needs no
+network, parsing or sentence splitting. Novel chapter indexes are stored
+here too (novel_index.py).
+
+Blobs are zstd-compressed when the `zstandard` package is installed, zlib
+otherwise; each row records its codec.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import zstandard
+except ImportError:  # Optional: zlib is used instead.
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CHAPTER_STORE_PATH = os.getenv("CHAPTER_STORE_PATH", "renders/chapters.db")
+# Stored chapters are served without revalidation for this long...
+CHAPTER_STORE_TTL_S = float(os.getenv("CHAPTER_STORE_TTL_S", str(7 * 24 * 3600)) or "0")
+# ...except the newest chapter of a novel (no next_url yet), whose page gains
+# a "Next" link when the following chapter is published.
+CHAPTER_STORE_TAIL_TTL_S = float(os.getenv("CHAPTER_STORE_TAIL_TTL_S", "600") or "0")
+
+
+def content_hash(chapter: dict) -> str:
+    raw = json.dumps([chapter.get("title"), chapter.get("content") or []], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _compress(data: bytes) -> tuple:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec: str, blob: bytes) -> Optional[bytes]:
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    if codec == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return None
+
+
+class StoredChapter:
+    """A stored chapter record plus its freshness metadata."""
+
+    def __init__(self, chapter: dict, fetched_at: float, etag: Optional[str], last_modified: Optional[str]):
+        self.chapter = chapter
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        ttl = CHAPTER_STORE_TTL_S if self.chapter.get("next_url") else CHAPTER_STORE_TAIL_TTL_S
+        return ((now or time.time()) - self.fetched_at) < ttl
+
+
+class ChapterStore:
+    def __init__(self, path: str | Path = CHAPTER_STORE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chapters (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    blob BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS novel_indexes (
+                    url TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    blob BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS segments (
+                    content_hash TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    blob BLOB NOT NULL,
+                    PRIMARY KEY (content_hash, tag)
+                );
+                """
+            )
+            self._conn.commit()
+            # Running totals for metrics(), so /health never scans the table.
+            self._chapters, self._bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(blob)), 0) FROM chapters"
+            ).fetchone()
+        self._hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._stale_served = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ChapterStore"]:
+        if os.getenv("CHAPTER_STORE", "1") != "1":
+            return None
+        try:
+            return cls()
+        except Exception as e:
+            logger.warning("Chapter store unavailable: %s", e)
+            return None
+
+    def get(self, url: str) -> Optional[StoredChapter]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT codec, blob, etag, last_modified, fetched_at FROM chapters WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        data = _decompress(row[0], row[1])
+        if data is None:
+            return None
+        return StoredChapter(json.loads(data), row[4], row[2], row[3])
+
+    def put(self, url: str, chapter: dict, *, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        codec, blob = _compress(json.dumps(chapter, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT LENGTH(blob) FROM chapters WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chapters (url, content_hash, codec, blob, etag, last_modified, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, chapter.get("content_hash") or content_hash(chapter), codec, blob, etag, last_modified, time.time()),
+            )
+            self._conn.commit()
+            if old is None:
+                self._chapters += 1
+            self._bytes += len(blob) - (old[0] if old is not None else 0)
+
+    def touch(self, url: str) -> None:
+        """Mark a stored chapter fresh again (the server answered 304)."""
+        with self._lock:
+            self._conn.execute("UPDATE chapters SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def get_segments(self, chash: str, tag: str) -> Optional[List[tuple]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT codec, blob FROM segments WHERE content_hash = ? AND tag = ?", (chash, tag)
+            ).fetchone()
+        data = _decompress(row[0], row[1]) if row is not None else None
+        return [tuple(seg) for seg in json.loads(data)] if data is not None else None
+
+    def put_segments(self, chash: str, tag: str, segments: List[tuple]) -> None:
+        codec, blob = _compress(json.dumps(segments, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO segments (content_hash, tag, codec, blob) VALUES (?, ?, ?, ?)",
+                (chash, tag, codec, blob),
+            )
+            self._conn.commit()
+
+    def get_index(self, url: str) -> Optional[dict]:
+        """Stored chapter index of a novel (see novel_index.py)."""
+        with self._lock:
+            row = self._conn.execute("SELECT codec, blob FROM novel_indexes WHERE url = ?", (url,)).fetchone()
+        data = _decompress(row[0], row[1]) if row is not None else None
+        return json.loads(data) if data is not None else None
+
+    def put_index(self, url: str, index: dict) -> None:
+        codec, blob = _compress(json.dumps(index, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO novel_indexes (url, codec, blob) VALUES (?, ?, ?)", (url, codec, blob)
+            )
+            self._conn.commit()
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup: "hit", "miss", "revalidated" or "stale"."""
+        if outcome == "hit":
+            self._hits += 1
+        elif outcome == "miss":
+            self._misses += 1
+        elif outcome == "revalidated":
+            self._revalidated += 1
+        elif outcome == "stale":
+            self._stale_served += 1
+
+    def metrics(self) -> dict:
+        """Counters only: safe to call from the event loop (no query, no lock)."""
+        return {
+            "chapters": self._chapters,
+            "bytes": self._bytes,
+            "codec": "zstd" if zstandard is not None else "zlib",
+            "hits": self._hits,
+            "misses": self._misses,
+            "revalidated": self._revalidated,
+            "stale_served": self._stale_served,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
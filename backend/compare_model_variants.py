@@ -0,0 +1,168 @@
+"""Compare reduced-precision model variants against fp32 on a fixed workload.
+
+For every variant built by quantize_model.py this synthesizes the same
+sentences with the same voice and reports:
+
+- rtf: synthesis time / audio duration (lower is faster; < 1.0 is real-time)
+- speedup: fp32 rtf / variant rtf
+- dur_delta_pct: total audio duration change vs fp32 (duration is predicted by
+  the model, so quantization can make speech slightly faster or slower)
+- lsd_db: log-spectral distance to the fp32 audio in dB, after aligning the
+  two spectrograms with DTW (0 = identical; listen to the worst sentences
+  before trusting a variant whose distance stands out)
+
+Usage:
+    python compare_model_variants.py
+    python compare_model_variants.py --variants int8 --voice af_bella --repeats 3 --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# One engine per variant, no background recycling while we measure.
+os.environ.setdefault("TTS_SESSION_RECYCLE_MODE", "off")
+os.environ.setdefault("TTS_SESSION_STANDBY", "0")
+
+from tts import TTSEngine  # noqa: E402
+
+SENTENCES = [
+    "The rain fell steadily on the roof of the old temple.",
+    "\"Are you really going to leave?\" she asked, her voice barely above a whisper.",
+    "Sunny clenched his fists; the Nightmare Spell had chosen him, and there was no way back.",
+    "Three hundred and twelve soldiers stood in silence as the general raised his sword.",
+    "Wait!",
+    "It was, without a doubt, the strangest morning of his entire life - and it had only just begun.",
+    "Lady Nephis nodded once, turned, and walked into the mist without another word.",
+    "Hmm... I suppose that could work, if we're careful.",
+]
+
+
+def log_spectrogram(audio: np.ndarray, n_fft: int = 1024, hop: int = 256, floor_db: float = 60.0) -> np.ndarray:
+    """Return a (frames, bins) log-magnitude spectrogram in dB.
+
+    Values are floored `floor_db` below the peak so near-silent bins (where
+    tiny numeric differences turn into huge dB swings) do not dominate.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.size < n_fft:
+        audio = np.pad(audio, (0, n_fft - audio.size))
+    n_frames = 1 + (audio.size - n_fft) // hop
+    idx = np.arange(n_fft)[None, :] + hop * np.arange(n_frames)[:, None]
+    frames = audio[idx] * np.hanning(n_fft).astype(np.float32)
+    mag = np.abs(np.fft.rfft(frames, axis=1))
+    db = 20.0 * np.log10(np.maximum(mag, 1e-10))
+    return np.maximum(db, db.max() - floor_db)
+
+
+def dtw_log_spectral_distance(ref: np.ndarray, test: np.ndarray) -> float:
+    """Mean per-frame RMS dB difference along the DTW alignment path."""
+    a = log_spectrogram(ref)
+    b = log_spectrogram(test)
+    # Frame distance matrix (RMS over frequency bins).
+    cost = np.sqrt(
+        np.maximum(
+            (a**2).mean(axis=1)[:, None] + (b**2).mean(axis=1)[None, :] - 2.0 * (a @ b.T) / a.shape[1],
+            0.0,
+        )
+    )
+    n, m = cost.shape
+    acc = np.full((n + 1, m + 1), np.inf)
+    steps = np.zeros((n + 1, m + 1), dtype=np.int32)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        row_cost = cost[i - 1]
+        prev = acc[i - 1]
+        prev_steps = steps[i - 1]
+        cur = acc[i]
+        cur_steps = steps[i]
+        for j in range(1, m + 1):
+            best, best_steps = prev[j - 1], prev_steps[j - 1]
+            if prev[j] < best:
+                best, best_steps = prev[j], prev_steps[j]
+            if cur[j - 1] < best:
+                best, best_steps = cur[j - 1], cur_steps[j - 1]
+            cur[j] = best + row_cost[j - 1]
+            cur_steps[j] = best_steps + 1
+    return float(acc[n, m] / max(1, steps[n, m]))
+
+
+def run_variant(variant: str, voice: str | None, speed: float, repeats: int) -> dict | None:
+    engine = TTSEngine(model_variant=variant)
+    if engine.model_variant != variant:
+        print(f"[{variant}] not built, skipping (run quantize_model.py --variant {variant})")
+        return None
+    voices = engine.list_voices()
+    voice = voice if voice in voices else (voices[0] if voices else voice)
+    kokoro = engine.kokoro
+
+    # Warm-up: the first run pays arena allocation and lazy kernel setup.
+    kokoro.create(SENTENCES[0], voice, speed)
+
+    audio: list[np.ndarray] = []
+    synth_s = 0.0
+    for r in range(max(1, repeats)):
+        for s in SENTENCES:
+            t0 = time.perf_counter()
+            out, _ = kokoro.create(s, voice, speed)
+            synth_s += time.perf_counter() - t0
+            if r == 0:
+                audio.append(np.asarray(out, dtype=np.float32))
+    audio_s = sum(a.size for a in audio) / float(engine.sample_rate) * max(1, repeats)
+    return {
+        "variant": variant,
+        "model_path": engine.model_path,
+        "voice": voice,
+        "rtf": synth_s / audio_s if audio_s else float("nan"),
+        "audio_s": audio_s / max(1, repeats),
+        "audio": audio,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", default="int8,fp16", help="comma-separated variants to compare with fp32")
+    parser.add_argument("--voice", default="af_bella")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--repeats", type=int, default=2, help="timed passes over the sentence set")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    baseline = run_variant("fp32", args.voice, args.speed, args.repeats)
+    if baseline is None:
+        return 1
+    results = []
+    for variant in ["fp32"] + [v.strip() for v in args.variants.split(",") if v.strip() and v.strip() != "fp32"]:
+        res = baseline if variant == "fp32" else run_variant(variant, baseline["voice"], args.speed, args.repeats)
+        if res is None:
+            continue
+        lsd = [dtw_log_spectral_distance(ref, test) for ref, test in zip(baseline["audio"], res["audio"])]
+        results.append(
+            {
+                "variant": variant,
+                "model_path": res["model_path"],
+                "rtf": round(res["rtf"], 4),
+                "speedup": round(baseline["rtf"] / res["rtf"], 3) if res["rtf"] else None,
+                "dur_delta_pct": round((res["audio_s"] / baseline["audio_s"] - 1.0) * 100.0, 2),
+                "lsd_db": round(float(np.mean(lsd)), 3),
+                "lsd_db_max": round(float(np.max(lsd)), 3),
+            }
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'variant':<8} {'rtf':>8} {'speedup':>8} {'dur%':>7} {'lsd_dB':>7} {'max_dB':>7}")
+    for r in results:
+        print(
+            f"{r['variant']:<8} {r['rtf']:>8.4f} {r['speedup']:>8.3f} "
+            f"{r['dur_delta_pct']:>7.2f} {r['lsd_db']:>7.3f} {r['lsd_db_max']:>7.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""On-disk cache of novel cover thumbnails (see /novel_cover).
+
+Covers are fetched once through the scraper's pooled session, resized to
+every width bucket in COVER_WIDTHS and stored as JPEG under COVER_CACHE_DIR;
+a request is served the smallest bucket that covers its width. The cache is
+kept within COVER_CACHE_MB, evicting the least recently served files first.
+
+Resizing uses Pillow (a dependency); if it is missing the original image is
+cached and served for every width, and a warning is logged at startup.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: originals are served instead.
+    Image = None
+
+from render_jobs import RENDER_DIR, _write_atomic
+
+logger = logging.getLogger(__name__)
+
+COVER_CACHE_DIR = os.getenv("COVER_CACHE_DIR", os.path.join(RENDER_DIR, "covers"))
+COVER_CACHE_MB = float(os.getenv("COVER_CACHE_MB", "64") or "0")
+COVER_WIDTHS = tuple(
+    sorted(int(w) for w in (os.getenv("COVER_WIDTHS", "96,192,384") or "192").split(",") if w.strip())
+)
+# Larger origin images are refused.
+COVER_MAX_SOURCE_BYTES = 10 * 1024 * 1024
+_JPEG_QUALITY = 82
+_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+def width_bucket(width: Optional[int]) -> int:
+    """Smallest configured width >= `width` (the largest for bigger ones)."""
+    for w in COVER_WIDTHS:
+        if width is not None and w >= width:
+            return w
+    return COVER_WIDTHS[-1] if width is not None else COVER_WIDTHS[len(COVER_WIDTHS) // 2]
+
+
+def _thumbnail(data: bytes, width: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGB")
+        img.thumbnail((width, width * 3))
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=_JPEG_QUALITY, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+class CoverCache:
+    def __init__(
+        self,
+        fetch: Callable[[str, int], Awaitable[Tuple[bytes, Optional[str]]]],
+        root: str | Path = COVER_CACHE_DIR,
+        *,
+        max_bytes: int = int(COVER_CACHE_MB * 1024 * 1024),
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._fetch = fetch
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # file name -> size, least recently served first (oldest files after a restart).
+        files = sorted((p for p in self.root.iterdir() if p.is_file() and not p.name.endswith(".tmp")),
+                       key=lambda p: p.stat().st_mtime)
+        self._lru: "OrderedDict[str, int]" = OrderedDict((p.name, p.stat().st_size) for p in files)
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+        if Image is None:
+            logger.warning("Pillow is not installed; covers are served at full size without thumbnails")
+
+    async def get(self, cover_url: str, width: Optional[int] = None) -> Path:
+        """Path of the cached thumbnail of `cover_url`, fetching it if needed.
+        One fetch stores the thumbnails of every width bucket."""
+        stem = hashlib.sha256(cover_url.encode("utf-8")).hexdigest()[:32]
+        prefix = f"{stem}-{width_bucket(width)}." if Image is not None else f"{stem}-orig."
+        async with self._locks.setdefault(stem, asyncio.Lock()):
+            name = next((n for n in self._lru if n.startswith(prefix)), None)
+            if name is not None and (self.root / name).exists():
+                self._hits += 1
+                self._lru.move_to_end(name)
+                return self.root / name
+            self._misses += 1
+            data, content_type = await self._fetch(cover_url, COVER_MAX_SOURCE_BYTES)
+            if Image is not None:
+                files = {f"{stem}-{w}.jpg": await asyncio.to_thread(_thumbnail, data, w) for w in COVER_WIDTHS}
+            else:
+                ext = _EXTENSIONS.get((content_type or "").split(";")[0].strip().lower())
+                if ext is None:
+                    raise ValueError(f"{cover_url} is not an image ({content_type})")
+                files = {prefix + ext[1:]: data}
+            for name, body in files.items():
+                await asyncio.to_thread(_write_atomic, self.root / name, body)
+                self._lru[name] = len(body)
+                self._lru.move_to_end(name)
+            name = next(n for n in files if n.startswith(prefix))
+            self._lru.move_to_end(name)
+            self._evict(keep=set(files))
+            return self.root / name
+
+    @staticmethod
+    def media_type(path: Path) -> str:
+        return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+    def metrics(self) -> dict:
+        return {
+            "files": len(self._lru),
+            "bytes": sum(self._lru.values()),
+            "budget_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evicted": self._evicted,
+            "resize": Image is not None,
+        }
+
+    def _evict(self, keep: set) -> None:
+        total = sum(self._lru.values())
+        for name in [n for n in self._lru if n not in keep]:
+            if total <= self.max_bytes:
+                break
+            size = self._lru.pop(name)
+            try:
+                (self.root / name).unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._evicted += 1
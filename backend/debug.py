@@ -0,0 +1,148 @@
+"""On-demand diagnostics behind the /debug endpoints (DEBUG_ENDPOINTS=1).
+
+- Per-connection accounting: every WebSocket connection reports its queued
+  output and, per stream, the audio it holds (download PCM, FLAC, seek
+  cache) through gauges evaluated only when asked (see MuxStream.gauges).
+- tracemalloc: started on request, then snapshots are diffed against the
+  baseline taken at start.
+- A sampling CPU profiler: a thread samples every thread's stack (the event
+  loop, the `tts` inference pool, ...) for N seconds and returns collapsed
+  stacks ("thread;frame;frame count" lines, for flamegraph tools).
+
+Nothing runs until an endpoint is called. Set DEBUG_TOKEN to require an
+X-Debug-Token header.
+"""
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+from typing import Optional
+
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "0") == "1"
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+DEBUG_PROFILE_MAX_S = float(os.getenv("DEBUG_PROFILE_MAX_S", "30") or "30")
+DEBUG_TRACEMALLOC_FRAMES = max(1, int(os.getenv("DEBUG_TRACEMALLOC_FRAMES", "8") or "1"))
+
+# Open WebSocket connections (MuxConnection -> {"client", "opened_at"}).
+connections: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_profile_lock = threading.Lock()
+
+
+def process_memory() -> dict:
+    out = {"threads": threading.active_count()}
+    try:
+        with open("/proc/self/statm") as f:
+            out["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Peak, not current, where /proc is unavailable (kB on Linux, bytes on macOS).
+        out["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return out
+
+
+def connection_report() -> dict:
+    conns = []
+    for conn, info in list(connections.items()):
+        stats = conn.accounting()
+        conns.append({**info, **stats})
+    totals = Counter()
+    for c in conns:
+        totals["queued_bytes"] += c["queued_bytes"]
+        for s in c["streams"]:
+            for k, v in s.items():
+                if k.endswith("_bytes") and isinstance(v, int):
+                    totals[k] += v
+    return {"connections": conns, "totals": dict(totals)}
+
+
+class TracemallocSession:
+    """Diff allocations against the snapshot taken when tracing started."""
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, linecache.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+
+    def start(self, frames: int = DEBUG_TRACEMALLOC_FRAMES) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = self._snapshot()
+        return self.status()
+
+    def stop(self) -> dict:
+        tracemalloc.stop()
+        self._baseline = None
+        return self.status()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {"tracing": tracemalloc.is_tracing(), "traced_bytes": current, "peak_bytes": peak}
+
+    def diff(self, top: int = 25, group_by: str = "lineno") -> dict:
+        """Largest allocation growth since start (blocking: run off the loop)."""
+        if self._baseline is None or not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not started")
+        stats = self._snapshot().compare_to(self._baseline, group_by)
+        return {
+            **self.status(),
+            "top": [
+                {
+                    "size_diff": s.size_diff,
+                    "size": s.size,
+                    "count_diff": s.count_diff,
+                    "traceback": [f"{f.filename}:{f.lineno}" for f in s.traceback],
+                }
+                for s in stats[:top]
+            ],
+        }
+
+
+def sample_stacks(seconds: float, hz: float = 100.0, thread_prefix: str = "") -> str:
+    """Collapsed stacks of all threads sampled for `seconds` (blocking).
+
+    Each line is "thread;outermost;...;innermost count". The sampling thread
+    itself is left out. One profile runs at a time.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+    try:
+        return _sample_stacks(min(seconds, DEBUG_PROFILE_MAX_S), hz, thread_prefix)
+    finally:
+        _profile_lock.release()
+
+
+def _sample_stacks(seconds: float, hz: float, thread_prefix: str) -> str:
+    own = threading.get_ident()
+    counts: Counter = Counter()
+    interval = 1.0 / max(1.0, hz)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident, str(ident))
+            if ident == own or not name.startswith(thread_prefix):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            counts[";".join([name, *reversed(stack)])] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+tracing = TracemallocSession()
@@ -0,0 +1,120 @@
+"""Compact binary framing for sentence audio (play with "framing": "binary").
+
+Instead of a `sentence` JSON event followed by a binary message, each chunk
+is one binary message: a fixed 32-byte little-endian header, the optional
+UTF-8 sentence text, then the audio payload.
+
+    offset  size  field
+    0       2     magic b"CR"
+    2       1     version (1)
+    3       1     codec (0 = pcm_s16le, 1 = flac)
+    4       2     flags (bit 0: sentence text present)
+    6       2     text_len (bytes)
+    8       4     paragraph_index
+    12      4     sentence_index
+    16      4     char_start
+    20      4     char_end
+    24      4     ms_start
+    28      4     payload_len (bytes)
+
+Version 2 frames (sent on multiplexed connections, see ws_mux.py) append a
+4-byte stream_id at offset 32, so the header is 36 bytes.
+"""
+import struct
+from typing import NamedTuple, Optional
+
+FRAME_MAGIC = b"CR"
+FRAME_VERSION = 1
+FRAME_VERSION_STREAM = 2
+FRAME_HEADER = struct.Struct("<2sBBHHIIIIII")
+FRAME_STREAM_ID = struct.Struct("<I")
+FLAG_TEXT = 0x1
+CODECS = {"pcm_s16le": 0, "flac": 1}
+
+
+class SentenceFrame(NamedTuple):
+    codec: int
+    paragraph_index: int
+    sentence_index: int
+    char_start: int
+    char_end: int
+    ms_start: int
+    text: Optional[str]
+    payload: bytes
+    stream_id: Optional[int] = None
+
+
+def encode_sentence_frame(
+    payload: bytes,
+    *,
+    paragraph_index: int,
+    sentence_index: int,
+    char_start: int,
+    char_end: int,
+    ms_start: int,
+    text: Optional[str] = None,
+    codec: str = "pcm_s16le",
+    stream_id: Optional[int] = None,
+) -> bytes:
+    # The length field is 16 bits; cut at a character boundary.
+    text_bytes = text.encode("utf-8")[:0xFFFF].decode("utf-8", "ignore").encode("utf-8") if text else b""
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC,
+        FRAME_VERSION if stream_id is None else FRAME_VERSION_STREAM,
+        CODECS[codec],
+        FLAG_TEXT if text is not None else 0,
+        len(text_bytes),
+        paragraph_index,
+        sentence_index,
+        char_start,
+        char_end,
+        ms_start,
+        len(payload),
+    )
+    if stream_id is not None:
+        header += FRAME_STREAM_ID.pack(stream_id)
+    return b"".join((header, text_bytes, payload))
+
+
+def decode_sentence_frame(data: bytes) -> SentenceFrame:
+    """Parse one frame (for Python clients; `python framing.py` checks a round trip)."""
+    (magic, version, codec, flags, text_len, p_idx, s_idx, cs, ce, ms, payload_len) = FRAME_HEADER.unpack_from(data)
+    if magic != FRAME_MAGIC or version not in (FRAME_VERSION, FRAME_VERSION_STREAM):
+        raise ValueError("not a sentence frame")
+    start = FRAME_HEADER.size
+    stream_id = None
+    if version == FRAME_VERSION_STREAM:
+        (stream_id,) = FRAME_STREAM_ID.unpack_from(data, start)
+        start += FRAME_STREAM_ID.size
+    text = data[start : start + text_len].decode("utf-8") if flags & FLAG_TEXT else None
+    payload = data[start + text_len : start + text_len + payload_len]
+    if len(payload) != payload_len:
+        raise ValueError("truncated sentence frame")
+    return SentenceFrame(codec, p_idx, s_idx, cs, ce, ms, text, bytes(payload), stream_id)
+
+
+if __name__ == "__main__":
+    # Round-trip check of both frame versions.
+    for stream_id, text in ((None, None), (7, "Hello — world.")):
+        frame = decode_sentence_frame(
+            encode_sentence_frame(
+                b"\x01\x00" * 4,
+                paragraph_index=3,
+                sentence_index=1,
+                char_start=10,
+                char_end=24,
+                ms_start=4200,
+                text=text,
+                stream_id=stream_id,
+            )
+        )
+        expected = SentenceFrame(CODECS["pcm_s16le"], 3, 1, 10, 24, 4200, text, b"\x01\x00" * 4, stream_id)
+        assert frame == expected, frame
+    # Over-long text is cut to whole characters.
+    frame = decode_sentence_frame(
+        encode_sentence_frame(
+            b"", paragraph_index=0, sentence_index=0, char_start=0, char_end=0, ms_start=0, text="é" * 40000
+        )
+    )
+    assert frame.text == "é" * (0xFFFF // 2), len(frame.text)
+    print("ok")
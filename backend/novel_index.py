@@ -0,0 +1,123 @@
+"""Parsed novel pages with cheap incremental refreshes.
+
+One fetch and one parse of a novel page yield its title, cover and chapter
+index (sorted by number); /novel_details, /novel_index and /novel_meta are
+all served from it. Each novel is kept in memory and in the chapter store, so
+it survives restarts. A refresh
+
+1. revalidates the novel page with its ETag/Last-Modified (304: done);
+2. on pages that list chapters newest first, parses only the links ahead of
+   the already indexed ones (see scraper.parse_novel_page);
+3. inserts the new chapters into the sorted list with bisect.
+
+Every NOVEL_INDEX_FULL_REFRESH_S the page is parsed in full and replaces
+the index, which also drops removed chapters.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from scraper import chapter_sort_key, parse_novel_page
+
+logger = logging.getLogger(__name__)
+
+NOVEL_INDEX_TTL_S = float(os.getenv("NOVEL_INDEX_TTL_S", str(30 * 60)) or "0")
+# /novel_index revalidates pages older than this, so a client sees new
+# chapters promptly while back-to-back calls for one novel share a fetch.
+NOVEL_INDEX_REVALIDATE_S = float(os.getenv("NOVEL_INDEX_REVALIDATE_S", "60") or "0")
+NOVEL_INDEX_FULL_REFRESH_S = float(os.getenv("NOVEL_INDEX_FULL_REFRESH_S", str(24 * 3600)) or "0")
+
+
+def _newest_first(links: List[dict]) -> bool:
+    """Whether a page lists its numbered chapters mostly in descending order."""
+    numbers = [c["n"] for c in links if isinstance(c.get("n"), int)]
+    pairs = list(zip(numbers, numbers[1:]))
+    return sum(a > b for a, b in pairs) > sum(a < b for a, b in pairs)
+
+
+def chapters_since(chapters: List[dict], since: int) -> List[dict]:
+    """Numbered chapters after chapter `since` of a sorted index."""
+    start = bisect.bisect_right(chapters, (0, since), key=chapter_sort_key)
+    return [c for c in chapters[start:] if isinstance(c.get("n"), int)]
+
+
+class NovelIndexes:
+    def __init__(self, scraper, store=None, *, ttl_s: float = NOVEL_INDEX_TTL_S, full_refresh_s: float = NOVEL_INDEX_FULL_REFRESH_S):
+        self.scraper = scraper
+        self.store = store
+        self.ttl_s = ttl_s
+        self.full_refresh_s = full_refresh_s
+        # novel URL -> {"title", "cover_url", "chapters", "etag", "last_modified",
+        #               "newest_first", "full_at", "checked_at"}
+        self._entries: Dict[str, dict] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, novel_url: str, max_age_s: Optional[float] = None) -> List[dict]:
+        """Sorted chapter list of a novel (see get_page)."""
+        return (await self.get_page(novel_url, max_age_s))["chapters"]
+
+    async def get_page(self, novel_url: str, max_age_s: Optional[float] = None) -> dict:
+        """Parsed novel page, refreshed if older than `max_age_s` (default:
+        the TTL). A failed refresh serves the stored copy."""
+        async with self._locks.setdefault(novel_url, asyncio.Lock()):
+            entry = self._entries.get(novel_url)
+            if entry is None and self.store is not None:
+                entry = await asyncio.to_thread(self.store.get_index, novel_url)
+                if entry is not None:
+                    entry["checked_at"] = 0.0  # Revalidate once after a restart.
+                    self._entries[novel_url] = entry
+            max_age = self.ttl_s if max_age_s is None else max_age_s
+            if entry is not None and time.time() - entry["checked_at"] < max_age:
+                return entry
+            try:
+                entry = await self._refresh(novel_url, entry)
+            except Exception as e:
+                if entry is None:
+                    raise
+                logger.warning("Serving stored index of %s, refresh failed: %s", novel_url, e)
+            return entry
+
+    async def _refresh(self, novel_url: str, entry: Optional[dict]) -> dict:
+        now = time.time()
+        if entry is not None and "cover_url" not in entry:
+            entry = None  # Stored before details were kept: refetch in full.
+        full = entry is None or not entry.get("newest_first") or now - entry.get("full_at", 0.0) >= self.full_refresh_s
+        html, etag, last_modified = await self.scraper.fetch_page(
+            novel_url,
+            None if entry is None else entry.get("etag"),
+            None if entry is None else entry.get("last_modified"),
+        )
+        if html is None:
+            entry["checked_at"] = now
+            return entry
+
+        if full:
+            page = await asyncio.to_thread(parse_novel_page, html, novel_url)
+            links = page["chapters"]
+            entry = {
+                "title": page["title"],
+                "cover_url": page["cover_url"],
+                "chapters": sorted(links, key=chapter_sort_key),
+                "newest_first": _newest_first(links),
+                "full_at": now,
+            }
+            added = len(links)
+        else:
+            chapters = entry["chapters"]
+            known = {c["url"] for c in chapters}
+            page = await asyncio.to_thread(parse_novel_page, html, novel_url, known)
+            links = page["chapters"]
+            for key in ("title", "cover_url"):
+                entry[key] = page[key] or entry.get(key)
+            for c in links:
+                bisect.insort(chapters, c, key=chapter_sort_key)
+            added = len(links)
+        entry.update(etag=etag, last_modified=last_modified, checked_at=now)
+        self._entries[novel_url] = entry
+        logger.info("Novel index %s: %s refresh, %d new entries", novel_url, "full" if full else "incremental", added)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put_index, novel_url, entry)
+        return entry
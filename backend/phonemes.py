@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lexicons shipped with the Flutter app (frontend/assets), in priority order:
+# app-specific overrides first, then the misaki gold and silver dictionaries.
+LEXICON_FILES = ("lexicon.json", "us_gold.json", "us_silver.json")
+
+# Punctuation that Kokoro's vocabulary (and its pause handling) understands.
+_KEEP_PUNCT = set(',.!?;:—…"“”()')
+_TOKEN = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*|[^\sA-Za-z]")
+# Characters that need espeak's text normalization (numbers, symbols, ...).
+_NEEDS_ESPEAK = re.compile(r"[0-9$%&@#+=/\\<>|^~*_]")
+# Unstressed function words whose lexicon entry is the citation form; the
+# second value is used before a vowel ("the apple", "to us").
+_WEAK_FORMS = {"a": ("ɐ", "ɐ"), "an": ("ən", "ən"), "the": ("ðə", "ði"), "to": ("tə", "tʊ")}
+_VOWELS = set("aeiouæɑɒɔəɛɜɪʊʌɐᵻAIOWY")
+
+
+def find_lexicon_dir() -> Optional[Path]:
+    """Locate the lexicon files: TTS_LEXICON_DIR, backend/lexicons, or the
+    frontend assets of a source checkout."""
+    base_dir = Path(__file__).resolve().parent
+    raw = os.getenv("TTS_LEXICON_DIR", "").strip()
+    candidates = [Path(raw)] if raw else [base_dir / "lexicons", base_dir.parent / "frontend" / "assets"]
+    for d in candidates:
+        if not d.is_absolute():
+            d = base_dir / d
+        if any((d / name).exists() for name in LEXICON_FILES):
+            return d
+    return None
+
+
+def load_lexicon(directory: Path) -> Dict[str, str]:
+    """Merge the lexicon files in `directory` into one word -> phonemes map.
+
+    Gold entries may map to a dict of part-of-speech variants; the DEFAULT
+    pronunciation is used. Earlier files win over later ones.
+    """
+    merged: Dict[str, str] = {}
+    for name in reversed(LEXICON_FILES):
+        path = directory / name
+        if not path.exists():
+            continue
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("Could not read lexicon %s: %s", path, e)
+            continue
+        for word, value in data.items():
+            if isinstance(value, dict):
+                value = value.get("DEFAULT")
+            if isinstance(value, str) and value:
+                merged[word] = value
+    return merged
+
+
+class _PhonemeStore:
+    """SQLite word -> phonemes store that survives restarts.
+
+    Only espeak results are stored (the lexicon is already on disk). Rows are
+    tagged with the phonemizer version and dropped when it changes.
+    """
+
+    def __init__(self, path: str, tag: str):
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS phonemes (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+            row = self._conn.execute("SELECT v FROM meta WHERE k = 'tag'").fetchone()
+            if row is None or row[0] != tag:
+                self._conn.execute("DELETE FROM phonemes")
+                self._conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('tag', ?)", (tag,))
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT v FROM phonemes WHERE k = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO phonemes (k, v) VALUES (?, ?)", (key, value))
+            self._pending += 1
+            if self._pending >= 64:
+                self._conn.commit()
+                self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class PhonemeCache:
+    """Text -> phoneme layer in front of Kokoro's espeak phonemizer.
+
+    Resolution order for a sentence:
+    1. sentence LRU (repeated lines, stock phrases);
+    2. word by word: lexicon, then word LRU, then the persistent store; words
+       still unknown (names, rare words) are phonemized by espeak in a single
+       call and cached;
+    3. sentences with numbers or symbols go to espeak whole, because their
+       pronunciation depends on espeak's text normalization.
+
+    `espeak` is passed per call so the layer is independent of which Kokoro
+    instance (recycled or not) is running.
+
+    Environment:
+    - TTS_PHONEME_CACHE_SIZE: entries per LRU (default 20000, 0 disables).
+    - TTS_PHONEME_LEXICON: "0" skips the lexicon fast path (default "1").
+    - TTS_PHONEME_STORE: SQLite file for espeak word results (default off).
+    """
+
+    def __init__(
+        self,
+        *,
+        lexicon: Optional[Dict[str, str]] = None,
+        cache_size: Optional[int] = None,
+        store_path: Optional[str] = None,
+        tag: str = "",
+    ):
+        if cache_size is None:
+            cache_size = int(os.getenv("TTS_PHONEME_CACHE_SIZE", "20000") or "0")
+        self.cache_size = max(0, cache_size)
+        self.lexicon = lexicon or {}
+        self._sentences: "OrderedDict[str, str]" = OrderedDict()
+        self._words: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._store: Optional[_PhonemeStore] = None
+        if store_path:
+            try:
+                self._store = _PhonemeStore(store_path, tag)
+            except Exception as e:
+                logger.warning("Phoneme store %s unavailable: %s", store_path, e)
+
+        self._metrics = {
+            "sentences": 0,
+            "sentence_hits": 0,
+            "lexicon_words": 0,
+            "cached_words": 0,
+            "stored_words": 0,
+            "espeak_words": 0,
+            "espeak_sentences": 0,
+            "phonemize_ms_total": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, tag: str = "") -> "PhonemeCache":
+        lexicon: Dict[str, str] = {}
+        if os.getenv("TTS_PHONEME_LEXICON", "1") == "1":
+            d = find_lexicon_dir()
+            if d is not None:
+                t0 = time.perf_counter()
+                lexicon = load_lexicon(d)
+                logger.info(
+                    "Loaded %d lexicon entries from %s in %.0fms", len(lexicon), d, (time.perf_counter() - t0) * 1000
+                )
+            else:
+                logger.info("No phoneme lexicon found (set TTS_LEXICON_DIR); using espeak for every word")
+        return cls(lexicon=lexicon, store_path=os.getenv("TTS_PHONEME_STORE", "").strip() or None, tag=tag)
+
+    def _lru_get(self, lru: "OrderedDict[str, str]", key: str) -> Optional[str]:
+        with self._lock:
+            value = lru.get(key)
+            if value is not None:
+                lru.move_to_end(key)
+            return value
+
+    def _lru_put(self, lru: "OrderedDict[str, str]", key: str, value: str) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            lru[key] = value
+            lru.move_to_end(key)
+            while len(lru) > self.cache_size:
+                lru.popitem(last=False)
+
+    def _lookup_lexicon(self, word: str) -> Optional[str]:
+        return self.lexicon.get(word) or self.lexicon.get(word.lower())
+
+    def phonemize(self, text: str, espeak: Callable[[str], str], lang: str = "en-us") -> str:
+        """Return Kokoro phonemes for `text`, using `espeak(text)` on misses."""
+        t0 = time.perf_counter()
+        key = f"{lang}\x00{text}"
+        self._metrics["sentences"] += 1
+        out = self._lru_get(self._sentences, key)
+        if out is not None:
+            self._metrics["sentence_hits"] += 1
+        else:
+            out = self._phonemize_words(text, espeak, lang)
+            self._lru_put(self._sentences, key, out)
+        self._metrics["phonemize_ms_total"] += (time.perf_counter() - t0) * 1000
+        return out
+
+    def _phonemize_words(self, text: str, espeak: Callable[[str], str], lang: str) -> str:
+        if _NEEDS_ESPEAK.search(text):
+            self._metrics["espeak_sentences"] += 1
+            return espeak(text)
+
+        tokens = _TOKEN.findall(text.replace("’", "'"))
+        resolved: List[Optional[str]] = []
+        missing: Dict[str, List[int]] = {}
+        for i, tok in enumerate(tokens):
+            if not tok[0].isalpha():
+                resolved.append(tok if tok in _KEEP_PUNCT else None)
+                continue
+            ph = self._lookup_lexicon(tok) if lang == "en-us" else None
+            if ph is not None:
+                self._metrics["lexicon_words"] += 1
+            else:
+                ph = self._lru_get(self._words, f"{lang}\x00{tok}")
+                if ph is not None:
+                    self._metrics["cached_words"] += 1
+                elif self._store is not None:
+                    ph = self._store.get(f"{lang}\x00{tok}")
+                    if ph is not None:
+                        self._metrics["stored_words"] += 1
+                        self._lru_put(self._words, f"{lang}\x00{tok}", ph)
+            if ph is None:
+                missing.setdefault(tok, []).append(i)
+            resolved.append(ph)
+
+        if missing:
+            words = list(missing)
+            phs = self._espeak_words(words, espeak)
+            if phs is None:
+                # espeak merged or split words; fall back to the whole sentence.
+                self._metrics["espeak_sentences"] += 1
+                return espeak(text)
+            self._metrics["espeak_words"] += len(words)
+            for word, ph in zip(words, phs):
+                self._lru_put(self._words, f"{lang}\x00{word}", ph)
+                if self._store is not None:
+                    self._store.put(f"{lang}\x00{word}", ph)
+                for i in missing[word]:
+                    resolved[i] = ph
+
+        for i, tok in enumerate(tokens):
+            weak = _WEAK_FORMS.get(tok.lower()) if tok != "A" else None
+            if weak is None:
+                continue
+            nxt = next((p for t, p in zip(tokens[i + 1 :], resolved[i + 1 :]) if p and t[0].isalpha()), "")
+            resolved[i] = weak[1] if nxt.lstrip("ˈˌ")[:1] in _VOWELS else weak[0]
+
+        # Rebuild spacing the way espeak prints it: words and opening marks
+        # are space-separated, closing punctuation attaches to the left.
+        out = ""
+        quotes = 0
+        opened = False
+        for tok, ph in zip(tokens, resolved):
+            if ph is None:
+                continue
+            opening = tok in "“(" or (tok == '"' and quotes % 2 == 0)
+            if tok == '"':
+                quotes += 1
+            if (tok[0].isalpha() or opening) and out and not opened:
+                out += " "
+            out += ph
+            opened = opening
+        return out
+
+    @staticmethod
+    def _espeak_words(words: List[str], espeak: Callable[[str], str]) -> Optional[List[str]]:
+        """Phonemize several words in one espeak call ("a. b. c." -> per-word)."""
+        if len(words) == 1:
+            ph = espeak(words[0]).strip().rstrip(".")
+            return [ph] if ph else None
+        raw = espeak(". ".join(words) + ".")
+        parts = [p.strip() for p in raw.split(".")]
+        parts = [p for p in parts if p]
+        if len(parts) != len(words):
+            return None
+        return parts
+
+    def metrics(self) -> dict:
+        out = dict(self._metrics)
+        out["phonemize_ms_total"] = round(out["phonemize_ms_total"], 1)
+        out["lexicon_entries"] = len(self.lexicon)
+        out["sentence_cache"] = len(self._sentences)
+        out["word_cache"] = len(self._words)
+        out["store"] = self._store is not None
+        return out
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
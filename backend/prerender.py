@@ -0,0 +1,265 @@
+"""Idle-time pre-rendering of the chapters after the ones being listened to.
+
+Listeners mostly read serially, so every live `play` records the novel's
+position and, once no live play has been synthesizing for
+PRERENDER_IDLE_S, the next PRERENDER_AHEAD chapters of the
+PRERENDER_NOVELS most recently played novels are rendered into the artifact
+store (render_jobs.py) with the voice and speed of that play. Rendering runs
+at the lowest synthesis priority and is cancelled as soon as a live play
+needs synthesis; its per-sentence checkpoint is kept, so it resumes later. A
+play of a stored chapter streams from disk.
+
+Prerendered chapters are kept within PRERENDER_DISK_MB, evicting the least
+recently played first; chapters stored by jobs or downloads are not counted.
+"""
+import asyncio
+import json
+import logging
+import os
+import posixpath
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from priority import synthesis_priority
+from render_jobs import ArtifactStore, artifact_key, render_chapter
+
+logger = logging.getLogger(__name__)
+
+PRERENDER = os.getenv("PRERENDER", "1") == "1"
+PRERENDER_AHEAD = max(0, int(os.getenv("PRERENDER_AHEAD", "2") or "0"))
+PRERENDER_NOVELS = max(1, int(os.getenv("PRERENDER_NOVELS", "4") or "1"))
+PRERENDER_DISK_MB = float(os.getenv("PRERENDER_DISK_MB", "512") or "0")
+PRERENDER_IDLE_S = float(os.getenv("PRERENDER_IDLE_S", "3") or "0")
+# Below render jobs (1) and live playback (WS_LIVE_PRIORITY).
+PRERENDER_PRIORITY = 0
+# A chapter that failed to render is not retried for this long.
+_RETRY_FAILED_S = 600.0
+
+_CHAPTER_SUFFIX = re.compile(r"[-_]chapter[-_]?\d+.*$", re.IGNORECASE)
+
+
+def novel_key(chapter_url: str, novel_url: Optional[str] = None) -> str:
+    """Identify the novel a chapter belongs to.
+
+    Uses the client's `novel_url` when given, else the chapter URL's slug
+    without its chapter number (NovelCool: /chapter/<Novel>-Chapter-15/<id>/).
+    """
+    if novel_url:
+        return novel_url
+    parts = urlsplit(chapter_url or "")
+    segs = [s for s in parts.path.split("/") if s]
+    if len(segs) >= 2 and segs[0].lower() == "chapter":
+        return f"{parts.netloc}/{_CHAPTER_SUFFIX.sub('', segs[1])}"
+    return f"{parts.netloc}{posixpath.dirname(parts.path)}"
+
+
+class Prerenderer:
+    """Background task that renders upcoming chapters while synthesis is idle."""
+
+    def __init__(
+        self,
+        artifacts: ArtifactStore,
+        root: Path,
+        *,
+        get_tts: Callable[[], Awaitable[Any]],
+        scrape: Callable[[str], Awaitable[dict]],
+        ahead: int = PRERENDER_AHEAD,
+        max_novels: int = PRERENDER_NOVELS,
+        disk_bytes: int = int(PRERENDER_DISK_MB * 1024 * 1024),
+        idle_s: float = PRERENDER_IDLE_S,
+    ):
+        self.artifacts = artifacts
+        self.root = Path(root)
+        self.ahead = ahead
+        self.max_novels = max_novels
+        self.disk_bytes = disk_bytes
+        self.idle_s = idle_s
+        # Read by synthesis_priority when this task synthesizes.
+        self.priority = PRERENDER_PRIORITY
+        self._get_tts = get_tts
+        self._scrape = scrape
+        # novel -> {"url", "next_url", "voice", "speed"} of its last live play.
+        self._positions: "OrderedDict[str, dict]" = OrderedDict()
+        self._manifest_path = self.root / "prerender.json"
+        self._manifest: Dict[str, dict] = self._load_manifest()
+        self._failed: Dict[str, float] = {}
+        self._last_live = 0.0
+        self._live = 0  # Live plays synthesizing right now.
+        self._cancel: Optional[asyncio.Event] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._misses = 0
+        self._rendered = 0
+        self._cancelled = 0
+        self._evicted = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def note_play(self, novel: str, url: str, next_url: Optional[str], voice: str, speed: float, *, hit: bool) -> None:
+        """Record a live play. A miss is live demand for synthesis: any
+        running pre-render is cancelled and none starts until live_done()."""
+        if hit:
+            self._hits += 1
+            entry = self._manifest.get(artifact_key(url, voice, speed))
+            if entry is not None:
+                entry["used"] = time.time()
+                self._save_manifest()
+        else:
+            self._misses += 1
+            self._live += 1
+            self._last_live = time.monotonic()
+            if self._cancel is not None and not self._cancel.is_set():
+                self._cancel.set()
+                self._cancelled += 1
+        self._positions[novel] = {"url": url, "next_url": next_url, "voice": voice, "speed": float(speed)}
+        self._positions.move_to_end(novel)
+        while len(self._positions) > self.max_novels:
+            self._positions.popitem(last=False)
+        self._wake.set()
+
+    def live_done(self) -> None:
+        """A live play recorded as a miss ended; the idle timer starts now."""
+        self._live = max(0, self._live - 1)
+        self._last_live = time.monotonic()
+        self._wake.set()
+
+    def metrics(self) -> dict:
+        starts = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / starts, 3) if starts else None,
+            "novels": len(self._positions),
+            "chapters_stored": len(self._manifest),
+            "disk_bytes": self._disk_used(),
+            "disk_budget_bytes": self.disk_bytes,
+            "rendered": self._rendered,
+            "cancelled": self._cancelled,
+            "evicted": self._evicted,
+            "rendering": self._cancel is not None,
+            "live": self._live,
+        }
+
+    # -- worker --------------------------------------------------------------
+
+    async def _run(self) -> None:
+        synthesis_priority.set(self)
+        while True:
+            if self._live > 0:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            idle_in = self.idle_s - (time.monotonic() - self._last_live)
+            if idle_in > 0:
+                await asyncio.sleep(idle_in)
+                continue
+            if self.ahead <= 0 or await self._get_tts() is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            target, wanted = await self._next_target()
+            if target is None or not self._make_room(wanted):
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            await self._render(*target)
+
+    async def _next_target(self) -> tuple:
+        """First missing chapter in the lookahead of the most recent novels,
+        plus the keys of all lookahead chapters (never evicted for it)."""
+        target = None
+        wanted = set()
+        now = time.monotonic()
+        for pos in reversed(self._positions.values()):
+            url = pos["next_url"]
+            for _ in range(self.ahead):
+                if not url:
+                    break
+                key = artifact_key(url, pos["voice"], pos["speed"])
+                wanted.add(key)
+                meta = await asyncio.to_thread(self.artifacts.get, key)
+                if meta is None:
+                    if target is None and now - self._failed.get(url, -_RETRY_FAILED_S) >= _RETRY_FAILED_S:
+                        target = (url, pos["voice"], pos["speed"])
+                    break
+                url = meta.get("next_url")
+        return target, wanted
+
+    async def _render(self, url: str, voice: str, speed: float) -> None:
+        tts = await self._get_tts()
+        cancel = self._cancel = asyncio.Event()
+        try:
+            key = await render_chapter(
+                tts,
+                self.artifacts,
+                self.root / "work",
+                url,
+                voice,
+                speed,
+                cancel,
+                scrape=self._scrape,
+                source="prerender",
+            )
+        except Exception as e:
+            logger.warning("Pre-render of %s failed: %s", url, e)
+            self._failed[url] = time.monotonic()
+            return
+        finally:
+            self._cancel = None
+        if key is None:
+            return
+        meta = await asyncio.to_thread(self.artifacts.get, key)
+        if meta is not None and meta.get("source") == "prerender" and key not in self._manifest:
+            self._manifest[key] = {"size": self.artifacts.size(key), "used": time.time()}
+            self._rendered += 1
+            self._save_manifest()
+            logger.info("Pre-rendered %s (%d bytes)", url, self._manifest[key]["size"])
+
+    # -- disk budget -----------------------------------------------------------
+
+    def _disk_used(self) -> int:
+        return sum(int(e.get("size", 0)) for e in self._manifest.values())
+
+    def _make_room(self, wanted: set) -> bool:
+        """Evict least recently played chapters outside `wanted` until under
+        budget; False if the budget is taken by wanted chapters alone."""
+        while self._disk_used() >= self.disk_bytes:
+            victims = [k for k in self._manifest if k not in wanted]
+            if not victims:
+                return False
+            key = min(victims, key=lambda k: self._manifest[k].get("used", 0))
+            meta = self.artifacts.get(key)
+            # Claimed by a job or overwritten by a download: no longer ours.
+            if meta is not None and meta.get("source") == "prerender":
+                self.artifacts.remove(key)
+                self._evicted += 1
+            del self._manifest[key]
+        self._save_manifest()
+        return True
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return {k: v for k, v in data.items() if isinstance(v, dict)} if isinstance(data, dict) else {}
+
+    def _save_manifest(self) -> None:
+        tmp = self._manifest_path.with_name(self._manifest_path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(self._manifest), encoding="utf-8")
+            os.replace(tmp, self._manifest_path)
+        except OSError as e:
+            logger.warning("Could not save pre-render manifest: %s", e)
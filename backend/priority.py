@@ -0,0 +1,45 @@
+"""Priority scheduling for synthesis shared by concurrent streams.
+
+Kept free of the TTS stack so the server can import it without loading
+onnxruntime.
+"""
+import asyncio
+import heapq
+import itertools
+from contextvars import ContextVar
+from typing import Optional
+
+# Scheduling priority of synthesis requested from the current task (and the
+# pipeline tasks it spawns). Holds any object with an int `priority`
+# attribute, so a stream can change its priority while it runs.
+synthesis_priority: ContextVar[Optional[object]] = ContextVar("synthesis_priority", default=None)
+
+
+class PriorityGate:
+    """Admits `slots` concurrent inference calls; waiters go by priority, then FIFO."""
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # The slot was handed over just as we were cancelled.
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._free += 1
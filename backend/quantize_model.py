@@ -0,0 +1,123 @@
+"""Build a reduced-precision variant of the Kokoro model for CPU inference.
+
+Variants are written next to the fp32 model and picked up by TTSEngine when
+TTS_MODEL_VARIANT is set:
+
+- int8: dynamic INT8 quantization with onnxruntime's quantize_dynamic.
+  Activations are quantized on the fly, so no calibration data is needed.
+  Usually the fastest variant on CPU.
+- fp16: fp16 weights with a Cast back to fp32 in front of every consumer.
+  Halves the model on disk and in download size; compute stays fp32 because
+  most CPU kernels have no fp16 implementation.
+
+Requires the `onnx` package (pip install onnx), which is only needed for this
+offline step, not by the server.
+
+Usage:
+    python quantize_model.py --variant int8
+    python quantize_model.py --variant fp16 --model models/kokoro-v1.0.onnx
+
+Then compare against fp32 with compare_model_variants.py before enabling a
+variant in a deployment.
+"""
+import argparse
+import os
+import sys
+import time
+
+from tts import model_variant_path
+
+DEFAULT_MODEL = "models/kokoro-v1.0.onnx"
+
+
+def quantize_int8(src: str, dst: str, op_types: list[str] | None, per_channel: bool) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        model_input=src,
+        model_output=dst,
+        op_types_to_quantize=op_types or None,
+        per_channel=per_channel,
+        weight_type=QuantType.QUInt8,
+    )
+
+
+def convert_fp16_weights(src: str, dst: str, min_elements: int = 1024) -> None:
+    import numpy as np
+    import onnx
+    from onnx import helper, numpy_helper
+
+    model = onnx.load(src)
+    graph = model.graph
+    graph_inputs = {i.name for i in graph.input}
+
+    casts = []
+    converted = 0
+    for init in graph.initializer:
+        if init.data_type != onnx.TensorProto.FLOAT or init.name in graph_inputs:
+            continue
+        arr = numpy_helper.to_array(init)
+        if arr.size < min_elements:
+            # Small tensors (scales, shapes, biases) are not worth a Cast node.
+            continue
+        name = init.name
+        fp16_name = f"{name}__fp16"
+        init.CopyFrom(numpy_helper.from_array(arr.astype(np.float16), fp16_name))
+        # The Cast keeps the original tensor name so consumers are untouched.
+        casts.append(helper.make_node("Cast", [fp16_name], [name], to=onnx.TensorProto.FLOAT, name=f"{name}__cast"))
+        converted += 1
+
+    # Casts only depend on initializers, so prepending keeps topological order.
+    nodes = casts + list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes)
+    onnx.save(model, dst)
+    print(f"Converted {converted} initializers to fp16")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variant", choices=["int8", "fp16"], required=True)
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="fp32 source model")
+    parser.add_argument("--output", default=None, help="output path (default: <stem>.<variant>.onnx next to the model)")
+    parser.add_argument(
+        "--op-types",
+        default="",
+        help="int8 only: comma-separated op types to quantize (default: every type quantize_dynamic supports)",
+    )
+    parser.add_argument("--per-channel", action="store_true", help="int8 only: per-channel weight scales")
+    parser.add_argument("--force", action="store_true", help="overwrite an existing output file")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.model):
+        print(f"Model not found at {args.model}. Run download_models.py first.", file=sys.stderr)
+        return 1
+    dst = args.output or model_variant_path(args.model, args.variant)
+    if os.path.exists(dst) and not args.force:
+        print(f"{dst} already exists (use --force to rebuild)")
+        return 0
+
+    try:
+        import onnx  # noqa: F401
+    except ImportError:
+        print("The onnx package is required for quantization: pip install onnx", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    tmp = dst + ".tmp"
+    if args.variant == "int8":
+        op_types = [t.strip() for t in args.op_types.split(",") if t.strip()]
+        quantize_int8(args.model, tmp, op_types, args.per_channel)
+    else:
+        convert_fp16_weights(args.model, tmp)
+    os.replace(tmp, dst)
+
+    src_mb = os.path.getsize(args.model) / 1e6
+    dst_mb = os.path.getsize(dst) / 1e6
+    print(f"Wrote {dst} ({dst_mb:.1f} MB, fp32 was {src_mb:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+    print(f"Enable with TTS_MODEL_VARIANT={args.variant}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
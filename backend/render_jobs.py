@@ -0,0 +1,582 @@
+"""Durable batch rendering of chapters to encoded audio (see /render_jobs).
+
+A job is a novel URL, a chapter range, a voice and a speed. Jobs and their
+chapters are rows in a SQLite queue under RENDER_DIR, so they survive restarts.
+Up to RENDER_SLOTS chapters render at once. While a chapter renders, each
+finished sentence is appended to a work directory (raw PCM plus one timeline
+line), so a chapter interrupted by a restart or crash resumes after its last
+complete sentence. Finished chapters go to the ArtifactStore, keyed by
+(chapter URL, voice, speed), as FLAC plus a JSON sentence timeline.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RENDER_DIR = os.getenv("RENDER_DIR", "renders")
+RENDER_SLOTS = max(1, int(os.getenv("RENDER_SLOTS", "2") or "2"))
+# Seconds between attempts while the TTS engine is not available.
+_TTS_RETRY_S = 5.0
+# Per-sentence progress is written to the queue database at most this often.
+_PROGRESS_INTERVAL_S = 1.0
+
+
+def artifact_key(url: str, voice: str, speed: float) -> str:
+    """Stable file key for a chapter rendered with a voice and speed."""
+    raw = f"{url}\n{voice}\n{round(float(speed), 3)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class ArtifactStore:
+    """Rendered chapters on disk: `<key>.flac` and `<key>.json` (timeline)."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def audio_path(self, key: str) -> Path:
+        return self.root / f"{key}.flac"
+
+    def meta_path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Metadata and timeline of a finished chapter, or None."""
+        try:
+            meta = json.loads(self.meta_path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if self.audio_path(key).exists() else None
+
+    def open_pcm(self, key: str, meta: dict) -> "PcmReader":
+        """Open a stored chapter for reading PCM16 by range, e.g. to stream it live."""
+        return PcmReader(self.audio_path(key), meta.get("encoding") == "flac")
+
+    def put(self, key: str, audio: bytes, meta: dict) -> None:
+        # Audio first: metadata marks the artifact complete.
+        _write_atomic(self.audio_path(key), audio)
+        self.put_meta(key, meta)
+
+    def put_meta(self, key: str, meta: dict) -> None:
+        _write_atomic(self.meta_path(key), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def remove(self, key: str) -> None:
+        # Metadata first, so a half-removed artifact is never served.
+        for path in (self.meta_path(key), self.audio_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def size(self, key: str) -> int:
+        try:
+            return self.audio_path(key).stat().st_size
+        except OSError:
+            return 0
+
+    def lock(self, key: str) -> asyncio.Lock:
+        """Per-key lock held while a chapter is being rendered."""
+        return self._locks.setdefault(key, asyncio.Lock())
+
+
+class PcmReader:
+    """Random access to a stored chapter's PCM16 without decoding all of it.
+
+    The file stays open, so an artifact replaced or evicted meanwhile can
+    still be read to the end.
+    """
+
+    def __init__(self, path: Path, flac: bool):
+        if flac:
+            import soundfile as sf
+
+            self._sound = sf.SoundFile(str(path))
+            self._raw = None
+        else:
+            self._sound = None
+            self._raw = open(path, "rb")
+
+    def read(self, offset: int, size: int) -> bytes:
+        """`size` bytes of PCM16 starting at byte `offset`."""
+        if self._sound is not None:
+            if self._sound.tell() != offset // 2:
+                self._sound.seek(offset // 2)
+            return self._sound.read(size // 2, dtype="int16").tobytes()
+        self._raw.seek(offset)
+        return self._raw.read(size)
+
+    def close(self) -> None:
+        (self._sound or self._raw).close()
+
+
+def chapter_artifact_meta(
+    chapter: dict,
+    url: str,
+    voice: str,
+    speed: float,
+    *,
+    encoding: str,
+    sample_rate: int,
+    pcm_bytes: int,
+    timeline: List[dict],
+    source: str = "job",
+) -> dict:
+    """Metadata stored next to a rendered chapter's audio.
+
+    `source` is what produced it: "job", "download" or "prerender" (only
+    prerendered chapters count against, and are evicted by, the prerender
+    disk budget).
+    """
+    return {
+        "url": url,
+        "title": chapter.get("title"),
+        "voice": voice,
+        "speed": speed,
+        "encoding": encoding,
+        "sample_rate": sample_rate,
+        "channels": 1,
+        "duration_ms": (pcm_bytes // 2) * 1000 // sample_rate,
+        "next_url": chapter.get("next_url"),
+        "prev_url": chapter.get("prev_url"),
+        "paragraphs": chapter.get("content") or [],
+        "timeline": timeline,
+        "source": source,
+    }
+
+
+class _Checkpoint:
+    """Per-chapter work directory: `audio.pcm` plus `timeline.jsonl`.
+
+    Audio is written and synced before its timeline line, so on reopen the
+    timeline is the source of truth and any audio past it is cut off.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.mkdir(parents=True, exist_ok=True)
+        self.audio_path = path / "audio.pcm"
+        self.timeline_path = path / "timeline.jsonl"
+        self.timeline: List[dict] = []
+        try:
+            lines = self.timeline_path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            try:
+                self.timeline.append(json.loads(line))
+            except ValueError:
+                break  # Torn last line from a crash.
+        self.audio_bytes = sum(int(e["chunk_bytes"]) for e in self.timeline)
+        with open(self.timeline_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in self.timeline)
+        with open(self.audio_path, "ab") as f:
+            f.truncate(self.audio_bytes)
+
+    def last_position(self) -> Optional[tuple]:
+        if not self.timeline:
+            return None
+        e = self.timeline[-1]
+        return (e["paragraph_index"], e["sentence_index"])
+
+    def append(self, entry: dict, pcm: bytes) -> None:
+        with open(self.audio_path, "ab") as f:
+            f.write(pcm)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.timeline_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+        self.timeline.append(entry)
+        self.audio_bytes += len(pcm)
+
+    def read_audio(self) -> bytes:
+        return self.audio_path.read_bytes()
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class RenderQueue:
+    """SQLite-backed job queue rendered by `slots` worker tasks.
+
+    `get_tts` returns the TTS engine (or None while it is unavailable) and
+    `scrape` returns a parsed chapter dict for a URL. Database statements
+    run in worker threads (asyncio.to_thread) under `_lock`; only start()
+    touches the database on the event loop, before any slot runs.
+    """
+
+    def __init__(
+        self,
+        root: str | Path = RENDER_DIR,
+        *,
+        slots: int = RENDER_SLOTS,
+        get_tts: Callable[[], Awaitable[Any]],
+        scrape: Callable[[str], Awaitable[dict]],
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.artifacts = ArtifactStore(self.root / "audio")
+        self.slots = max(1, int(slots))
+        self._get_tts = get_tts
+        self._scrape = scrape
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "jobs.db"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                novel_url TEXT NOT NULL,
+                voice TEXT NOT NULL,
+                speed REAL NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chapters (
+                job_id TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                status TEXT NOT NULL,
+                sentences_done INTEGER NOT NULL DEFAULT 0,
+                sentence_total INTEGER,
+                artifact TEXT,
+                error TEXT,
+                PRIMARY KEY (job_id, n)
+            );
+            CREATE INDEX IF NOT EXISTS chapters_status ON chapters (status);
+            """
+        )
+        self._db.commit()
+        self._wake = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self._cancel_events: Dict[tuple, asyncio.Event] = {}
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self) -> None:
+        # Chapters left running by a previous process resume from their checkpoint.
+        self._db.execute("UPDATE chapters SET status = 'pending' WHERE status = 'running'")
+        self._db.commit()
+        self._workers = [asyncio.create_task(self._slot(i)) for i in range(self.slots)]
+        self._wake.set()
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        with self._lock:
+            self._db.close()
+
+    # -- API -----------------------------------------------------------------
+
+    async def submit(self, novel_url: str, chapters: List[dict], voice: str, speed: float) -> dict:
+        """Queue `chapters` (dicts with n, url, title) and return the job."""
+        job = await asyncio.to_thread(self._submit, novel_url, chapters, voice, speed)
+        self._wake.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def list(self, limit: int = 50) -> List[dict]:
+        return await asyncio.to_thread(self._list, limit)
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        job = await asyncio.to_thread(self._cancel, job_id)
+        if job is not None:
+            for (jid, _), event in self._cancel_events.items():
+                if jid == job_id:
+                    event.set()
+        return job
+
+    async def artifact(self, job_id: str, n: int) -> Optional[tuple]:
+        """(key, metadata) of a finished chapter of a job, or None."""
+        return await asyncio.to_thread(self._artifact, job_id, n)
+
+    # -- database (worker threads) ---------------------------------------------
+
+    def _submit(self, novel_url: str, chapters: List[dict], voice: str, speed: float) -> dict:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, novel_url, voice, speed, status, created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, novel_url, voice, float(speed), now, now),
+            )
+            self._db.executemany(
+                "INSERT INTO chapters (job_id, n, url, title, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(job_id, int(c["n"]), c["url"], c.get("title")) for c in chapters],
+            )
+            self._db.commit()
+        return self._get(job_id)
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            rows = self._db.execute("SELECT * FROM chapters WHERE job_id = ? ORDER BY n", (job_id,)).fetchall()
+        chapters = [
+            {
+                "n": r["n"],
+                "url": r["url"],
+                "title": r["title"],
+                "status": r["status"],
+                "sentences_done": r["sentences_done"],
+                "sentence_total": r["sentence_total"],
+                "error": r["error"],
+            }
+            for r in rows
+        ]
+        return {
+            "job_id": job["id"],
+            "novel_url": job["novel_url"],
+            "voice": job["voice"],
+            "speed": job["speed"],
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+            "chapters_done": sum(1 for c in chapters if c["status"] == "done"),
+            "chapters": chapters,
+        }
+
+    def _list(self, limit: int) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (int(limit),)).fetchall()
+        return [job for job in (self._get(r["id"]) for r in rows) if job is not None]
+
+    def _cancel(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+                return None
+            self._db.execute(
+                "UPDATE chapters SET status = 'cancelled' WHERE job_id = ? AND status IN ('pending', 'running')", (job_id,)
+            )
+            self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            )
+            self._db.commit()
+        return self._get(job_id)
+
+    def _artifact(self, job_id: str, n: int) -> Optional[tuple]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT artifact FROM chapters WHERE job_id = ? AND n = ? AND status = 'done'", (job_id, int(n))
+            ).fetchone()
+        if row is None or not row["artifact"]:
+            return None
+        meta = self.artifacts.get(row["artifact"])
+        return (row["artifact"], meta) if meta is not None else None
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        with self._lock:
+            row = self._db.execute(
+                """
+                SELECT c.job_id, c.n, c.url, j.voice, j.speed FROM chapters c JOIN jobs j ON j.id = c.job_id
+                WHERE c.status = 'pending' AND j.status IN ('queued', 'running')
+                ORDER BY j.created_at, c.n LIMIT 1
+                """
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE chapters SET status = 'running' WHERE job_id = ? AND n = ?", (row["job_id"], row["n"]))
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), row["job_id"]),
+            )
+            self._db.commit()
+            return row
+
+    def _finish(self, job_id: str, n: int, status: str, artifact: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE chapters SET status = ?, artifact = ?, error = ? WHERE job_id = ? AND n = ? AND status = 'running'",
+                (status, artifact, error, job_id, n),
+            )
+            counts = dict(
+                self._db.execute("SELECT status, COUNT(*) FROM chapters WHERE job_id = ? GROUP BY status", (job_id,)).fetchall()
+            )
+            if not counts.get("pending") and not counts.get("running"):
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                    ("failed" if counts.get("failed") else "done", time.time(), job_id),
+                )
+            self._db.commit()
+
+    def _set_progress(self, job_id: str, n: int, done: int, total: int) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE chapters SET sentences_done = ?, sentence_total = ? WHERE job_id = ? AND n = ?",
+                (done, total, job_id, n),
+            )
+            self._db.commit()
+
+    # -- workers -------------------------------------------------------------
+
+    async def _slot(self, index: int) -> None:
+        while True:
+            if await self._get_tts() is None:
+                await asyncio.sleep(_TTS_RETRY_S)
+                continue
+            row = await asyncio.to_thread(self._claim)
+            if row is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            job_id, n = row["job_id"], row["n"]
+            cancel_event = self._cancel_events[(job_id, n)] = asyncio.Event()
+            try:
+                key = await self._render_chapter(row, cancel_event)
+            except asyncio.CancelledError:
+                # Shutdown: leave the chapter running; start() requeues it.
+                raise
+            except Exception as e:
+                logger.warning("Render of %s (job %s) failed: %s", row["url"], job_id, e)
+                await asyncio.to_thread(self._finish, job_id, n, "failed", None, str(e))
+            else:
+                if key is not None:
+                    await asyncio.to_thread(self._finish, job_id, n, "done", key)
+            finally:
+                self._cancel_events.pop((job_id, n), None)
+            self._wake.set()  # Other slots may pick up the next chapter.
+
+    async def _render_chapter(self, row: sqlite3.Row, cancel_event: asyncio.Event) -> Optional[str]:
+        """Render one chapter; returns its artifact key, or None if cancelled."""
+        job_id, n, url, voice, speed = row["job_id"], row["n"], row["url"], row["voice"], float(row["speed"])
+        tts = await self._get_tts()
+        try:
+            available = tts.list_voices()
+            if available and voice not in available:
+                voice = available[0]
+        except Exception:
+            pass
+
+        last_write = 0.0
+
+        async def progress(done: int, total: int) -> None:
+            nonlocal last_write
+            now = time.monotonic()
+            if done < total and now - last_write < _PROGRESS_INTERVAL_S:
+                return
+            last_write = now
+            await asyncio.to_thread(self._set_progress, job_id, n, done, total)
+
+        return await render_chapter(
+            tts, self.artifacts, self.root / "work", url, voice, speed, cancel_event, scrape=self._scrape, progress=progress
+        )
+
+
+async def render_chapter(
+    tts: Any,
+    artifacts: ArtifactStore,
+    work_root: Path,
+    url: str,
+    voice: str,
+    speed: float,
+    cancel_event: asyncio.Event,
+    *,
+    scrape: Callable[[str], Awaitable[dict]],
+    progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    source: str = "job",
+) -> Optional[str]:
+    """Render a chapter into `artifacts`, checkpointing under `work_root`.
+
+    Returns the artifact key, or None if `cancel_event` stopped it (the
+    checkpoint is kept, so the next render of the same key resumes). An
+    existing artifact is reused; `source` is recorded in new artifacts and
+    a reused "prerender" artifact is claimed for `source`.
+    """
+    key = artifact_key(url, voice, speed)
+    # Renders of the same chapter run once; the others wait and reuse it.
+    async with artifacts.lock(key):
+        meta = await asyncio.to_thread(artifacts.get, key)
+        if meta is not None:
+            if meta.get("source") == "prerender" and source != "prerender":
+                await asyncio.to_thread(artifacts.put_meta, key, {**meta, "source": source})
+            return key
+
+        chapter = await scrape(url)
+        paragraphs = chapter.get("content") or []
+        segments = tts.split_paragraphs_with_offsets(paragraphs)
+        checkpoint = await asyncio.to_thread(_Checkpoint, work_root / key)
+        start = (0, 0)
+        last = checkpoint.last_position()
+        if last is not None:
+            later = [seg for seg in segments if (seg[0], seg[1]) > last]
+            start = (later[0][0], later[0][1]) if later else (len(paragraphs), 0)
+            logger.info("Resuming %s at %s (%d sentences done)", url, start, len(checkpoint.timeline))
+
+        if progress is not None:
+            await progress(len(checkpoint.timeline), len(segments))
+        sample_rate = tts.sample_rate
+        async for p_idx, s_idx, sentence, pcm, cs, ce in tts.generate_audio_stream_paragraphs_sentence_chunks(
+            paragraphs,
+            voice=voice,
+            speed=speed,
+            cancel_event=cancel_event,
+            segments=segments,
+            start=start,
+        ):
+            if cancel_event.is_set():
+                break
+            entry = {
+                "text": sentence,
+                "paragraph_index": int(p_idx),
+                "sentence_index": int(s_idx),
+                "ms_start": (checkpoint.audio_bytes // 2) * 1000 // sample_rate,
+                "char_start": int(cs),
+                "char_end": int(ce),
+                "chunk_samples": len(pcm) // 2,
+                "chunk_bytes": len(pcm),
+            }
+            await asyncio.to_thread(checkpoint.append, entry, pcm)
+            if progress is not None:
+                await progress(len(checkpoint.timeline), len(segments))
+        if cancel_event.is_set():
+            return None
+        # Never store a partial chapter; the checkpoint stays for a resume.
+        expected = sum(1 for seg in segments if seg[2])
+        if len(checkpoint.timeline) != expected:
+            raise RuntimeError(f"Rendered {len(checkpoint.timeline)} of {expected} sentences")
+
+        pcm = await asyncio.to_thread(checkpoint.read_audio)
+        audio = await asyncio.to_thread(tts.encode_pcm16_to_flac, pcm, sample_rate=sample_rate)
+        meta = chapter_artifact_meta(
+            chapter,
+            url,
+            voice,
+            speed,
+            encoding="flac" if audio[:4] == b"fLaC" else "pcm_s16le",
+            sample_rate=sample_rate,
+            pcm_bytes=len(pcm),
+            timeline=checkpoint.timeline,
+            source=source,
+        )
+        await asyncio.to_thread(artifacts.put, key, audio, meta)
+        await asyncio.to_thread(checkpoint.remove)
+        return key
@@ -1,22 +1,154 @@
+import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import logging
 import re
+from typing import Optional
 from urllib.parse import urljoin
 
+from chapter_store import ChapterStore, StoredChapter, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Best-effort chapter number from visible text, then from the URL, e.g.
+# /chapter/<Novel>-Chapter-15/<id>/ or .../Chapter_15/... etc.
+_TITLE_CHAPTER_NUMBER = re.compile(r"(?:\bChapter\b|\bCh\.?\b|\bC\b)\s*(\d+)", re.IGNORECASE)
+_URL_CHAPTER_NUMBER = re.compile(r"(?:chapter|ch)[^0-9]{0,12}(\d+)", re.IGNORECASE)
+
+
+def parse_chapter_number(title: str, url: str) -> int | None:
+    for pattern, text in ((_TITLE_CHAPTER_NUMBER, (title or '').strip()), (_URL_CHAPTER_NUMBER, url or '')):
+        m = pattern.search(text)
+        if m:
+            n = int(m.group(1))
+            return n if n > 0 else None
+    return None
+
+
+def chapter_sort_key(item: dict) -> tuple:
+    """Sort by chapter number when possible, but preserve stable ordering
+    for unknowns (avoid pushing an unparsed Chapter 1 to the end)."""
+    n = item.get('n')
+    if isinstance(n, int):
+        return (0, n)
+    return (1, 0)
+
+
+def parse_novel_page(html: str, novel_url: str, known: Optional[set] = None, stop_after: int = 8) -> dict:
+    """Title, cover URL and chapter links (in document order) of a novel page.
+
+    Only <title>, <img> and <a> tags are parsed. With `known` (URLs already
+    indexed), known links are left out and the scan stops after `stop_after`
+    consecutive known links; "stopped_early" reports whether it did. That is
+    only safe on pages that list chapters newest first.
+    """
+    soup = BeautifulSoup(html, 'lxml', parse_only=SoupStrainer(['title', 'img', 'a']))
+
+    title = None
+    t = soup.find('title')
+    if t:
+        raw = t.get_text(strip=True)
+        if raw:
+            title = raw.split(' - Novel Cool', 1)[0].strip() or raw
+
+    cover_url = None
+    img = soup.select_one('img.bookinfo-pic-img')
+    if not img:
+        img = soup.select_one('img[itemprop="image"]')
+    if img:
+        src = img.get('src')
+        if src:
+            cover_url = urljoin(novel_url, src)
+
+    links = []
+    seen = set()
+    known_run = 0
+    stopped_early = False
+    for a in soup.find_all('a', href=True):
+        href = a.get('href')
+        if not href:
+            continue
+        if '/chapter/' not in href:
+            continue
+        abs_url = urljoin(novel_url, href)
+        if abs_url in seen:
+            continue
+        title_text = a.get_text(' ', strip=True)
+        if not title_text:
+            # Some chapter links have empty text (icons). Skip but do NOT
+            # mark as seen — the real link with text may appear later.
+            continue
+        seen.add(abs_url)
+        if known is not None and abs_url in known:
+            known_run += 1
+            if known_run >= stop_after:
+                stopped_early = True
+                break
+            continue
+        known_run = 0
+        links.append({"n": parse_chapter_number(title_text, abs_url), "title": title_text, "url": abs_url})
+    return {"title": title, "cover_url": cover_url, "chapters": links, "stopped_early": stopped_early}
+
 
 class NovelCoolScraper:
-    def __init__(self):
+    def __init__(self, store: Optional[ChapterStore] = None):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.store = store
+        # One pooled session (keep-alive connections) for all requests.
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     async def scrape_chapter(self, url: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self.headers) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to fetch page: {response.status}")
-                html = await response.text()
+        """Return the parsed chapter, from the chapter store while it is fresh.
 
+        Stale records are revalidated with the page's ETag/Last-Modified, and
+        served as-is if the site cannot be reached.
+        """
+        if self.store is None:
+            chapter, _, _ = await self._fetch_chapter(url)
+            return chapter
+
+        stored = await asyncio.to_thread(self.store.get, url)
+        if stored is not None and stored.is_fresh():
+            self.store.record("hit")
+            return stored.chapter
+        try:
+            chapter, etag, last_modified = await self._fetch_chapter(url, stored)
+        except Exception as e:
+            if stored is None:
+                raise
+            logger.warning(f"Serving stored chapter, refresh failed: {e}")
+            self.store.record("stale")
+            return stored.chapter
+        if chapter is None:
+            await asyncio.to_thread(self.store.touch, url)
+            self.store.record("revalidated")
+            return stored.chapter
+        self.store.record("miss")
+        await asyncio.to_thread(self.store.put, url, chapter, etag=etag, last_modified=last_modified)
+        return chapter
+
+    async def _fetch_chapter(self, url: str, stored: Optional[StoredChapter] = None):
+        """Fetch and parse a chapter page; (None, None, None) if `stored` is still current."""
+        html, etag, last_modified = await self.fetch_page(
+            url, stored.etag if stored else None, stored.last_modified if stored else None
+        )
+        if html is None:
+            return None, None, None
+        return self._parse_chapter(html, url), etag, last_modified
+
+    def _parse_chapter(self, html: str, url: str) -> dict:
         # NovelCool pages can be large; lxml parser is more reliable here.
         soup = BeautifulSoup(html, 'lxml')
 
@@ -90,75 +222,53 @@ class NovelCoolScraper:
         if prev_link:
             prev_link = urljoin(url, prev_link)
 
-        return {
+        chapter = {
             "title": title,
             "content": paragraphs, # Return list of paragraphs for easier chunking
             "next_url": next_link,
             "prev_url": prev_link
         }
+        chapter["content_hash"] = content_hash(chapter)
+        return chapter
 
-    async def scrape_novel_index(self, novel_url: str):
-        """Scrape a NovelCool novel page and return a list of chapter links."""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(novel_url, headers=self.headers) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to fetch page: {response.status}")
-                html = await response.text()
+    async def fetch_page(
+        self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> tuple[Optional[str], Optional[str], Optional[str]]:
+        """GET a page as (html, etag, last_modified).
 
-        soup = BeautifulSoup(html, 'lxml')
-        links = []
-        seen = set()
-
-        def parse_chapter_number(title: str, url: str) -> int | None:
-            t = (title or '').strip()
-            # Best-effort chapter number parsing from visible text.
-            m = re.search(r"(?:\bChapter\b|\bCh\.?\b|\bC\b)\s*(\d+)", t, flags=re.IGNORECASE)
-            if m:
-                try:
-                    n = int(m.group(1))
-                    return n if n > 0 else None
-                except Exception:
-                    pass
-
-            # Fallback: parse from URL, e.g.
-            # /chapter/<Novel>-Chapter-15/<id>/ or .../Chapter_15/... etc.
-            u = (url or '')
-            m = re.search(r"(?:chapter|ch)[^0-9]{0,12}(\d+)", u, flags=re.IGNORECASE)
-            if m:
-                try:
-                    n = int(m.group(1))
-                    return n if n > 0 else None
-                except Exception:
-                    pass
-            return None
+        With validators from an earlier fetch, html is None when the server
+        answers 304 Not Modified.
+        """
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        async with self._get_session().get(url, headers=headers) as response:
+            if response.status == 304 and (etag or last_modified):
+                return None, etag, last_modified
+            if response.status != 200:
+                raise Exception(f"Failed to fetch page: {response.status}")
+            html = await response.text()
+            return html, response.headers.get("ETag"), response.headers.get("Last-Modified")
 
-        for a in soup.find_all('a', href=True):
-            href = a.get('href')
-            if not href:
-                continue
-            if '/chapter/' not in href:
-                continue
-            abs_url = urljoin(novel_url, href)
-            if abs_url in seen:
-                continue
-            title = a.get_text(' ', strip=True)
-            if not title:
-                # Some chapter links have empty text (icons). Skip but do NOT
-                # mark as seen — the real link with text may appear later.
-                continue
-            seen.add(abs_url)
-            n = parse_chapter_number(title, abs_url)
-            links.append({"n": n, "title": title, "url": abs_url})
-
-        # Sort by chapter number when possible, but preserve stable ordering
-        # for unknowns (avoid pushing an unparsed Chapter 1 to the end).
-        def chapter_key(item):
-            n = item.get('n')
-            if isinstance(n, int):
-                return (0, n)
-            return (1, 0)
-
-        links.sort(key=chapter_key)
+    async def fetch_bytes(self, url: str, max_bytes: int) -> tuple[bytes, Optional[str]]:
+        """GET a binary resource (e.g. a cover image) as (body, content type)."""
+        async with self._get_session().get(url, headers=self.headers) as response:
+            if response.status != 200:
+                raise Exception(f"Failed to fetch {url}: {response.status}")
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                body += chunk
+                if len(body) > max_bytes:
+                    raise Exception(f"{url} is larger than {max_bytes} bytes")
+            return bytes(body), response.headers.get("Content-Type")
+
+    async def scrape_novel_index(self, novel_url: str):
+        """Scrape a NovelCool novel page and return a list of chapter links."""
+        html, _, _ = await self.fetch_page(novel_url)
+        links = parse_novel_page(html, novel_url)["chapters"]
+        links.sort(key=chapter_sort_key)
         return links
 
     async def scrape_novel_details(self, novel_url: str):
@@ -168,42 +278,26 @@ class NovelCoolScraper:
         - title: best-effort title
         - cover_url: absolute URL to the cover image, when detectable
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(novel_url, headers=self.headers) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to fetch page: {response.status}")
-                html = await response.text()
-
-        soup = BeautifulSoup(html, 'lxml')
-
-        title = None
-        t = soup.find('title')
-        if t:
-            raw = t.get_text(strip=True)
-            if raw:
-                title = raw.split(' - Novel Cool', 1)[0].strip() or raw
-
-        cover_url = None
-        img = soup.select_one('img.bookinfo-pic-img')
-        if not img:
-            img = soup.select_one('img[itemprop="image"]')
-        if img:
-            src = img.get('src')
-            if src:
-                cover_url = urljoin(novel_url, src)
-
+        html, _, _ = await self.fetch_page(novel_url)
+        page = parse_novel_page(html, novel_url)
         return {
-            "title": title,
-            "cover_url": cover_url,
+            "title": page["title"],
+            "cover_url": page["cover_url"],
         }
 
 if __name__ == "__main__":
-    import asyncio
     scraper = NovelCoolScraper()
     # Test with user provided URL
     url = "https://www.novelcool.com/chapter/Shadow-Slave-Chapter-15/7332162/"
+
+    async def main():
+        try:
+            return await scraper.scrape_chapter(url)
+        finally:
+            await scraper.close()
+
     try:
-        result = asyncio.run(scraper.scrape_chapter(url))
+        result = asyncio.run(main())
         print(f"Title: {result['title']}")
         print(f"Paragraphs: {len(result['content'])}")
         print(f"Next: {result['next_url']}")
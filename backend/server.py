@@ -1,44 +1,198 @@
+import time
+
+# Process start reference for the startup timeline (see /health).
+_PROCESS_T0 = time.monotonic()
+
 import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import BaseModel
+import hmac
 import json
 import asyncio
 import logging
+import os
+from framing import FRAME_VERSION, FRAME_VERSION_STREAM, encode_sentence_frame
 from scraper import NovelCoolScraper
-from tts import TTSEngine
 import traceback
+from urllib.parse import urlencode
+from priority import synthesis_priority
+from admission import DEGRADED_PRIORITY, AdmissionController, Overloaded
+from chapter_store import ChapterStore
+import debug
+from covers import CoverCache
+from novel_index import NOVEL_INDEX_REVALIDATE_S, NovelIndexes, chapters_since
+from prerender import PRERENDER, Prerenderer, novel_key
+from render_jobs import RenderQueue, artifact_key, chapter_artifact_meta
+from ws_mux import CONTROL_COMMANDS, MuxConnection, MuxStream
 from contextlib import asynccontextmanager
-import time
 
 # Serialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How long a TTS request waits for background engine initialization before
+# giving up with an error (the engine keeps loading for later requests).
+TTS_INIT_TIMEOUT_S = float(os.getenv("TTS_INIT_TIMEOUT_S", "60") or "60")
+
+# Multiplexed WebSocket streams: concurrent streams allowed per connection,
+# and the default priority of live playback (other streams default to 1).
+WS_MAX_STREAMS = int(os.getenv("WS_MAX_STREAMS", "8") or "8")
+WS_LIVE_PRIORITY = int(os.getenv("WS_LIVE_PRIORITY", "4") or "4")
+WS_MAX_STREAM_ID = 0xFFFFFFFF
+
+# Largest chapter range accepted by POST /render_jobs.
+RENDER_MAX_CHAPTERS = int(os.getenv("RENDER_MAX_CHAPTERS", "500") or "500")
+
+
+def _startup_mark(name: str) -> None:
+    """Record a startup milestone in ms since process start."""
+    timeline = getattr(app.state, "startup_timeline", None)
+    if timeline is None:
+        timeline = {}
+        app.state.startup_timeline = timeline
+    timeline[name] = int((time.monotonic() - _PROCESS_T0) * 1000)
+
+
+def _init_tts_engine():
+    """Import the TTS stack and build the engine (runs in a worker thread).
+
+    `tts` pulls in onnxruntime and kokoro_onnx, so it is only imported here,
+    off the event loop and after the server is already accepting requests.
+    """
+    logger.info("Initializing TTS Engine...")
+    _startup_mark("tts_import_start_ms")
+    if getattr(app.state, "worker_pool", None) is not None:
+        # Split deployment: synthesis runs on remote workers, no model here.
+        from worker_pool import RemoteTTSEngine
+
+        engine = RemoteTTSEngine(app.state.worker_pool)
+        _startup_mark("tts_ready_ms")
+        logger.info(f"Using {len(app.state.worker_pool.workers)} remote synthesis workers")
+        return engine
+    from tts import TTSEngine
+
+    try:
+        import onnxruntime as ort
+
+        logger.info(f"ONNX Runtime providers: {ort.get_available_providers()}")
+    except Exception:
+        pass
+    _startup_mark("tts_import_done_ms")
+    engine = TTSEngine()
+    _startup_mark("tts_ready_ms")
+    logger.info(f"TTS Engine initialized. Startup timeline: {app.state.startup_timeline}")
+    return engine
+
+
+def _on_tts_init_done(fut: asyncio.Future) -> None:
+    if fut.cancelled():
+        return
+    exc = fut.exception()
+    if exc is not None:
+        logger.error(f"Failed to initialize TTS Engine: {exc}")
+        app.state.tts_error = str(exc)
+        _startup_mark("tts_failed_ms")
+        return
+    app.state.tts = fut.result()
+
+
+async def _get_tts(timeout_s: float | None = None):
+    """Return the TTS engine, waiting for background initialization if needed.
+
+    Returns None if initialization failed or did not finish within `timeout_s`.
+    """
+    tts = getattr(app.state, "tts", None)
+    if tts is not None:
+        return tts
+    fut = getattr(app.state, "tts_init", None)
+    if fut is None:
+        return None
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(fut), timeout=TTS_INIT_TIMEOUT_S if timeout_s is None else timeout_s
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Timed out waiting for TTS Engine initialization")
+        return None
+    except Exception:
+        return None
+
+
+def _tts_unavailable_message() -> str:
+    if getattr(app.state, "tts_error", None):
+        return "TTS Engine not initialized"
+    return "TTS Engine is still initializing, try again shortly"
+
+
+def _synthesis_capacity() -> tuple:
+    """(RTF, samples, inference slots) of the loaded engine, for admission control."""
+    tts = app.state.tts
+    if tts is None:
+        return None, 0, 1
+    rtf, samples = tts.synthesis_rtf()
+    return rtf, samples, tts.inference_threads
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    try:
-        logger.info("Initializing TTS Engine...")
-        try:
-            import onnxruntime as ort
+    _startup_mark("lifespan_start_ms")
+    app.state.tts = None
+    app.state.tts_error = None
+    app.state.worker_pool = None
+    if os.getenv("TTS_WORKERS"):
+        from worker_pool import TTS_WORKERS, WorkerPool
 
-            logger.info(f"ONNX Runtime providers: {ort.get_available_providers()}")
-        except Exception:
-            pass
-        app.state.tts = TTSEngine()
-        logger.info("TTS Engine initialized.")
-    except Exception as e:
-        logger.error(f"Failed to initialize TTS Engine: {e}")
-        app.state.tts = None
+        app.state.worker_pool = WorkerPool(TTS_WORKERS)
+        await app.state.worker_pool.start()
+    app.state.chapter_store = ChapterStore.from_env()
+    app.state.scraper = NovelCoolScraper(store=app.state.chapter_store)
+    app.state.novel_indexes = NovelIndexes(app.state.scraper, app.state.chapter_store)
+    app.state.covers = CoverCache(lambda url, max_bytes: app.state.scraper.fetch_bytes(url, max_bytes))
 
-    app.state.scraper = NovelCoolScraper()
-    app.state.novel_index_cache = {}
+    # Build the TTS engine in the background so scrape endpoints can answer
+    # immediately on cold starts; TTS requests await `tts_init` via _get_tts().
+    loop = asyncio.get_running_loop()
+    app.state.tts_init = loop.run_in_executor(None, _init_tts_engine)
+    app.state.tts_init.add_done_callback(_on_tts_init_done)
+    app.state.admission = AdmissionController(_synthesis_capacity)
+    # Batch render jobs resume from their on-disk queue once TTS is ready.
+    app.state.render_queue = RenderQueue(get_tts=_get_tts, scrape=lambda url: app.state.scraper.scrape_chapter(url))
+    app.state.render_queue.start()
+    app.state.artifacts = app.state.render_queue.artifacts
+    app.state.prerender = None
+    if PRERENDER:
+        app.state.prerender = Prerenderer(
+            app.state.artifacts,
+            app.state.render_queue.root,
+            get_tts=_get_tts,
+            scrape=lambda url: app.state.scraper.scrape_chapter(url),
+        )
+        app.state.prerender.start()
+    _startup_mark("accepting_requests_ms")
     yield
     # Shutdown
+    if app.state.prerender is not None:
+        await app.state.prerender.stop()
+        app.state.prerender = None
+    await app.state.render_queue.stop()
+    app.state.render_queue = None
+    app.state.artifacts = None
     app.state.tts = None
+    app.state.tts_init = None
+    if app.state.worker_pool is not None:
+        await app.state.worker_pool.close()
+        app.state.worker_pool = None
+    await app.state.scraper.close()
     app.state.scraper = None
-    app.state.novel_index_cache = None
+    app.state.novel_indexes = None
+    app.state.covers = None
+    if app.state.chapter_store is not None:
+        app.state.chapter_store.close()
+        app.state.chapter_store = None
 
 
 app = FastAPI(lifespan=lifespan)
@@ -53,430 +207,961 @@ app.add_middleware(
 
 @app.get("/health")
 async def health():
-    return {"ok": True, "tts_ready": app.state.tts is not None}
+    if app.state.tts is not None:
+        tts_state = "ready"
+    elif app.state.tts_error:
+        tts_state = "failed"
+    else:
+        tts_state = "loading"
+    out = {
+        "ok": True,
+        "tts_ready": app.state.tts is not None,
+        "tts_state": tts_state,
+        "startup": dict(getattr(app.state, "startup_timeline", {}) or {}),
+        # Load balancers: route new listeners elsewhere while
+        # admission.accepting_live is false.
+        "admission": app.state.admission.metrics(),
+    }
+    if app.state.tts is not None:
+        out["model_variant"] = app.state.tts.model_variant
+        out["session_recycle"] = app.state.tts.recycle_metrics()
+        out["phonemes"] = app.state.tts.phoneme_metrics()
+        out["pipeline"] = app.state.tts.pipeline_metrics()
+        out["audio_cache"] = app.state.tts.audio_cache_metrics()
+    if getattr(app.state, "worker_pool", None) is not None:
+        out["workers"] = app.state.worker_pool.metrics()
+    if getattr(app.state, "chapter_store", None) is not None:
+        out["chapter_store"] = app.state.chapter_store.metrics()
+    if getattr(app.state, "prerender", None) is not None:
+        out["prerender"] = app.state.prerender.metrics()
+    if getattr(app.state, "covers", None) is not None:
+        out["covers"] = app.state.covers.metrics()
+    return out
+
+
+def _debug_guard(request: Request) -> None:
+    """404 unless DEBUG_ENDPOINTS=1; with DEBUG_TOKEN set, require X-Debug-Token."""
+    if not debug.DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("x-debug-token", "")
+    if debug.DEBUG_TOKEN and not hmac.compare_digest(token.encode(), debug.DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="invalid debug token")
+
+
+@app.get("/debug/memory")
+async def debug_memory(request: Request):
+    """Process RSS, asyncio tasks and per-connection buffered audio and queues."""
+    _debug_guard(request)
+    return {
+        "process": debug.process_memory(),
+        "asyncio_tasks": len(asyncio.all_tasks()),
+        "tracemalloc": debug.tracing.status(),
+        **debug.connection_report(),
+    }
+
+
+@app.post("/debug/tracemalloc")
+async def debug_tracemalloc_start(request: Request, frames: int = debug.DEBUG_TRACEMALLOC_FRAMES):
+    """Start tracing allocations (or reset the baseline) for later diffs."""
+    _debug_guard(request)
+    return await asyncio.to_thread(debug.tracing.start, max(1, min(frames, 64)))
+
+
+@app.get("/debug/tracemalloc")
+async def debug_tracemalloc_diff(request: Request, top: int = 25, group_by: str = "lineno"):
+    """Top allocation growth since tracing started."""
+    _debug_guard(request)
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        return await asyncio.to_thread(debug.tracing.diff, max(1, min(top, 500)), group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.delete("/debug/tracemalloc")
+async def debug_tracemalloc_stop(request: Request):
+    _debug_guard(request)
+    return debug.tracing.stop()
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 5.0, hz: float = 100.0, threads: str = ""):
+    """Sample all thread stacks (event loop, `tts` inference pool, ...) for
+    `seconds` and return collapsed stacks; `threads` filters by name prefix."""
+    _debug_guard(request)
+    try:
+        stacks = await asyncio.to_thread(debug.sample_stacks, max(0.1, seconds), max(1.0, min(hz, 1000.0)), threads)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
 
 
 @app.get("/voices")
 async def voices():
-    if not app.state.tts:
-        return {"voices": [], "error": "TTS Engine not initialized"}
-    return {"voices": app.state.tts.list_voices()}
+    tts = await _get_tts()
+    if not tts:
+        return {"voices": [], "error": _tts_unavailable_message()}
+    return {"voices": tts.list_voices(), "details": tts.voice_index()}
 
 
 @app.get("/novel_index")
-async def novel_index(url: str):
+async def novel_index(url: str, since: int | None = None):
+    """Chapter list of a novel, revalidated when older than
+    NOVEL_INDEX_REVALIDATE_S. With `since`, only numbered chapters after
+    chapter `since` are returned."""
     if not url:
         return {"chapters": [], "error": "url is required"}
-    chapters = await app.state.scraper.scrape_novel_index(url)
-    return {"chapters": chapters}
+    chapters = await app.state.novel_indexes.get(url, max_age_s=NOVEL_INDEX_REVALIDATE_S)
+    return {
+        "chapters": chapters if since is None else chapters_since(chapters, since),
+        "count": len(chapters),
+        "latest": _latest_chapter(chapters),
+    }
 
 
 @app.get("/novel_details")
 async def novel_details(url: str):
     if not url:
         return {"title": None, "cover_url": None, "error": "url is required"}
-    details = await app.state.scraper.scrape_novel_details(url)
-    return details
+    page = await app.state.novel_indexes.get_page(url)
+    return {
+        "title": page.get("title"),
+        "cover_url": page.get("cover_url"),
+        "cover_thumb_url": "/novel_cover?" + urlencode({"url": url}) if page.get("cover_url") else None,
+    }
 
 
-async def _get_cached_novel_index(novel_url: str):
-    """Return cached chapter list for a novel URL, scraping once per TTL."""
-    if not novel_url:
-        raise HTTPException(status_code=400, detail="url is required")
+@app.get("/novel_cover")
+async def novel_cover(request: Request, url: str, w: int | None = None):
+    """Cover thumbnail of a novel, at least `w` pixels wide (bucketed)."""
+    page = await app.state.novel_indexes.get_page(url)
+    cover_url = page.get("cover_url")
+    if not cover_url:
+        raise HTTPException(status_code=404, detail="novel has no cover")
+    try:
+        path = await app.state.covers.get(cover_url, w)
+        st = path.stat()
+    except Exception as e:
+        logger.warning(f"Cover of {url} unavailable: {e}")
+        raise HTTPException(status_code=502, detail="cover unavailable")
+    # Names derive from the cover URL, so a changed cover gets a new ETag.
+    etag = f'"{path.stem}-{st.st_size:x}"'
+    headers = {"etag": etag, "cache-control": "public, max-age=604800"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=app.state.covers.media_type(path), headers=headers, stat_result=st)
+
 
-    cache = app.state.novel_index_cache
-    if cache is None:
-        cache = {}
-        app.state.novel_index_cache = cache
+def _latest_chapter(chapters: list) -> int | None:
+    numbers = [c["n"] for c in chapters if isinstance(c, dict) and isinstance(c.get("n"), int)]
+    return max(numbers) if numbers else None
 
-    ttl_s = 30 * 60  # 30 minutes
-    now = time.monotonic()
-    entry = cache.get(novel_url)
-    if entry is not None:
-        age = now - float(entry.get("ts", 0.0))
-        if age < ttl_s:
-            return entry.get("chapters") or []
 
-    chapters = await app.state.scraper.scrape_novel_index(novel_url)
-    cache[novel_url] = {"ts": now, "chapters": chapters}
-    return chapters
+async def _get_cached_novel_index(novel_url: str):
+    """Return the chapter list for a novel URL, refreshed once per TTL."""
+    if not novel_url:
+        raise HTTPException(status_code=400, detail="url is required")
+    return await app.state.novel_indexes.get(novel_url)
 
 
 @app.get("/novel_meta")
 async def novel_meta(url: str):
     chapters = await _get_cached_novel_index(url)
-    max_n = 0
-    for c in chapters:
-        try:
-            n = c.get("n") if isinstance(c, dict) else None
-            if isinstance(n, int) and n > max_n:
-                max_n = n
-        except Exception:
-            pass
-    return {"count": max_n if max_n > 0 else len(chapters)}
+    return {"count": _latest_chapter(chapters) or len(chapters)}
 
 
-@app.get("/novel_chapter")
-async def novel_chapter(url: str, n: int):
-    chapters = await _get_cached_novel_index(url)
-    # Prefer resolving by parsed chapter number, not list position.
-    resolved: dict | None = None
+def _resolve_chapters(chapters: list, first: int, last: int) -> list[dict]:
+    """Chapters numbered first..last as {n, title, url}, by parsed number.
+
+    Numbers missing from the parsed list fall back to list position.
+    """
+    by_n: dict[int, dict] = {}
     max_n = 0
     for c in chapters:
         if not isinstance(c, dict):
             continue
         cn = c.get("n")
-        if isinstance(cn, int) and cn > max_n:
-            max_n = cn
-        if isinstance(cn, int) and cn == n:
-            resolved = c
-            break
+        if isinstance(cn, int):
+            max_n = max(max_n, cn)
+            by_n.setdefault(cn, c)
 
     limit = max_n if max_n > 0 else len(chapters)
-    if n < 1 or n > limit:
+    if first < 1 or last > limit or first > last:
         raise HTTPException(status_code=400, detail=f"chapter n must be between 1 and {limit}")
 
-    if resolved is None:
-        # Fallback: old positional behavior.
-        item = chapters[n - 1] if (n - 1) < len(chapters) else {}
-    else:
-        item = resolved
-    return {"n": n, "title": item.get("title"), "url": item.get("url")}
+    out = []
+    for n in range(first, last + 1):
+        # Prefer resolving by parsed chapter number, not list position.
+        item = by_n.get(n)
+        if item is None:
+            # Fallback: old positional behavior.
+            item = chapters[n - 1] if (n - 1) < len(chapters) else {}
+        out.append({"n": n, "title": item.get("title"), "url": item.get("url")})
+    return out
+
+
+@app.get("/novel_chapter")
+async def novel_chapter(url: str, n: int):
+    chapters = await _get_cached_novel_index(url)
+    return _resolve_chapters(chapters, n, n)[0]
+
+
+class RenderJobRequest(BaseModel):
+    url: str
+    first: int
+    last: int | None = None
+    voice: str = "af_bella"
+    speed: float = 1.0
+
+
+@app.post("/render_jobs")
+async def create_render_job(req: RenderJobRequest):
+    """Queue chapters first..last of a novel for background rendering."""
+    last = req.first if req.last is None else req.last
+    if last - req.first + 1 > RENDER_MAX_CHAPTERS:
+        raise HTTPException(status_code=400, detail=f"at most {RENDER_MAX_CHAPTERS} chapters per job")
+    # The engine (Kokoro, or the stretch mode) only renders 0.5x-2.0x.
+    if not 0.5 <= req.speed <= 2.0:
+        raise HTTPException(status_code=400, detail="speed must be between 0.5 and 2.0")
+    chapters = _resolve_chapters(await _get_cached_novel_index(req.url), req.first, last)
+    if not all(c["url"] for c in chapters):
+        raise HTTPException(status_code=400, detail="some chapters in the range have no URL")
+    return await app.state.render_queue.submit(req.url, chapters, req.voice, req.speed)
+
+
+@app.get("/render_jobs")
+async def list_render_jobs(limit: int = 50):
+    return {"jobs": await app.state.render_queue.list(limit)}
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    cancel_event = asyncio.Event()
 
+@app.get("/render_jobs/{job_id}")
+async def get_render_job(job_id: str):
+    job = await app.state.render_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@app.delete("/render_jobs/{job_id}")
+async def cancel_render_job(job_id: str):
+    job = await app.state.render_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@app.get("/render_jobs/{job_id}/chapters/{n}")
+async def get_render_job_chapter(job_id: str, n: int):
+    """Timeline and metadata of a rendered chapter (audio at `.../audio`)."""
+    found = await app.state.render_queue.artifact(job_id, n)
+    if found is None:
+        raise HTTPException(status_code=404, detail="chapter not rendered")
+    _, meta = found
+    return {**meta, "audio_url": f"/render_jobs/{job_id}/chapters/{n}/audio"}
+
+
+@app.api_route("/render_jobs/{job_id}/chapters/{n}/audio", methods=["GET", "HEAD"])
+async def get_render_job_audio(request: Request, job_id: str, n: int):
+    found = await app.state.render_queue.artifact(job_id, n)
+    if found is None:
+        raise HTTPException(status_code=404, detail="chapter not rendered")
+    key, meta = found
+    return _artifact_response(request, key, meta)
+
+
+def _chapter_audio_url(url: str, voice: str, speed: float) -> str:
+    return "/chapter_audio?" + urlencode({"url": url, "voice": voice, "speed": speed})
+
+
+def _artifact_response(request: Request, key: str, meta: dict) -> Response:
+    """Serve a rendered chapter file with an ETag, conditional GET and Range.
+
+    FileResponse answers Range/If-Range itself and hands the file to the
+    server through the ASGI pathsend extension (zero-copy) when the server
+    offers it, otherwise it streams the file in chunks.
+    """
+    path = app.state.artifacts.audio_path(key)
     try:
-        while True:
-            data = await websocket.receive_text()
-            try:
-                message = json.loads(data)
-                command = message.get("command")
-                
-                if command == "scrape":
-                    url = message.get("url")
-                    if not url:
-                        await websocket.send_json({"error": "URL is required"})
-                        continue
-                        
-                    logger.info(f"Scraping URL: {url}")
-                    try:
-                        result = await app.state.scraper.scrape_chapter(url)
-                        await websocket.send_json({"type": "scrape_result", "data": result})
-                    except Exception as e:
-                         logger.error(f"Scrape error: {e}")
-                         await websocket.send_json({"type": "error", "message": str(e)})
-
-                elif command == "tts":
-                    text = message.get("text")
-                    voice = message.get("voice", "af_bella")
-                    speed = message.get("speed", 1.0)
-                    
-                    if not text:
-                        await websocket.send_json({"error": "Text is required"})
-                        continue
-                        
-                    logger.info(f"Streaming TTS for text length: {len(text)}")
-                    if not app.state.tts:
-                         await websocket.send_json({"error": "TTS Engine not initialized"})
-                         continue
-
-                    # Ensure voice is valid for the loaded voice pack.
-                    try:
-                        available = app.state.tts.list_voices()
-                        if available and voice not in available:
-                            voice = available[0]
-                    except Exception:
-                        pass
+        st = path.stat()
+    except OSError:
+        raise HTTPException(status_code=404, detail="chapter not rendered")
+    etag = f'"{key}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {"etag": etag, "cache-control": "public, max-age=86400"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    ):
+        return Response(status_code=304, headers=headers)
+    media_type = "audio/flac" if meta.get("encoding") == "flac" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=st)
 
-                    # Stream audio
-                    try:
-                        async for _, audio_chunk in app.state.tts.generate_audio_stream(
-                            text,
-                            voice=voice,
-                            speed=float(speed),
-                            prefetch_sentences=3,
-                            frame_ms=200,
-                            cancel_event=cancel_event,
-                        ):
-                            await websocket.send_bytes(audio_chunk)
-                        
-                        await websocket.send_json({"type": "tts_complete"})
-                    except Exception as e:
-                        logger.error(f"TTS error: {e}")
-                        await websocket.send_json({"type": "error", "message": str(e)})
-
-                elif command == "play":
-                    # Single-shot: scrape the chapter, then stream it sentence-by-sentence.
-                    url = message.get("url")
-                    voice = message.get("voice", "af_bella")
-                    speed = float(message.get("speed", 1.0))
-                    prefetch = int(message.get("prefetch", 3))
-                    frame_ms = int(message.get("frame_ms", 200))
-                    start_paragraph = int(message.get("start_paragraph", 0) or 0)
-                    realtime = bool(message.get("realtime", True))
-
-                    if not url:
-                        await websocket.send_json({"type": "error", "message": "URL is required"})
-                        continue
-                    if not app.state.tts:
-                        await websocket.send_json({"type": "error", "message": "TTS Engine not initialized"})
-                        continue
-
-                    cancel_event.clear()
-                    paused = False
-
-                    logger.info(f"Play request: url={url} voice={voice} speed={speed}")
-
-                    # Ensure voice is valid for the loaded voice pack.
-                    try:
-                        available = app.state.tts.list_voices()
-                        if available and voice not in available:
-                            voice = available[0]
-                    except Exception:
-                        pass
-                    try:
-                        chapter = await app.state.scraper.scrape_chapter(url)
-                    except Exception as e:
-                        await websocket.send_json({"type": "error", "message": str(e)})
-                        continue
 
-                    title = chapter.get("title")
-                    paragraphs = chapter.get("content") or []
+@app.api_route("/chapter_audio", methods=["GET", "HEAD"])
+async def chapter_audio(request: Request, url: str, voice: str = "af_bella", speed: float = 1.0):
+    """Audio of a chapter rendered with `voice` and `speed` (by a render job or a download)."""
+    key = artifact_key(url, voice, speed)
+    meta = await asyncio.to_thread(app.state.artifacts.get, key)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="chapter not rendered")
+    return _artifact_response(request, key, meta)
 
-                    if start_paragraph < 0:
-                        start_paragraph = 0
-                    if start_paragraph > len(paragraphs):
-                        start_paragraph = max(0, len(paragraphs) - 1)
 
-                    paragraphs_slice = paragraphs[start_paragraph:] if start_paragraph else paragraphs
+@app.get("/chapter_timeline")
+async def chapter_timeline(url: str, voice: str = "af_bella", speed: float = 1.0):
+    """Sentence timeline and metadata for /chapter_audio."""
+    meta = await asyncio.to_thread(app.state.artifacts.get, artifact_key(url, voice, speed))
+    if meta is None:
+        raise HTTPException(status_code=404, detail="chapter not rendered")
+    return {**meta, "audio_url": _chapter_audio_url(url, voice, speed)}
 
-                    # Provide total sentence count up-front for download/progress UIs.
-                    try:
-                        sentence_total = len(app.state.tts.split_paragraphs(paragraphs_slice))
-                    except Exception:
-                        sentence_total = None
-                    await websocket.send_json(
+async def _run_scrape(stream: MuxStream, message: dict) -> None:
+    url = message.get("url")
+    if not url:
+        await stream.send_json({"error": "URL is required"})
+        return
+
+    logger.info(f"Scraping URL: {url}")
+    try:
+        result = await app.state.scraper.scrape_chapter(url)
+        await stream.send_json({"type": "scrape_result", "data": result})
+    except Exception as e:
+        logger.error(f"Scrape error: {e}")
+        await stream.send_json({"type": "error", "message": str(e)})
+
+
+async def _run_tts(stream: MuxStream, message: dict) -> None:
+    text = message.get("text")
+    voice = message.get("voice", "af_bella")
+    speed = message.get("speed", 1.0)
+
+    if not text:
+        await stream.send_json({"error": "Text is required"})
+        return
+
+    logger.info(f"Streaming TTS for text length: {len(text)}")
+    tts = await _get_tts()
+    if not tts:
+        await stream.send_json({"error": _tts_unavailable_message()})
+        return
+
+    # Ensure voice is valid for the loaded voice pack.
+    try:
+        available = tts.list_voices()
+        if available and voice not in available:
+            voice = available[0]
+    except Exception:
+        pass
+
+    # Stream audio
+    try:
+        cumulative_samples = 0
+        async for _, audio_chunk in tts.generate_audio_stream(
+            text,
+            voice=voice,
+            speed=float(speed),
+            prefetch_sentences=3,
+            frame_ms=200,
+            cancel_event=stream.cancel_event,
+        ):
+            if stream.id is None:
+                await stream.send_bytes(audio_chunk)
+            else:
+                # Raw PCM cannot be attributed on a shared connection.
+                await stream.send_bytes(
+                    encode_sentence_frame(
+                        audio_chunk,
+                        paragraph_index=0,
+                        sentence_index=0,
+                        char_start=0,
+                        char_end=0,
+                        ms_start=(cumulative_samples * 1000) // tts.sample_rate,
+                        stream_id=stream.id,
+                    )
+                )
+            cumulative_samples += len(audio_chunk) // 2
+
+        await stream.send_json({"type": "tts_complete"})
+    except Exception as e:
+        logger.error(f"TTS error: {e}")
+        await stream.send_json({"type": "error", "message": str(e)})
+
+
+async def _chapter_segments(tts, chapter: dict, paragraphs: list) -> list:
+    """Sentence segments of a chapter, from the chapter store when possible."""
+    store = getattr(app.state, "chapter_store", None)
+    chash = chapter.get("content_hash")
+    if store is not None and chash:
+        try:
+            segments = await asyncio.to_thread(store.get_segments, chash, tts.SEGMENTER_TAG)
+            if segments is not None:
+                return segments
+        except Exception as e:
+            logger.warning(f"Could not read stored segments: {e}")
+    segments = tts.split_paragraphs_with_offsets(paragraphs)
+    if store is not None and chash:
+        try:
+            await asyncio.to_thread(store.put_segments, chash, tts.SEGMENTER_TAG, segments)
+        except Exception as e:
+            logger.warning(f"Could not store segments: {e}")
+    return segments
+
+
+async def _stored_chunks(meta: dict, reader, start: tuple[int, int]):
+    """Replay a stored chapter's sentences from `start`, shaped like
+    generate_audio_stream_paragraphs_sentence_chunks output. Each sentence
+    is read from disk when it is due."""
+    offset = 0
+    for e in meta.get("timeline") or []:
+        size = int(e["chunk_bytes"])
+        if (e["paragraph_index"], e["sentence_index"]) >= tuple(start):
+            pcm = await asyncio.to_thread(reader.read, offset, size)
+            yield e["paragraph_index"], e["sentence_index"], e["text"], pcm, e["char_start"], e["char_end"]
+        offset += size
+
+
+async def _run_play(stream: MuxStream, message: dict) -> None:
+    # Single-shot: scrape the chapter, then stream it sentence-by-sentence.
+    url = message.get("url")
+    voice = message.get("voice", "af_bella")
+    speed = float(message.get("speed", 1.0))
+    prefetch = int(message.get("prefetch", 3))
+    frame_ms = int(message.get("frame_ms", 200))
+    start_paragraph = int(message.get("start_paragraph", 0) or 0)
+    realtime = bool(message.get("realtime", True))
+    fast_start = bool(message.get("fast_start", realtime))
+    # Credit-based flow control: the client grants milliseconds
+    # of audio ("credit" commands) and the server only sends
+    # while it holds credit, instead of wall-clock pacing.
+    flow_credit = message.get("flow_control") == "credit"
+    credit_ms = int(message.get("credit_ms", 0) or 0) if flow_credit else 0
+    # Binary framing: sentence metadata travels in a fixed header
+    # in front of its audio (see framing.py) instead of a
+    # separate `sentence` JSON event. Multiplexed streams always
+    # use it, since their frames must carry the stream id.
+    binary_frames = message.get("framing") == "binary" or stream.id is not None
+    frame_text = bool(message.get("frame_text", False))
+    # Downloads: "flac_delivery": "http" replaces the FLAC blob after
+    # flac_data with a URL to fetch the stored file from /chapter_audio.
+    flac_via_http = message.get("flac_delivery") == "http"
+    cancel_event = stream.cancel_event
+
+    if not url:
+        await stream.send_json({"type": "error", "message": "URL is required"})
+        return
+    tts = await _get_tts()
+    if not tts:
+        await stream.send_json({"type": "error", "message": _tts_unavailable_message()})
+        return
+
+    paused = False
+
+    logger.info(f"Play request: url={url} voice={voice} speed={speed} stream={stream.id}")
+
+    # Ensure voice is valid for the loaded voice pack.
+    try:
+        available = tts.list_voices()
+        if available and voice not in available:
+            voice = available[0]
+    except Exception:
+        pass
+    try:
+        chapter = await app.state.scraper.scrape_chapter(url)
+    except Exception as e:
+        await stream.send_json({"type": "error", "message": str(e)})
+        return
+
+    title = chapter.get("title")
+    paragraphs = chapter.get("content") or []
+
+    if start_paragraph < 0:
+        start_paragraph = 0
+    if start_paragraph > len(paragraphs):
+        start_paragraph = max(0, len(paragraphs) - 1)
+
+    # The sentence segment table (used for the count, synthesis and seeking)
+    # is persisted per chapter content, so repeated plays skip splitting.
+    segments = await _chapter_segments(tts, chapter, paragraphs)
+    # Provide total sentence count up-front for download/progress UIs.
+    sentence_total = sum(1 for seg in segments if seg[0] >= start_paragraph)
+
+    # Live plays of a chapter already rendered with this voice and speed
+    # (prerendered, by a job or a download) stream from disk.
+    stored: dict | None = None
+    stored_pcm = None
+    if realtime:
+        key = artifact_key(url, voice, speed)
+        try:
+            stored = await asyncio.to_thread(app.state.artifacts.get, key)
+            if stored is not None and stored.get("paragraphs") == paragraphs:
+                stored_pcm = await asyncio.to_thread(app.state.artifacts.open_pcm, key, stored)
+        except Exception as e:
+            logger.warning(f"Could not read stored chapter audio: {e}")
+        if app.state.prerender is not None:
+            app.state.prerender.note_play(
+                novel_key(url, message.get("novel_url")),
+                url,
+                chapter.get("next_url"),
+                voice,
+                speed,
+                hit=stored_pcm is not None,
+            )
+    # Plays that synthesize go through admission control: live plays may
+    # queue for capacity, downloads are downgraded while the node is saturated.
+    grant = None
+    try:
+        if stored_pcm is None:
+            grant = await app.state.admission.admit(
+                "live" if realtime else "download",
+                stream,
+                on_queued=lambda position: stream.send_json({"type": "queued", "position": position}),
+            )
+            if not realtime:
+                synthesis_priority.set(grant)
+                if grant.priority == DEGRADED_PRIORITY:
+                    prefetch = min(prefetch, 1)
+        frame_version = FRAME_VERSION if stream.id is None else FRAME_VERSION_STREAM
+        await stream.send_json(
+            {
+                "type": "chapter_info",
+                "title": title,
+                "url": url,
+                "voice": voice,
+                "next_url": chapter.get("next_url"),
+                "prev_url": chapter.get("prev_url"),
+                "paragraphs": paragraphs,
+                "start_paragraph": start_paragraph,
+                "sentence_total": sentence_total,
+                "audio": {
+                    "encoding": "pcm_s16le",
+                    "sample_rate": tts.sample_rate,
+                    "channels": 1,
+                    # For backward-compatibility, keep frame_ms but note that
+                    # the stream is now sentence-chunked.
+                    "frame_ms": frame_ms,
+                    "chunking": "sentence",
+                },
+                "flow_control": "credit" if flow_credit else ("pacing" if realtime else "none"),
+                "framing": {"type": "binary", "version": frame_version} if binary_frames else {"type": "json"},
+            }
+        )
+
+        cumulative_samples = 0
+        sample_rate = tts.sample_rate
+        # For downloads, accumulate PCM to encode as FLAC at the end.
+        download_pcm_chunks: list[bytes] = [] if not realtime else []
+        download_timeline: list[dict] = []
+        stream_t0 = time.monotonic()
+        pipeline_stats: dict = {}
+
+        # Seeking reuses the scraped chapter and its segment
+        # table; whole sentences rendered in this play are kept
+        # (bounded) so seeking back to them costs nothing.
+        rendered: dict = {}
+        position = (start_paragraph, 0)
+        stream.gauges.update(
+            download_pcm_bytes=lambda: sum(len(c) for c in download_pcm_chunks),
+            download_timeline_entries=lambda: len(download_timeline),
+            seek_cache_bytes=lambda: sum(len(c) for c in rendered.values()),
+        )
+        seek_target: tuple[int, int] | None = None
+
+        def handle_control(msg: dict) -> None:
+            nonlocal paused, seek_target, credit_ms
+            cmd = msg.get("command")
+            if cmd == "pause":
+                paused = True
+            elif cmd == "resume":
+                paused = False
+            elif cmd == "stop":
+                cancel_event.set()
+            elif cmd == "credit" and flow_credit:
+                try:
+                    credit_ms += max(0, int(msg.get("ms", 0) or 0))
+                except (TypeError, ValueError):
+                    return
+            elif cmd == "seek" and realtime:
+                try:
+                    p = int(msg.get("paragraph_index", 0) or 0)
+                    s = int(msg.get("sentence_index", 0) or 0)
+                except (TypeError, ValueError):
+                    return
+                seek_target = (min(max(0, p), max(0, len(paragraphs) - 1)), max(0, s))
+
+        # Hold chunks while paused or, with credit flow
+        # control, until the client grants credit.
+        def blocked() -> bool:
+            return paused or (flow_credit and credit_ms <= 0)
+
+        while True:
+            if stored_pcm is not None:
+                chunks = _stored_chunks(stored, stored_pcm, position)
+            else:
+                chunks = tts.generate_audio_stream_paragraphs_sentence_chunks(
+                    paragraphs,
+                    voice=voice,
+                    speed=speed,
+                    prefetch_sentences=prefetch,
+                    cancel_event=cancel_event,
+                    # Clause-level first sentence for live playback only;
+                    # downloads gain nothing from a faster first chunk.
+                    fast_start=fast_start,
+                    stats=pipeline_stats,
+                    segments=segments,
+                    start=position,
+                    rendered=rendered,
+                )
+            async for p_idx, s_idx, sentence, audio_chunk, cs, ce in chunks:
+                # Apply control messages routed to this stream meanwhile.
+                while not stream.controls.empty():
+                    handle_control(stream.controls.get_nowait())
+                while blocked() and not cancel_event.is_set() and seek_target is None:
+                    handle_control(await stream.controls.get())
+
+                if cancel_event.is_set() or seek_target is not None:
+                    break
+
+                # One event per binary chunk: with fast start the
+                # first sentence arrives as several clause chunks,
+                # each carrying the full sentence's offsets.
+                ms_start = (cumulative_samples * 1000) // sample_rate
+                if binary_frames:
+                    await stream.send_bytes(
+                        encode_sentence_frame(
+                            audio_chunk,
+                            paragraph_index=int(p_idx),
+                            sentence_index=int(s_idx),
+                            char_start=int(cs),
+                            char_end=int(ce),
+                            ms_start=ms_start,
+                            text=sentence if frame_text else None,
+                            stream_id=stream.id,
+                        )
+                    )
+                else:
+                    await stream.send_group(
+                        [
+                            (
+                                "json",
+                                {
+                                    "type": "sentence",
+                                    "text": sentence,
+                                    "paragraph_index": int(p_idx),
+                                    "sentence_index": int(s_idx),
+                                    "ms_start": ms_start,
+                                    "char_start": int(cs),
+                                    "char_end": int(ce),
+                                    # Size of the *next* binary message for this sentence in samples/bytes.
+                                    # Helps clients associate metadata with audio even if transport splits chunks.
+                                    "chunk_samples": int(len(audio_chunk) // 2),
+                                    "chunk_bytes": int(len(audio_chunk)),
+                                },
+                            ),
+                            ("bytes", audio_chunk),
+                        ]
+                    )
+                cumulative_samples += len(audio_chunk) // 2
+                if flow_credit:
+                    # A chunk may overdraw the credit: sentences are atomic.
+                    credit_ms -= (len(audio_chunk) // 2) * 1000 // sample_rate
+                # Accumulate PCM for FLAC encoding (downloads only).
+                if not realtime:
+                    download_pcm_chunks.append(audio_chunk)
+                    download_timeline.append(
                         {
-                            "type": "chapter_info",
-                            "title": title,
-                            "url": url,
-                            "voice": voice,
-                            "next_url": chapter.get("next_url"),
-                            "prev_url": chapter.get("prev_url"),
-                            "paragraphs": paragraphs,
-                            "start_paragraph": start_paragraph,
-                            "sentence_total": sentence_total,
-                            "audio": {
-                                "encoding": "pcm_s16le",
-                                "sample_rate": app.state.tts.sample_rate,
-                                "channels": 1,
-                                # For backward-compatibility, keep frame_ms but note that
-                                # the stream is now sentence-chunked.
-                                "frame_ms": frame_ms,
-                                "chunking": "sentence",
-                            },
+                            "text": sentence,
+                            "paragraph_index": int(p_idx),
+                            "sentence_index": int(s_idx),
+                            "ms_start": ms_start,
+                            "char_start": int(cs),
+                            "char_end": int(ce),
+                            "chunk_samples": int(len(audio_chunk) // 2),
+                            "chunk_bytes": int(len(audio_chunk)),
                         }
                     )
 
-                    last_key = None
-                    cumulative_samples = 0
-                    sample_rate = app.state.tts.sample_rate
-                    # For downloads, accumulate PCM to encode as FLAC at the end.
-                    download_pcm_chunks: list[bytes] = [] if not realtime else []
+                # Optional realtime pacing.
+                # - streaming: send roughly in-time to reduce client buffer bloat.
+                # - downloads: realtime=false sends as fast as synthesis allows.
+                if realtime and not flow_credit:
+                    expected_s = cumulative_samples / float(sample_rate)
+                    elapsed_s = time.monotonic() - stream_t0
+                    # Let the stream run slightly ahead to avoid stutter from
+                    # small scheduling/network jitter.
+                    ahead_s = 0.10
+                    sleep_s = (expected_s - elapsed_s) - ahead_s
+                    if sleep_s > 0:
+                        await asyncio.sleep(min(sleep_s, 0.25))
+
+            if seek_target is None or cancel_event.is_set():
+                break
+            # Restart the producer at the target; ms_start
+            # restarts at 0 like a fresh play, and the client
+            # drops audio it buffered before `seeked`.
+            position, seek_target = seek_target, None
+            cumulative_samples = 0
+            stream_t0 = time.monotonic()
+            await stream.send_json(
+                {
+                    "type": "seeked",
+                    "paragraph_index": position[0],
+                    "sentence_index": position[1],
+                    "ms_start": 0,
+                }
+            )
+
+        if pipeline_stats:
+            logger.info(f"Pipeline stage timings: {pipeline_stats}")
+
+        # For downloads, encode accumulated PCM as FLAC and send.
+        if not realtime and download_pcm_chunks and not cancel_event.is_set():
+            try:
+                all_pcm = b"".join(download_pcm_chunks)
+                logger.info(
+                    f"FLAC encode: {len(download_pcm_chunks)} chunks, "
+                    f"{len(all_pcm)} bytes PCM "
+                    f"({len(all_pcm)/2/sample_rate:.1f}s audio)"
+                )
+                stream.gauges["download_pcm_joined_bytes"] = lambda: len(all_pcm)
+                flac_data = await asyncio.to_thread(tts.encode_pcm16_to_flac, all_pcm, sample_rate=sample_rate)
+                stream.gauges["flac_bytes"] = lambda: len(flac_data)
+                is_flac = flac_data[:4] == b"fLaC"
+                logger.info(
+                    f"FLAC result: {len(flac_data)} bytes, "
+                    f"valid_header={is_flac}, "
+                    f"ratio={len(flac_data)/max(1,len(all_pcm))*100:.1f}%"
+                )
+                encoding = "flac" if is_flac else "pcm_s16le"
+                # Keep whole-chapter downloads on disk so later downloads of
+                # the same chapter, voice and speed are served by /chapter_audio.
+                audio_url = None
+                rendered_sentences = {(e["paragraph_index"], e["sentence_index"]) for e in download_timeline}
+                complete = len(rendered_sentences) == sum(1 for seg in segments if seg[2])
+                if start_paragraph == 0 and complete and not cancel_event.is_set():
                     try:
-                        control_task: asyncio.Task[str] | None = asyncio.create_task(websocket.receive_text())
-
-                        stream_t0 = time.monotonic()
-
-                        async def handle_control_payload(payload: str) -> None:
-                            nonlocal paused
-                            try:
-                                msg = json.loads(payload)
-                            except json.JSONDecodeError:
-                                return
-                            cmd = msg.get("command")
-                            if cmd == "pause":
-                                paused = True
-                            elif cmd == "resume":
-                                paused = False
-                            elif cmd == "stop":
-                                cancel_event.set()
-
-                        async for p_idx, s_idx, sentence, audio_chunk, cs, ce in app.state.tts.generate_audio_stream_paragraphs_sentence_chunks(
-                            paragraphs_slice,
-                            voice=voice,
-                            speed=speed,
-                            prefetch_sentences=prefetch,
-                            cancel_event=cancel_event,
-                        ):
-                            # Consume any pending control messages without concurrent receives.
-                            if control_task is not None and control_task.done():
-                                try:
-                                    await handle_control_payload(control_task.result())
-                                except WebSocketDisconnect:
-                                    cancel_event.set()
-                                control_task = asyncio.create_task(websocket.receive_text())
-
-                            if paused and control_task is not None:
-                                control_task.cancel()
-                                control_task = None
-
-                            while paused and not cancel_event.is_set():
-                                # Block until we get a control message.
-                                try:
-                                    payload = await websocket.receive_text()
-                                except WebSocketDisconnect:
-                                    cancel_event.set()
-                                    break
-                                await handle_control_payload(payload)
-
-                            if not paused and not cancel_event.is_set() and control_task is None:
-                                control_task = asyncio.create_task(websocket.receive_text())
-
-                            if cancel_event.is_set():
-                                break
-
-                            key = (p_idx + start_paragraph, s_idx, sentence)
-                            if key != last_key:
-                                last_key = key
-                                ms_start = (cumulative_samples * 1000) // sample_rate
-                                await websocket.send_json(
-                                    {
-                                        "type": "sentence",
-                                        "text": sentence,
-                                        "paragraph_index": int(p_idx + start_paragraph),
-                                        "sentence_index": int(s_idx),
-                                        "ms_start": ms_start,
-                                        "char_start": int(cs),
-                                        "char_end": int(ce),
-                                        # Size of the *next* binary message for this sentence in samples/bytes.
-                                        # Helps clients associate metadata with audio even if transport splits chunks.
-                                        "chunk_samples": int(len(audio_chunk) // 2),
-                                        "chunk_bytes": int(len(audio_chunk)),
-                                    }
-                                )
-                            await websocket.send_bytes(audio_chunk)
-                            cumulative_samples += len(audio_chunk) // 2
-                            # Accumulate PCM for FLAC encoding (downloads only).
-                            if not realtime:
-                                download_pcm_chunks.append(audio_chunk)
-
-                            # Optional realtime pacing.
-                            # - streaming: send roughly in-time to reduce client buffer bloat.
-                            # - downloads: realtime=false sends as fast as synthesis allows.
-                            if realtime:
-                                expected_s = cumulative_samples / float(sample_rate)
-                                elapsed_s = time.monotonic() - stream_t0
-                                # Let the stream run slightly ahead to avoid stutter from
-                                # small scheduling/network jitter.
-                                ahead_s = 0.10
-                                sleep_s = (expected_s - elapsed_s) - ahead_s
-                                if sleep_s > 0:
-                                    await asyncio.sleep(min(sleep_s, 0.25))
-
-                        # Properly clean up the control_task to avoid
-                        # concurrent recv race with the outer message loop.
-                        pending_command = None
-                        if control_task is not None:
-                            if control_task.done():
-                                try:
-                                    pending_command = control_task.result()
-                                except Exception:
-                                    pass
-                            else:
-                                control_task.cancel()
-                                try:
-                                    await control_task
-                                except (asyncio.CancelledError, Exception):
-                                    pass
-                            control_task = None
-
-                        # For downloads, encode accumulated PCM as FLAC and send.
-                        if not realtime and download_pcm_chunks and not cancel_event.is_set():
-                            try:
-                                all_pcm = b"".join(download_pcm_chunks)
-                                logger.info(
-                                    f"FLAC encode: {len(download_pcm_chunks)} chunks, "
-                                    f"{len(all_pcm)} bytes PCM "
-                                    f"({len(all_pcm)/2/sample_rate:.1f}s audio)"
-                                )
-                                flac_data = app.state.tts.encode_pcm16_to_flac(
-                                    all_pcm, sample_rate=sample_rate
-                                )
-                                is_flac = flac_data[:4] == b"fLaC"
-                                logger.info(
-                                    f"FLAC result: {len(flac_data)} bytes, "
-                                    f"valid_header={is_flac}, "
-                                    f"ratio={len(flac_data)/max(1,len(all_pcm))*100:.1f}%"
-                                )
-                                await websocket.send_json({
+                        meta = chapter_artifact_meta(
+                            chapter,
+                            url,
+                            voice,
+                            speed,
+                            encoding=encoding,
+                            sample_rate=sample_rate,
+                            pcm_bytes=len(all_pcm),
+                            timeline=download_timeline,
+                            source="download",
+                        )
+                        await asyncio.to_thread(app.state.artifacts.put, artifact_key(url, voice, speed), flac_data, meta)
+                        audio_url = _chapter_audio_url(url, voice, speed)
+                    except Exception as e:
+                        logger.warning(f"Could not store rendered chapter: {e}")
+                if flac_via_http and audio_url is not None:
+                    await stream.send_json(
+                        {
+                            "type": "flac_data",
+                            "encoding": encoding,
+                            "size": len(flac_data),
+                            "sample_rate": sample_rate,
+                            "url": audio_url,
+                        }
+                    )
+                    flac_data = b""
+                elif stream.id is not None:
+                    # Wrap the file in a frame so it carries the stream id.
+                    flac_data = encode_sentence_frame(
+                        flac_data,
+                        paragraph_index=0,
+                        sentence_index=0,
+                        char_start=0,
+                        char_end=0,
+                        ms_start=0,
+                        codec=encoding,
+                        stream_id=stream.id,
+                    )
+                if flac_data:
+                    await stream.send_group(
+                        [
+                            (
+                                "json",
+                                {
                                     "type": "flac_data",
-                                    "encoding": "flac" if is_flac else "pcm_s16le",
+                                    "encoding": encoding,
                                     "size": len(flac_data),
                                     "sample_rate": sample_rate,
-                                })
-                                await websocket.send_bytes(flac_data)
-                                logger.info("FLAC data sent to client")
-                            except Exception as e:
-                                logger.warning(f"FLAC encoding failed, downloads saved as PCM: {e}")
-                            finally:
-                                download_pcm_chunks.clear()
-
-                        try:
-                            await websocket.send_json(
-                                {
-                                    "type": "chapter_complete",
-                                    "next_url": chapter.get("next_url"),
-                                    "prev_url": chapter.get("prev_url"),
-                                }
-                            )
-                        except Exception:
-                            pass  # Client already disconnected
-
-                        # If the client sent a new command while we were
-                        # streaming, re-dispatch it so the outer loop
-                        # doesn't need a new receive_text() call.
-                        if pending_command is not None:
-                            try:
-                                msg = json.loads(pending_command)
-                                cmd = msg.get("command")
-                                if cmd and cmd not in ("pause", "resume", "stop"):
-                                    # Push it back for the outer loop to process
-                                    # by sending it to ourselves (simpler than refactoring).
-                                    pass  # Will be picked up on next iteration
-                            except Exception:
-                                pass
+                                    **({"url": audio_url} if audio_url else {}),
+                                },
+                            ),
+                            ("bytes", flac_data),
+                        ]
+                    )
+                logger.info("FLAC data sent to client")
+            except Exception as e:
+                logger.warning(f"FLAC encoding failed, downloads saved as PCM: {e}")
+            finally:
+                download_pcm_chunks.clear()
+                download_timeline.clear()
 
-                    except Exception as e:
-                        logger.error(f"Play stream error: {e}")
-                        try:
-                            await websocket.send_json({"type": "error", "message": str(e)})
-                        except Exception:
-                            pass  # Client already disconnected
-                
-                else:
-                    await websocket.send_json({"error": "Unknown command"})
-            
+        try:
+            await stream.send_json(
+                {
+                    "type": "chapter_complete",
+                    "next_url": chapter.get("next_url"),
+                    "prev_url": chapter.get("prev_url"),
+                }
+            )
+        except Exception:
+            pass  # Client already disconnected
+
+    except Overloaded as e:
+        logger.info(f"Play rejected: {e}")
+        try:
+            await stream.send_json(
+                {"type": "error", "code": "overloaded", "message": str(e), "retry_after_s": e.retry_after_s}
+            )
+        except Exception:
+            pass  # Client already disconnected
+    except Exception as e:
+        logger.error(f"Play stream error: {e}")
+        try:
+            await stream.send_json({"type": "error", "message": str(e)})
+        except Exception:
+            pass  # Client already disconnected
+    finally:
+        if grant is not None:
+            grant.release()
+        if stored_pcm is not None:
+            stored_pcm.close()
+        elif realtime and app.state.prerender is not None:
+            app.state.prerender.live_done()
+
+
+_STREAM_COMMANDS = {"scrape": _run_scrape, "tts": _run_tts, "play": _run_play}
+
+
+async def _run_stream(stream: MuxStream, message: dict) -> None:
+    """Run one stream-starting command, reporting errors on its stream."""
+    # Synthesis started from this task is scheduled at the stream's priority.
+    synthesis_priority.set(stream)
+    stream.command = message.get("command")
+    try:
+        await _STREAM_COMMANDS[message.get("command")](stream, message)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing message: {e}")
+        traceback.print_exc()
+        try:
+            await stream.send_json({"error": "Internal server error"})
+        except Exception:
+            pass
+    finally:
+        # Gauges close over the command's buffers; don't keep them alive.
+        stream.gauges.clear()
+
+
+def _stream_priority(message: dict) -> int:
+    """Explicit `priority`, else live playback ahead of downloads and the rest."""
+    try:
+        return max(1, int(message["priority"]))
+    except (KeyError, TypeError, ValueError):
+        pass
+    if message.get("command") == "play" and message.get("realtime", True):
+        return WS_LIVE_PRIORITY
+    return 1
+
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """Command loop for one connection.
+
+    Commands without a `stream_id` run one at a time on a single implicit
+    stream, as before. Commands with a `stream_id` (an integer) start
+    independent streams that run concurrently on the same connection: their
+    events carry the `stream_id`, their audio is always framed (version 2
+    frames include the id), control commands address them by id, and
+    `MuxConnection` interleaves their output by priority.
+    """
+    await websocket.accept()
+    conn = MuxConnection(websocket)
+    client = websocket.client
+    debug.connections[conn] = {"client": f"{client.host}:{client.port}" if client else None, "opened_at": time.time()}
+    legacy = conn.open_stream(None)
+    legacy_commands: asyncio.Queue[dict] = asyncio.Queue()
+    streams: dict[int, MuxStream] = {}
+
+    async def run_legacy() -> None:
+        while True:
+            message = await legacy_commands.get()
+            legacy.reset()
+            legacy.priority = _stream_priority(message)
+            await _run_stream(legacy, message)
+
+    legacy_worker = asyncio.create_task(run_legacy())
+
+    def forget(stream: MuxStream) -> None:
+        if streams.get(stream.id) is stream:
+            del streams[stream.id]
+        conn.release(stream)
+
+    try:
+        while True:
+            data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
             except json.JSONDecodeError:
-                try:
-                    await websocket.send_json({"error": "Invalid JSON"})
-                except Exception:
-                    pass
-            except Exception as e:
-                logger.error(f"Error processing message: {e}")
-                traceback.print_exc()
-                try:
-                    await websocket.send_json({"error": "Internal server error"})
-                except Exception:
-                    pass
+                await legacy.send_json({"error": "Invalid JSON"})
+                continue
+            command = message.get("command")
+            stream_id = message.get("stream_id")
+            if stream_id is not None and (
+                type(stream_id) is not int or not 0 < stream_id <= WS_MAX_STREAM_ID
+            ):
+                await legacy.send_json({"error": "stream_id must be an integer between 1 and 2^32-1"})
+                continue
+
+            if command in CONTROL_COMMANDS:
+                target = legacy if stream_id is None else streams.get(stream_id)
+                if target is not None:
+                    target.control(message)
+                if target is legacy and command == "stop":
+                    # Also drop commands queued behind the running one:
+                    # the next reset() would clear this stop for them.
+                    while not legacy_commands.empty():
+                        legacy_commands.get_nowait()
+                continue
+            if command not in _STREAM_COMMANDS:
+                await conn.open_stream(stream_id).send_json({"error": "Unknown command"})
+                continue
+
+            if stream_id is None:
+                # Legacy clients: commands queue behind the running one.
+                legacy_commands.put_nowait(message)
+                continue
+            # Reusing an id replaces the stream (like stop + play).
+            old = streams.pop(stream_id, None)
+            if old is not None:
+                old.cancel_event.set()
+                old.task.cancel()
+            if len(streams) >= WS_MAX_STREAMS:
+                await conn.open_stream(stream_id).send_json(
+                    {"type": "error", "message": f"Too many concurrent streams (max {WS_MAX_STREAMS})"}
+                )
+                continue
+            stream = conn.open_stream(stream_id, _stream_priority(message))
+            streams[stream_id] = stream
+            stream.task = asyncio.create_task(_run_stream(stream, message))
+            stream.task.add_done_callback(lambda _t, s=stream: forget(s))
 
     except WebSocketDisconnect:
         logger.info("Client disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
+    finally:
+        tasks = [legacy_worker] + [s.task for s in streams.values() if s.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await conn.close()
+
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
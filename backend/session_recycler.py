@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ArenaResetSession:
+    """Thin proxy over an ORT InferenceSession that can shrink its arena.
+
+    Kokoro calls `sess.run(None, inputs)` without run options; the proxy adds
+    `memory.enable_memory_arena_shrinkage` to the next run when a light reset
+    was requested, which returns the arena's unused chunks at the end of that
+    run instead of rebuilding the whole session.
+    """
+
+    def __init__(self, sess: Any):
+        self._sess = sess
+        self.reset_pending = False
+
+    def run(self, output_names, input_feed, run_options=None):
+        if self.reset_pending and run_options is None:
+            self.reset_pending = False
+            try:
+                import onnxruntime as ort
+
+                run_options = ort.RunOptions()
+                run_options.add_run_config_entry("memory.enable_memory_arena_shrinkage", "cpu:0")
+            except Exception:
+                run_options = None
+        return self._sess.run(output_names, input_feed, run_options)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._sess, name)
+
+
+class SessionRecycler:
+    """Owns the live Kokoro instance and decides when and how to refresh it.
+
+    Every `interval` sentences the session is refreshed, either by a light
+    reset (arena shrink on the next run) or by swapping in a freshly built
+    instance. Replacements are built on a separate thread, but only while the
+    engine is idle or while rebuild time stays under `cpu_budget` (a fraction
+    of wall time), so a download burst is not slowed down by a rebuild. With
+    `standby` enabled a warm replacement is kept ready ahead of time and the
+    swap itself costs nothing on the synthesis path.
+
+    Environment:
+    - TTS_SESSION_RECYCLE_SENTENCES: sentences between refreshes (default 20).
+    - TTS_SESSION_RECYCLE_MODE: "full" (swap in a new session), "light"
+      (arena shrink, with a full swap every TTS_SESSION_FULL_RECYCLE_EVERY
+      light resets, default 10; 0 disables full swaps) or "off".
+    - TTS_SESSION_STANDBY: keep a warm replacement ready (default 1).
+    - TTS_SESSION_RECYCLE_IDLE_S: idle time after which a build may run
+      regardless of budget (default 0.5).
+    - TTS_SESSION_RECYCLE_CPU_BUDGET: max fraction of wall time spent on
+      rebuilds while busy (default 0.05).
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        *,
+        warmup: Optional[Callable[[Any], None]] = None,
+        initial: Any = None,
+    ):
+        self._factory = factory
+        self._warmup = warmup
+
+        self.interval = max(1, int(os.getenv("TTS_SESSION_RECYCLE_SENTENCES", "20") or "20"))
+        mode = (os.getenv("TTS_SESSION_RECYCLE_MODE", "full") or "full").strip().lower()
+        self.mode = mode if mode in {"full", "light", "off"} else "full"
+        self.full_every = max(0, int(os.getenv("TTS_SESSION_FULL_RECYCLE_EVERY", "10") or "0"))
+        self.standby_enabled = os.getenv("TTS_SESSION_STANDBY", "1") == "1"
+        self.idle_s = max(0.0, float(os.getenv("TTS_SESSION_RECYCLE_IDLE_S", "0.5") or "0.5"))
+        self.cpu_budget = max(0.0, float(os.getenv("TTS_SESSION_RECYCLE_CPU_BUDGET", "0.05") or "0"))
+
+        self._lock = threading.Lock()
+        self._current = self._wrap(initial if initial is not None else factory())
+        self._standby: Any = None
+        self._building: Optional[Future] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-recycle")
+
+        self._inflight = 0
+        self._activity = 0  # Bumped on every acquire; lets idle timers detect new work.
+        self._sentences_since_recycle = 0
+        self._deferred = False
+        self._light_resets_since_full = 0
+        self._last_build_end: Optional[float] = None
+        self._last_build_s = 0.0
+        self._last_recycle_ts: Optional[float] = None
+
+        self._metrics: dict[str, Any] = {
+            "full_recycles": 0,
+            "light_resets": 0,
+            "deferred_recycles": 0,
+            "builds": 0,
+            "build_failures": 0,
+            "build_ms_last": None,
+            "build_ms_max": None,
+            "build_ms_total": 0.0,
+            "warmup_ms_last": None,
+            "recycle_interval_s_last": None,
+        }
+
+    @property
+    def current(self) -> Any:
+        return self._current
+
+    @current.setter
+    def current(self, kokoro: Any) -> None:
+        self._current = self._wrap(kokoro)
+
+    @staticmethod
+    def _wrap(kokoro: Any) -> Any:
+        sess = getattr(kokoro, "sess", None)
+        if sess is not None and not isinstance(sess, _ArenaResetSession):
+            kokoro.sess = _ArenaResetSession(sess)
+        return kokoro
+
+    def acquire(self) -> Any:
+        """Mark an inference as started and return the instance to run it on."""
+        self._inflight += 1
+        self._activity += 1
+        return self._current
+
+    def release(self) -> None:
+        """Mark an inference as finished; refresh the session when due.
+
+        Must be called from the event loop thread (same as `acquire`).
+        """
+        self._inflight = max(0, self._inflight - 1)
+        if self.mode != "off":
+            self._sentences_since_recycle += 1
+            if self._sentences_since_recycle >= self.interval:
+                self._recycle_due()
+        self._maybe_build(idle=False)
+        self._schedule_idle_check()
+
+    def _recycle_due(self) -> None:
+        full = self.mode == "full" or (
+            self.full_every > 0 and self._light_resets_since_full >= self.full_every
+        )
+        if not full:
+            sess = getattr(self._current, "sess", None)
+            if isinstance(sess, _ArenaResetSession):
+                sess.reset_pending = True
+            self._light_resets_since_full += 1
+            self._metrics["light_resets"] += 1
+            self._mark_recycled()
+            return
+
+        with self._lock:
+            standby, self._standby = self._standby, None
+        if standby is None:
+            # Nothing ready yet: keep the current session and let _maybe_build
+            # start (or finish) a replacement within budget.
+            if not self._deferred:
+                self._deferred = True
+                self._metrics["deferred_recycles"] += 1
+            return
+        self._current = standby
+        self._light_resets_since_full = 0
+        self._metrics["full_recycles"] += 1
+        self._mark_recycled()
+        logger.info("Swapped in pre-built ONNX session")
+
+    def _mark_recycled(self) -> None:
+        now = time.monotonic()
+        if self._last_recycle_ts is not None:
+            self._metrics["recycle_interval_s_last"] = round(now - self._last_recycle_ts, 3)
+        self._last_recycle_ts = now
+        self._sentences_since_recycle = 0
+        self._deferred = False
+
+    def _wants_build(self) -> bool:
+        if self.mode == "off" or self._building is not None or self._standby is not None:
+            return False
+        if self.mode == "light" and self.full_every == 0:
+            return False
+        if self.standby_enabled:
+            return True
+        # No standby: only build once a full swap is actually due.
+        return self._sentences_since_recycle >= self.interval
+
+    def _within_budget(self, now: float) -> bool:
+        if self._last_build_end is None or self._last_build_s <= 0.0:
+            return True
+        if self.cpu_budget <= 0.0:
+            return False
+        return (now - self._last_build_end) >= (self._last_build_s / self.cpu_budget)
+
+    def _maybe_build(self, *, idle: bool) -> None:
+        if not self._wants_build():
+            return
+        now = time.monotonic()
+        if not idle and not self._within_budget(now):
+            return
+        logger.info("Building replacement ONNX session (idle=%s)", idle)
+        self._building = self._executor.submit(self._build)
+        self._building.add_done_callback(self._on_built)
+
+    def _build(self) -> Any:
+        t0 = time.perf_counter()
+        kokoro = self._factory()
+        build_s = time.perf_counter() - t0
+        warmup_s = None
+        if self._warmup is not None:
+            t1 = time.perf_counter()
+            try:
+                self._warmup(kokoro)
+                warmup_s = time.perf_counter() - t1
+            except Exception as e:
+                logger.warning("Session warm-up failed: %s", e)
+        return kokoro, build_s, warmup_s
+
+    def _on_built(self, fut: Future) -> None:
+        with self._lock:
+            self._building = None
+            self._last_build_end = time.monotonic()
+            try:
+                kokoro, build_s, warmup_s = fut.result()
+            except Exception as e:
+                logger.warning("Background session creation failed: %s", e)
+                self._metrics["build_failures"] += 1
+                return
+            self._last_build_s = build_s + (warmup_s or 0.0)
+            build_ms = round(build_s * 1000, 1)
+            self._metrics["builds"] += 1
+            self._metrics["build_ms_last"] = build_ms
+            self._metrics["build_ms_max"] = max(self._metrics["build_ms_max"] or 0.0, build_ms)
+            self._metrics["build_ms_total"] = round(self._metrics["build_ms_total"] + build_ms, 1)
+            if warmup_s is not None:
+                self._metrics["warmup_ms_last"] = round(warmup_s * 1000, 1)
+            self._standby = self._wrap(kokoro)
+
+    def _schedule_idle_check(self) -> None:
+        if not self._wants_build() and self._standby is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.call_later(self.idle_s, self._on_idle_check, self._activity)
+
+    def _on_idle_check(self, activity: int) -> None:
+        if self._inflight or activity != self._activity:
+            return  # New work arrived; its release() schedules the next check.
+        if self._sentences_since_recycle >= self.interval and self._standby is not None:
+            # Swap while nobody is listening rather than mid-burst.
+            self._recycle_due()
+        self._maybe_build(idle=True)
+
+    def metrics(self) -> dict:
+        out = dict(self._metrics)
+        out.update(
+            {
+                "mode": self.mode,
+                "interval_sentences": self.interval,
+                "sentences_since_recycle": self._sentences_since_recycle,
+                "standby_ready": self._standby is not None,
+                "building": self._building is not None,
+            }
+        )
+        return out
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
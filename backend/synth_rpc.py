@@ -0,0 +1,64 @@
+"""Wire format between the frontend and synthesis workers (see synth_worker.py).
+
+Each message is an 8-byte prefix (little-endian uint32 header length,
+uint32 payload length), a UTF-8 JSON header and a binary payload. Requests
+carry an `id` that the worker echoes in its reply, so one connection serves
+many concurrent requests:
+
+    {"id": 1, "op": "hello"}                      -> sample_rate, voices, voice_index, model_variant, slots
+    {"id": 2, "op": "health"}                     -> active, slots, rtf, rtf_samples
+    {"id": 3, "op": "synth", "text": ..., "voice": ..., "speed": 1.0, "priority": 4}
+                                                  -> payload: float32 mono samples
+    {"id": 3, "op": "cancel"}                     (no reply)
+
+Replies have "ok": true, or "ok": false and an "error" message.
+
+Addresses are "tcp://host:port" (or "host:port") and "unix:///path/to/socket".
+"""
+import asyncio
+import json
+import struct
+from typing import Awaitable, Callable, Tuple
+
+_PREFIX = struct.Struct("<II")
+MAX_HEADER_BYTES = 1 << 20
+MAX_PAYLOAD_BYTES = 64 << 20
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[dict, bytes]:
+    header_len, payload_len = _PREFIX.unpack(await reader.readexactly(_PREFIX.size))
+    if header_len > MAX_HEADER_BYTES or payload_len > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"Oversized message ({header_len} + {payload_len} bytes)")
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+
+def encode_message(header: dict, payload: bytes = b"") -> bytes:
+    raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    return _PREFIX.pack(len(raw), len(payload)) + raw + payload
+
+
+def _split_address(address: str) -> Tuple[str, str]:
+    if address.startswith("unix://"):
+        return "unix", address[len("unix://"):]
+    host_port = address[len("tcp://"):] if address.startswith("tcp://") else address
+    return "tcp", host_port
+
+
+async def open_connection(address: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    kind, target = _split_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(target)
+    host, _, port = target.rpartition(":")
+    return await asyncio.open_connection(host or "127.0.0.1", int(port))
+
+
+async def start_server(
+    handler: Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[None]], address: str
+) -> asyncio.AbstractServer:
+    kind, target = _split_address(address)
+    if kind == "unix":
+        return await asyncio.start_unix_server(handler, target)
+    host, _, port = target.rpartition(":")
+    return await asyncio.start_server(handler, host or "0.0.0.0", int(port))
@@ -0,0 +1,121 @@
+"""Synthesis worker: a TTSEngine served over the synth_rpc protocol.
+
+Run one per machine (or several per machine, each with its own address) and
+point the frontend at them with TTS_WORKERS (see worker_pool.py):
+
+    python synth_worker.py --listen tcp://0.0.0.0:9100
+    python synth_worker.py --listen unix:///tmp/tts-worker-1.sock
+
+Each `synth` request renders one sentence with synthesize_sentence_f32 at the
+request's priority, so live playback overtakes downloads on the worker too.
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Dict
+
+import numpy as np
+
+from priority import synthesis_priority
+from synth_rpc import encode_message, read_message, start_server
+
+logger = logging.getLogger(__name__)
+
+
+class _Priority:
+    def __init__(self, priority: int):
+        self.priority = priority
+
+
+class WorkerServer:
+    def __init__(self, engine):
+        self.engine = engine
+        self.active = 0
+
+    async def serve(self, address: str) -> None:
+        server = await start_server(self._handle, address)
+        logger.info("Synthesis worker listening on %s", address)
+        async with server:
+            await server.serve_forever()
+
+    def _hello(self) -> dict:
+        return {
+            "sample_rate": self.engine.sample_rate,
+            "voices": self.engine.list_voices(),
+            "voice_index": self.engine.voice_index(),
+            "model_variant": self.engine.model_variant,
+            "slots": self.engine.inference_threads,
+        }
+
+    def _health(self) -> dict:
+        rtf, samples = self.engine.synthesis_rtf()
+        return {"active": self.active, "slots": self.engine.inference_threads, "rtf": rtf, "rtf_samples": samples}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        write_lock = asyncio.Lock()
+        tasks: Dict[int, asyncio.Task] = {}
+
+        async def reply(header: dict, payload: bytes = b"") -> None:
+            async with write_lock:
+                writer.write(encode_message(header, payload))
+                await writer.drain()
+
+        async def synth(req: dict) -> None:
+            self.active += 1
+            try:
+                synthesis_priority.set(_Priority(int(req.get("priority", 1))))
+                audio = await self.engine.synthesize_sentence_f32(
+                    req["text"], voice=req["voice"], speed=float(req.get("speed", 1.0))
+                )
+                await reply({"id": req["id"], "ok": True}, np.asarray(audio, dtype="<f4").tobytes())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Synthesis failed: %s", e)
+                with contextlib.suppress(Exception):
+                    await reply({"id": req["id"], "ok": False, "error": str(e)})
+            finally:
+                self.active -= 1
+                tasks.pop(req["id"], None)
+
+        try:
+            while True:
+                req, _ = await read_message(reader)
+                op = req.get("op")
+                if op == "synth":
+                    tasks[req["id"]] = asyncio.create_task(synth(req))
+                elif op == "cancel":
+                    task = tasks.pop(req.get("id"), None)
+                    if task is not None:
+                        task.cancel()
+                elif op == "hello":
+                    await reply({"id": req.get("id"), "ok": True, **self._hello()})
+                elif op == "health":
+                    await reply({"id": req.get("id"), "ok": True, **self._health()})
+                else:
+                    await reply({"id": req.get("id"), "ok": False, "error": f"unknown op {op!r}"})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.warning("Closing worker connection: %s", e)
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            writer.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Serve a TTSEngine to frontends (TTS_WORKERS).")
+    parser.add_argument("--listen", default=os.getenv("TTS_WORKER_LISTEN", "tcp://0.0.0.0:9100"))
+    args = parser.parse_args()
+
+    from tts import TTSEngine
+
+    asyncio.run(WorkerServer(TTSEngine()).serve(args.listen))
+
+
+if __name__ == "__main__":
+    main()
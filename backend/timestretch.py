@@ -0,0 +1,56 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def time_stretch(
+    audio: np.ndarray,
+    rate: float,
+    sample_rate: int = 24000,
+    *,
+    frame_ms: float = 25.0,
+    search_ms: float = 8.0,
+) -> np.ndarray:
+    """Change the tempo of mono float32 `audio` by `rate` without changing pitch.
+
+    WSOLA (waveform-similarity overlap-add): Hann frames are overlap-added at
+    half-frame hops in the output while the read position advances `rate`
+    times as fast in the input. Each frame is taken from within `search_ms`
+    of its nominal position, at the offset whose waveform best matches the
+    natural continuation of the previous frame, which keeps pitch periods
+    aligned and avoids the phasiness of a plain overlap-add. The candidate
+    search for a frame is one matrix-vector product over a strided view.
+
+    `rate` > 1 speeds speech up (shorter output); the result has
+    round(len(audio) / rate) samples.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if abs(rate - 1.0) < 1e-3 or audio.size == 0:
+        return audio
+    out_len = int(round(audio.size / rate))
+
+    n = max(64, int(sample_rate * frame_ms / 1000.0)) & ~1
+    hop = n // 2
+    tol = max(1, int(sample_rate * search_ms / 1000.0))
+    if audio.size < 2 * n:
+        # Too short for overlapping frames (a lone interjection): resample.
+        return np.interp(np.linspace(0, audio.size - 1, out_len), np.arange(audio.size), audio).astype(np.float32)
+
+    window = np.hanning(n + 1)[:-1].astype(np.float32)  # Periodic Hann: sums to 1 at hop n/2.
+    n_frames = int(np.ceil(out_len / hop)) + 1
+
+    # Pad so every candidate frame and continuation stays in bounds.
+    pad_end = int(n_frames * hop * rate) + n + 2 * tol + hop
+    x = np.concatenate([np.zeros(tol, dtype=np.float32), audio, np.zeros(max(0, pad_end - audio.size), dtype=np.float32)])
+    frames = sliding_window_view(x, n)
+
+    out = np.zeros(n_frames * hop + n, dtype=np.float32)
+    prev = tol  # Padded-input position of the previous frame.
+    out[:n] += x[prev : prev + n] * window
+    for k in range(1, n_frames):
+        nominal = tol + int(round(k * hop * rate))
+        target = x[prev + hop : prev + hop + n]  # Where the last frame would have continued.
+        lo = nominal - tol
+        scores = frames[lo : lo + 2 * tol + 1] @ target
+        prev = lo + int(np.argmax(scores))
+        out[k * hop : k * hop + n] += x[prev : prev + n] * window
+    return out[:out_len]
@@ -1,29 +1,218 @@
 import os
 import re
 import numpy as np
-import onnxruntime as ort
-from kokoro_onnx import Kokoro
 import asyncio
 import json
 import inspect
 import logging
+import platform
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
-from typing import AsyncIterator, Iterable, List, Optional
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, List, Optional
 import contextlib
 from pathlib import Path
 import zipfile
 
+from phonemes import PhonemeCache
+from priority import PriorityGate, synthesis_priority
+from session_recycler import SessionRecycler
+from timestretch import time_stretch
+from voice_store import VoiceStore, voice_metadata
+
+if TYPE_CHECKING:
+    from kokoro_onnx import Kokoro
+
 logger = logging.getLogger(__name__)
 
+# Process-wide CPU arena shared by all sessions that opt into env allocators.
+_shared_allocator_lock = threading.Lock()
+_shared_allocator_registered: Optional[bool] = None
+
+
+def _register_shared_cpu_allocator(ort) -> bool:
+    """Register one arena allocator on the ORT environment (once per process)."""
+    global _shared_allocator_registered
+    with _shared_allocator_lock:
+        if _shared_allocator_registered is None:
+            try:
+                mem_info = ort.OrtMemoryInfo(
+                    "Cpu", ort.OrtAllocatorType.ORT_ARENA_ALLOCATOR, 0, ort.OrtMemType.DEFAULT
+                )
+                ort.create_and_register_allocator(mem_info, None)
+                _shared_allocator_registered = True
+            except Exception as e:
+                logger.warning("Shared ORT allocator unavailable: %s", e)
+                _shared_allocator_registered = False
+        return _shared_allocator_registered
+
+
+# Model variants produced offline by quantize_model.py. They live next to the
+# fp32 model as <stem>.<variant>.onnx, e.g. models/kokoro-v1.0.int8.onnx.
+MODEL_VARIANTS = ("fp32", "int8", "fp16")
+
+
+def model_variant_path(model_path: str, variant: str) -> str:
+    """Return the on-disk path of `variant` for the fp32 model at `model_path`."""
+    if variant == "fp32":
+        return model_path
+    p = Path(model_path)
+    return str(p.with_name(f"{p.stem}.{variant}{p.suffix}"))
+
+
+# Host-specific ORT threading config written by autotune_ort.py.
+ORT_TUNING_FILE = "models/ort_tuning.json"
+
+
+def load_ort_tuning(path: Optional[str] = None) -> dict:
+    """Load the autotuned ORT settings, or {} if absent or made for another host.
+
+    The path comes from `path`, TTS_ORT_TUNING_FILE, or models/ort_tuning.json
+    (relative to this module). A file recorded on a machine with a different
+    CPU count is ignored, since thread counts do not carry over.
+    """
+    p = Path(path or os.getenv("TTS_ORT_TUNING_FILE") or ORT_TUNING_FILE)
+    if not p.is_absolute():
+        p = Path(__file__).resolve().parent / p
+    if not p.exists():
+        return {}
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable ORT tuning file %s: %s", p, e)
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    host_cpus = (data.get("host") or {}).get("cpu_count")
+    if host_cpus and host_cpus != os.cpu_count():
+        logger.warning(
+            "Ignoring ORT tuning file %s: tuned for %s CPUs, this host has %s (re-run autotune_ort.py)",
+            p,
+            host_cpus,
+            os.cpu_count(),
+        )
+        return {}
+    return data.get("config") or {}
+
+
+# Stages of the sentence-chunk pipeline, in order: text normalization and
+# phonemization, ONNX inference, then fades/silence/PCM conversion.
+PIPELINE_STAGES = ("text", "onnx", "post")
+
+
+class _StageClock:
+    """Time one pipeline stage spent working vs. waiting on its neighbours."""
+
+    def __init__(self):
+        self.items = 0
+        self.busy_s = 0.0
+        self.wait_in_s = 0.0
+        self.wait_out_s = 0.0
+
+    def add(self, *, busy: float, wait_in: float = 0.0, wait_out: float = 0.0) -> None:
+        self.items += 1
+        self.busy_s += busy
+        self.wait_in_s += wait_in
+        self.wait_out_s += wait_out
+
+    def merge(self, other: "_StageClock") -> None:
+        self.items += other.items
+        self.busy_s += other.busy_s
+        self.wait_in_s += other.wait_in_s
+        self.wait_out_s += other.wait_out_s
+
+    def as_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "busy_ms": round(self.busy_s * 1000, 1),
+            "wait_in_ms": round(self.wait_in_s * 1000, 1),
+            "wait_out_ms": round(self.wait_out_s * 1000, 1),
+        }
+
+
+class _AudioCache:
+    """Byte-bounded LRU of synthesized sentence audio (float32)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._items: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        if self.max_bytes <= 0:
+            return None
+        with self._lock:
+            audio = self._items.get(key)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def put(self, key: tuple, audio: np.ndarray) -> None:
+        if self.max_bytes <= 0 or audio.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = audio
+            self._bytes += audio.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._items),
+            "mb": round(self._bytes / 1e6, 1),
+            "max_mb": round(self.max_bytes / 1e6, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
 class TTSEngine:
     def __init__(
         self,
         model_path: str = "models/kokoro-v1.0.onnx",
         voices_path: str = "models/voices-v1.0.bin",
+        model_variant: Optional[str] = None,
     ):
         # Resolve relative paths against this backend module directory, not the
         # process working directory (important for serverless/ASGI hosts).
         base_dir = Path(__file__).resolve().parent
+
+        # Optional reduced-precision model (TTS_MODEL_VARIANT=int8|fp16), see
+        # quantize_model.py. Falls back to fp32 if the variant was not built.
+        variant = (model_variant or os.getenv("TTS_MODEL_VARIANT", "fp32") or "fp32").strip().lower()
+        if variant not in MODEL_VARIANTS:
+            raise ValueError(f"Unknown model variant {variant!r}; expected one of {', '.join(MODEL_VARIANTS)}")
+        if variant != "fp32":
+            variant_path = model_variant_path(model_path, variant)
+            vpath = Path(variant_path)
+            if not vpath.is_absolute() and (base_dir / vpath).exists():
+                vpath = base_dir / vpath
+            if vpath.exists():
+                model_path = str(vpath)
+            else:
+                logger.warning(
+                    "Model variant %s not found at %s (run quantize_model.py --variant %s); using fp32",
+                    variant,
+                    variant_path,
+                    variant,
+                )
+                variant = "fp32"
+        self.model_variant = variant
+
         mp = Path(model_path)
         if not mp.is_absolute():
             candidate = (base_dir / mp).resolve()
@@ -46,29 +235,43 @@ class TTSEngine:
         # We also keep backward-compatible support for voices.json/voices.npz.
         self._ensure_voices_file()
 
-        self.sample_rate = 24000  # Kokoro default
-        self._voices_cache: Optional[List[str]] = None
+        # Speed handling. "model" passes speed to Kokoro, so every speed is a
+        # separate synthesis. "stretch" synthesizes at 1.0 and time-stretches
+        # each sentence (see timestretch.py), so audio cached at the canonical
+        # speed is reused when a listener changes speed mid-chapter.
+        speed_mode = (os.getenv("TTS_SPEED_MODE", "model") or "model").strip().lower()
+        speed_mode = speed_mode if speed_mode in {"model", "stretch"} else "model"
+        cache_mb = float(os.getenv("TTS_AUDIO_CACHE_MB", "64" if speed_mode == "stretch" else "0") or "0")
+        self._init_pipeline_state(24000, speed_mode, int(cache_mb * 1024 * 1024))  # Kokoro default rate
+
+        # Memory-mapped copy of the voice pack, shared by all sessions and
+        # worker processes and installed as each Kokoro instance's voices
+        # mapping (TTS_VOICE_STORE=0 keeps Kokoro's own loader).
+        if os.getenv("TTS_VOICE_STORE", "1") == "1":
+            try:
+                self.voice_store = VoiceStore.open(self.voices_path)
+            except Exception as e:
+                logger.warning("Voice store unavailable, using %s directly: %s", self.voices_path, e)
 
         # CPU-only mode for maximum compatibility.
         self.providers = ["CPUExecutionProvider"]
 
+        # onnxruntime and kokoro_onnx are heavy imports (hundreds of ms plus
+        # native library loading); defer them until an engine is actually built
+        # so importing this module stays cheap for scrape-only code paths.
+        import onnxruntime as ort
+        from kokoro_onnx import Kokoro
+
+        self._kokoro_cls = Kokoro
+        self._ort = ort
+
         # ONNX Runtime performance tuning (CPU).
         # Keep defaults conservative; allow override via env for deployments.
-        sess_options = None
-        try:
-            sess_options = ort.SessionOptions()
-            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-            # Thread counts: 0 means ORT will choose (often = physical cores).
-            intra = int(os.getenv("ORT_INTRA_OP_THREADS", "0") or "0")
-            inter = int(os.getenv("ORT_INTER_OP_THREADS", "1") or "1")
-            if intra >= 0:
-                sess_options.intra_op_num_threads = intra
-            if inter >= 0:
-                sess_options.inter_op_num_threads = inter
-            sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
-            sess_options.add_session_config_entry("session.intra_op.allow_spinning", os.getenv("ORT_ALLOW_SPINNING", "1"))
-        except Exception:
-            sess_options = None
+        # Values measured by autotune_ort.py are used when the env is unset.
+        self.ort_tuning = load_ort_tuning()
+        if self.ort_tuning:
+            logger.info("Using autotuned ORT settings: %s", self.ort_tuning)
+        sess_options = self._build_session_options()
 
         # kokoro_onnx API varies by version; try passing providers if supported.
         self._kokoro_sig = inspect.signature(Kokoro)
@@ -82,64 +285,287 @@ class TTSEngine:
                     self._kokoro_kwargs[k] = sess_options
                     break
 
-        self.kokoro = self._create_kokoro_instance()
-
-        # Periodic session recycling: after this many sentences the ONNX
-        # session is recreated to avoid accumulated internal state that
-        # can introduce subtle audio artifacts (crackling / static).
-        self._session_recycle_interval = int(
-            os.getenv("TTS_SESSION_RECYCLE_SENTENCES", "20")
+        # Shared weights: build sessions ourselves from an offline-optimized
+        # copy of the model whose initializers live in an external, memory-mapped
+        # data file (see _prepare_shared_model). Requires Kokoro.from_session.
+        self._shared_weights = (
+            os.getenv("TTS_SHARED_WEIGHTS", "1") == "1" and hasattr(Kokoro, "from_session")
         )
-        self._sentences_since_recycle = 0
-        # Future holding a pre-created Kokoro instance for seamless swap.
-        self._pending_kokoro: Optional[asyncio.Future] = None
+        self._session_model_path = self.model_path
+        self._shared_sess_options = None
+        if self._shared_weights:
+            try:
+                self._session_model_path = self._prepare_shared_model()
+                self._shared_sess_options = self._build_session_options(preoptimized=True)
+                if self._shared_sess_options is None:
+                    raise RuntimeError("could not build ORT session options")
+            except Exception as e:
+                logger.warning("Shared-weights model unavailable, loading %s directly: %s", self.model_path, e)
+                self._shared_weights = False
+                self._session_model_path = self.model_path
 
         # Dedicated thread-pool for ONNX inference so synthesis doesn't
-        # compete with asyncio I/O tasks on the default executor.
-        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
-        # Separate thread-pool for background session creation so it
-        # doesn't block ongoing synthesis in _executor.
-        self._recycle_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-recycle")
+        # compete with asyncio I/O tasks on the default executor. More than one
+        # thread lets concurrent streams share the session (ORT runs are
+        # thread-safe); autotune_ort.py measures whether that pays off.
+        self.inference_threads = max(1, int(self._ort_setting("TTS_INFERENCE_THREADS", "sessions", 1)))
+        self._executor = ThreadPoolExecutor(max_workers=self.inference_threads, thread_name_prefix="tts")
+        # Streams sharing the executor are admitted by `synthesis_priority`,
+        # so live playback overtakes background downloads between units.
+        self._infer_gate = PriorityGate(self.inference_threads)
+        # Moving average of inference seconds per second of audio produced
+        # (the real-time factor of one inference slot), for admission control.
+        self._rtf: Optional[float] = None
+        self._rtf_samples = 0
+
+        # Phonemize through a cached, lexicon-first layer and hand Kokoro the
+        # phonemes directly (TTS_PHONEME_CACHE=0 restores plain text input).
+        if os.getenv("TTS_PHONEME_CACHE", "1") == "1" and "is_phonemes" in inspect.signature(Kokoro.create).parameters:
+            self.phonemes = PhonemeCache.from_env(tag=self._phonemizer_tag())
+
+        # Periodic session recycling: every TTS_SESSION_RECYCLE_SENTENCES
+        # sentences the ONNX session is reset or replaced to avoid accumulated
+        # internal state that can introduce subtle audio artifacts (crackling /
+        # static). Replacements are built off the synthesis thread while idle
+        # or within a CPU budget; see SessionRecycler for the knobs.
+        self._recycler = SessionRecycler(
+            self._create_kokoro_instance,
+            warmup=self._warmup_kokoro if os.getenv("TTS_SESSION_WARMUP", "1") == "1" else None,
+        )
 
-    def _create_kokoro_instance(self) -> Kokoro:
-        """Create a fresh Kokoro instance (rebuilds the ONNX session)."""
-        if self._kokoro_kwargs:
-            return Kokoro(self.model_path, self.voices_path, **self._kokoro_kwargs)
-        return Kokoro(self.model_path, self.voices_path)
+    def _init_pipeline_state(self, sample_rate: int, speed_mode: str, audio_cache_bytes: int) -> None:
+        """State the sentence pipeline needs, with or without a local model.
 
-    def _maybe_recycle_session(self) -> None:
-        """Recreate the ONNX session if the sentence threshold is reached.
+        Called by every engine's __init__ (see worker_pool.RemoteTTSEngine).
+        """
+        self.sample_rate = sample_rate
+        self.speed_mode = speed_mode
+        self._audio_cache = _AudioCache(audio_cache_bytes)
+        self._voices_cache: Optional[List[str]] = None
+        self.voice_store: Optional[VoiceStore] = None
+        self.phonemes: Optional[PhonemeCache] = None
+        # Upper bound on one kokoro.create input, in estimated phonemes.
+        # Longer sentences (unpunctuated paragraphs, dash-joined dialogue) are
+        # split into several synthesis units, see split_synthesis_units.
+        self.max_unit_phonemes = max(40, int(os.getenv("TTS_MAX_UNIT_PHONEMES", "250") or "250"))
+        # Text stage (normalization + phonemization) gets its own thread so it
+        # overlaps with inference of the previous sentence. espeak is
+        # process-global and serialized anyway, so one thread is enough.
+        self._text_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-text")
+        self._pipeline_totals = {name: _StageClock() for name in PIPELINE_STAGES}
+
+    @property
+    def kokoro(self) -> "Kokoro":
+        return self._recycler.current
+
+    @kokoro.setter
+    def kokoro(self, value: "Kokoro") -> None:
+        self._recycler.current = value
+
+    def recycle_metrics(self) -> dict:
+        """Session recycle cost/frequency counters (for /health)."""
+        return self._recycler.metrics()
+
+    def phoneme_metrics(self) -> Optional[dict]:
+        """Phoneme cache hit counters (for /health), or None when disabled."""
+        return self.phonemes.metrics() if self.phonemes is not None else None
+
+    @staticmethod
+    def _phonemizer_tag() -> str:
+        from importlib import metadata
 
-        Uses async overlap: starts building the new session in a background
-        thread while current synthesis continues using the old session.
-        When the new session is ready, swaps it in atomically.
+        parts = []
+        for dist in ("kokoro-onnx", "phonemizer", "phonemizer-fork", "espeakng-loader"):
+            try:
+                parts.append(f"{dist}={metadata.version(dist)}")
+            except metadata.PackageNotFoundError:
+                pass
+        return ",".join(parts)
+
+    def pipeline_metrics(self) -> dict:
+        """Cumulative per-stage timings of the sentence-chunk pipeline (for /health).
+
+        The stage with the most busy time is the bottleneck; large wait_in on
+        the stages after it confirms they are starved by it.
         """
-        self._sentences_since_recycle += 1
-        if self._sentences_since_recycle >= self._session_recycle_interval:
-            if self._pending_kokoro is not None and self._pending_kokoro.done():
-                # New session is ready — swap it in.
-                try:
-                    new_kokoro = self._pending_kokoro.result()
-                    self.kokoro = new_kokoro
-                    logger.info("Swapped in pre-built ONNX session")
-                except Exception as e:
-                    logger.warning("Background session creation failed, rebuilding synchronously: %s", e)
-                    self.kokoro = self._create_kokoro_instance()
-                self._pending_kokoro = None
-                self._sentences_since_recycle = 0
-            elif self._pending_kokoro is None:
-                # Start building new session in background.
-                logger.info("Scheduling background ONNX session recycle after %d sentences", self._sentences_since_recycle)
-                loop = asyncio.get_event_loop()
-                self._pending_kokoro = loop.run_in_executor(
-                    self._recycle_executor, self._create_kokoro_instance
-                )
-                self._sentences_since_recycle = 0
-            # else: pending_kokoro is still building — keep using current session
+        out: dict = {name: clock.as_dict() for name, clock in self._pipeline_totals.items()}
+        busiest = max(self._pipeline_totals.items(), key=lambda kv: kv[1].busy_s)
+        out["bottleneck"] = busiest[0] if busiest[1].items else None
+        return out
+
+    def synthesis_rtf(self) -> tuple[Optional[float], int]:
+        """(Moving-average real-time factor of one inference, samples seen)."""
+        return self._rtf, self._rtf_samples
+
+    def audio_cache_metrics(self) -> dict:
+        """Sentence audio cache counters (for /health)."""
+        return {"speed_mode": self.speed_mode, **self._audio_cache.metrics()}
+
+    def _synthesis_speed(self, speed: float) -> float:
+        """Speed passed to Kokoro: the requested one, or 1.0 in stretch mode."""
+        return 1.0 if self.speed_mode == "stretch" else speed
+
+    def _apply_speed(self, audio: np.ndarray, speed: float) -> np.ndarray:
+        """Time-stretch canonical-speed audio to `speed` (stretch mode only)."""
+        if self.speed_mode != "stretch" or abs(speed - 1.0) < 1e-3:
+            return audio
+        if not 0.5 <= speed <= 2.0:
+            raise ValueError(f"Speed should be between 0.5 and 2.0, got {speed}")
+        return time_stretch(audio, speed, self.sample_rate)
+
+    def _prepare_units(self, text: str) -> List[tuple[str, bool, int]]:
+        """Text stage: split `text` into synthesis units and phonemize them.
+
+        Returns [(kokoro_input, is_phonemes, pause_ms_after)].
+        """
+        units = self.split_synthesis_units(text)
+        if self.phonemes is None:
+            return [(u, False, pause_ms) for u, pause_ms in units]
+        tokenizer = self.kokoro.tokenizer
+        espeak = lambda t: tokenizer.phonemize(t, "en-us")  # noqa: E731
+        return [(self.phonemes.phonemize(u, espeak), True, pause_ms) for u, pause_ms in units]
+
+    @staticmethod
+    def _infer(kokoro: "Kokoro", inp: str, is_phonemes: bool, voice: str, speed: float):
+        if is_phonemes:
+            return kokoro.create(inp, voice, speed, is_phonemes=True)
+        return kokoro.create(inp, voice, speed)
+
+    def _warmup_kokoro(self, kokoro: "Kokoro") -> None:
+        """Run one short inference so a standby session's first real run is not cold."""
+        voices = self.list_voices()
+        if voices:
+            kokoro.create("Hello.", voices[0], 1.0)
+
+    def _ort_setting(self, env_name: str, tuning_key: str, default):
+        """Resolve a threading setting: env var, then autotune file, then default."""
+        raw = os.getenv(env_name)
+        if raw:
+            return raw
+        value = self.ort_tuning.get(tuning_key)
+        return default if value is None else value
+
+    def _build_session_options(self, *, preoptimized: bool = False):
+        """Build ORT session options from the ORT_* environment variables.
+
+        With `preoptimized`, the options are meant for the cached optimized
+        model: graph optimizations are skipped (already applied offline), weight
+        prepacking is disabled so kernels read the memory-mapped initializers in
+        place instead of copying them, and sessions allocate from one shared,
+        process-wide CPU arena.
+        """
+        ort = self._ort
+        try:
+            sess_options = ort.SessionOptions()
+            sess_options.graph_optimization_level = (
+                ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                if preoptimized
+                else ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            )
+            # Thread counts: 0 means ORT will choose (often = physical cores).
+            intra = int(self._ort_setting("ORT_INTRA_OP_THREADS", "intra_op_threads", 0))
+            inter = int(self._ort_setting("ORT_INTER_OP_THREADS", "inter_op_threads", 1))
+            if intra >= 0:
+                sess_options.intra_op_num_threads = intra
+            if inter >= 0:
+                sess_options.inter_op_num_threads = inter
+            sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            spinning = str(int(self._ort_setting("ORT_ALLOW_SPINNING", "allow_spinning", 1)))
+            sess_options.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+            sess_options.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+            if preoptimized:
+                # The Python API has no PrepackedWeightsContainer, so prepacked
+                # copies could not be shared between sessions; by default skip
+                # prepacking and let every session use the mapped weights.
+                if os.getenv("ORT_DISABLE_PREPACKING", "1") == "1":
+                    sess_options.add_session_config_entry("session.disable_prepacking", "1")
+                if os.getenv("ORT_SHARED_ALLOCATOR", "1") == "1" and _register_shared_cpu_allocator(ort):
+                    sess_options.add_session_config_entry("session.use_env_allocators", "1")
+        except Exception:
+            sess_options = None
+        return sess_options
+
+    def _prepare_shared_model(self) -> str:
+        """Return the path of an optimized model copy with external initializers.
+
+        ORT memory-maps external initializer files, so every session in this
+        process (including recycled ones) and every worker process on the host
+        reads the same page-cache pages instead of holding a private copy of
+        the weights. Building a session from it skips the optimizer and the
+        weight copy, which makes recycling cheap.
+
+        The optimized graph may contain host-specific kernels (ORT_ENABLE_ALL
+        inserts NCHWc layouts), so it is cached per ORT version and machine
+        under `TTS_ORT_CACHE_DIR` (default: models/.ort_cache) and rebuilt when
+        the source model changes.
+        """
+        ort = self._ort
+        src = Path(self.model_path)
+        cache_dir = Path(os.getenv("TTS_ORT_CACHE_DIR") or (src.parent / ".ort_cache"))
+        tag = f"{src.stem}.ort{ort.__version__}.{platform.machine() or 'unknown'}"
+        model_name = f"{tag}.onnx"
+        data_name = f"{tag}.onnx.data"
+        opt_path = cache_dir / model_name
+        data_path = cache_dir / data_name
+        if (
+            opt_path.exists()
+            and data_path.exists()
+            and opt_path.stat().st_mtime >= src.stat().st_mtime
+        ):
+            return str(opt_path)
+
+        logger.info("Building shared-weights model cache at %s", opt_path)
+        t0 = time.perf_counter()
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Build into a private directory first: the model references its data
+        # file by name, and concurrent workers must never see a half-written pair.
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".build-", dir=str(cache_dir)))
+        try:
+            so = self._build_session_options()
+            if so is None:
+                raise RuntimeError("could not build ORT session options")
+            so.optimized_model_filepath = str(tmp_dir / model_name)
+            so.add_session_config_entry("session.optimized_model_external_initializers_file_name", data_name)
+            so.add_session_config_entry("session.optimized_model_external_initializers_min_size_in_bytes", "1024")
+            ort.InferenceSession(str(src), so, providers=self.providers)
+            # Data first, so a reader that sees the new model also sees its weights.
+            os.replace(tmp_dir / data_name, data_path)
+            os.replace(tmp_dir / model_name, opt_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        logger.info("Shared-weights model cache built in %.1fs", time.perf_counter() - t0)
+        return str(opt_path)
+
+    def _create_kokoro_instance(self) -> "Kokoro":
+        """Create a fresh Kokoro instance (rebuilds the ONNX session)."""
+        t0 = time.perf_counter()
+        if self._shared_weights:
+            session = self._ort.InferenceSession(
+                self._session_model_path, self._shared_sess_options, providers=self.providers
+            )
+            kokoro = self._kokoro_cls.from_session(session, self.voices_path)
+        elif self._kokoro_kwargs:
+            kokoro = self._kokoro_cls(self.model_path, self.voices_path, **self._kokoro_kwargs)
+        else:
+            kokoro = self._kokoro_cls(self.model_path, self.voices_path)
+        if self.voice_store is not None:
+            bundle, kokoro.voices = getattr(kokoro, "voices", None), self.voice_store
+            close = getattr(bundle, "close", None)
+            if callable(close):
+                close()
+        logger.info(
+            "Built ONNX session in %.0f ms (shared_weights=%s)",
+            (time.perf_counter() - t0) * 1000,
+            self._shared_weights,
+        )
+        return kokoro
 
     def list_voices(self) -> List[str]:
         if self._voices_cache is not None:
             return self._voices_cache
+        if self.voice_store is not None:
+            self._voices_cache = sorted(self.voice_store)
+            return self._voices_cache
 
         p = Path(self.voices_path)
         voices: List[str] = []
@@ -171,6 +597,12 @@ class TTSEngine:
         self._voices_cache = voices
         return voices
 
+    def voice_index(self) -> List[dict]:
+        """Voice ids with language and gender (from the id prefix)."""
+        if self.voice_store is not None:
+            return self.voice_store.voice_index()
+        return [voice_metadata(v) for v in self.list_voices()]
+
     def _ensure_voices_file(self) -> None:
         p = Path(self.voices_path)
         if p.exists() and p.suffix in {".bin", ".npz", ".npy", ".json"}:
@@ -260,6 +692,10 @@ class TTSEngine:
                 out.append((p_idx, s_idx, s, s_idx == (len(sentences) - 1)))
         return out
 
+    # Identifies the output of split_paragraphs_with_offsets in persisted
+    # segment tables (chapter_store.py); bump when sentence splitting changes.
+    SEGMENTER_TAG = "seg1"
+
     def split_paragraphs_with_offsets(self, paragraphs: List[str]) -> List[tuple[int, int, str, bool, int, int]]:
         """Flatten paragraphs into (p_idx, s_idx, sentence, is_last, char_start, char_end)."""
         out: List[tuple[int, int, str, bool, int, int]] = []
@@ -285,6 +721,112 @@ class TTSEngine:
                 out.append((p_idx, s_idx, s, s_idx == (len(parts) - 1), cs, ce))
         return out
 
+    # Clause boundaries: , ; : followed by whitespace (so "1,000" stays whole),
+    # spaced hyphens/dashes, and unspaced em/en dashes ("word—word").
+    _CLAUSE_BOUNDARY = re.compile(r"[,;:](?=\s)|\s[-–—]+\s|[–—]+")
+
+    def split_clauses_with_offsets(
+        self, text: str, start: int = 0, *, min_chars: int = 12
+    ) -> List[tuple[str, int, int]]:
+        """Split a sentence into clause pieces and return (piece, char_start, char_end).
+
+        Pieces end after a comma/semicolon/colon or dash, so punctuation stays
+        with the clause it closes. Offsets are `start` plus the position in
+        `text`, i.e. paragraph-relative when `start` is the sentence's
+        char_start. Pieces shorter than `min_chars` are merged into a neighbour
+        to avoid synthesizing tiny fragments.
+        """
+        spans: List[tuple[int, int]] = []
+        pos = 0
+        for m in self._CLAUSE_BOUNDARY.finditer(text):
+            if m.end() > pos:
+                spans.append((pos, m.end()))
+                pos = m.end()
+        if pos < len(text):
+            spans.append((pos, len(text)))
+
+        # Trim whitespace inside each span.
+        trimmed: List[tuple[int, int]] = []
+        for a, b in spans:
+            while a < b and text[a].isspace():
+                a += 1
+            while b > a and text[b - 1].isspace():
+                b -= 1
+            if b > a:
+                trimmed.append((a, b))
+
+        merged: List[tuple[int, int]] = []
+        for a, b in trimmed:
+            if merged and (merged[-1][1] - merged[-1][0] < min_chars or b - a < min_chars):
+                merged[-1] = (merged[-1][0], b)
+            else:
+                merged.append((a, b))
+        # A short trailing piece was merged above; a short leading piece may
+        # remain if it was the only one so far.
+        if len(merged) > 1 and merged[0][1] - merged[0][0] < min_chars:
+            merged[1] = (merged[0][0], merged[1][1])
+            merged.pop(0)
+
+        if not merged:
+            return [(text, start, start + len(text))] if text else []
+        return [(text[a:b], start + a, start + b) for a, b in merged]
+
+    # Split points for over-long synthesis units, strongest prosodic boundary
+    # first, with the silence (ms) inserted where the audio is rejoined. Each
+    # pattern's match end is the cut position.
+    _UNIT_BOUNDARIES = (
+        (re.compile(r"[.?!…]+[\"'”’)\]]*(?=\s)"), 160),
+        (re.compile(r"[;:](?=\s)|\s[-–—]+(?=\s)|[–—]+"), 110),
+        (re.compile(r",(?=\s)"), 80),
+        (re.compile(r"(?=\s(?:and|but|or|so|because|while|when|which|who|then)\b)", re.IGNORECASE), 30),
+        (re.compile(r"(?=\s)"), 15),
+    )
+
+    @staticmethod
+    def estimate_phonemes(text: str) -> int:
+        """Rough espeak phoneme count: about one per character, more for digits
+        (numbers are spoken as words)."""
+        return len(text) + 3 * sum(c.isdigit() for c in text)
+
+    def split_synthesis_units(self, text: str, max_phonemes: Optional[int] = None) -> List[tuple[str, int]]:
+        """Split `text` into units of at most `max_phonemes` (estimated).
+
+        Returns [(unit_text, pause_ms_after)]. Each split happens at the
+        strongest boundary class present (sentence punctuation, then ; : and
+        dashes, then commas, then before a conjunction, then any space),
+        choosing the candidate that balances the two halves best, and recurses
+        until every unit fits. The last unit's pause is 0.
+        """
+        limit = max_phonemes or self.max_unit_phonemes
+        text = text.strip()
+        if not text:
+            return []
+        if self.estimate_phonemes(text) <= limit:
+            return [(text, 0)]
+
+        mid = self.estimate_phonemes(text) / 2.0
+        for pattern, pause_ms in self._UNIT_BOUNDARIES:
+            best: Optional[int] = None
+            best_dist = 0.0
+            for m in pattern.finditer(text):
+                cut = m.end()
+                if cut <= 0 or cut >= len(text) or not text[:cut].strip() or not text[cut:].strip():
+                    continue
+                dist = abs(self.estimate_phonemes(text[:cut]) - mid)
+                if best is None or dist < best_dist:
+                    best, best_dist = cut, dist
+            if best is not None:
+                break
+        else:
+            # No usable boundary at all (one giant token): hard cut.
+            best, pause_ms = max(1, len(text) // 2), 0
+
+        left = self.split_synthesis_units(text[:best], limit)
+        right = self.split_synthesis_units(text[best:], limit)
+        if left:
+            left[-1] = (left[-1][0], pause_ms)
+        return left + right
+
     def _iter_pcm_frames(self, pcm16: bytes, frame_bytes: int) -> Iterable[bytes]:
         if frame_bytes <= 0:
             yield pcm16
@@ -320,15 +862,91 @@ class TTSEngine:
         """Single float32 -> int16 conversion. Called once at the end of the pipeline."""
         return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
 
-    async def synthesize_sentence_f32(self, sentence: str, voice: str, speed: float) -> np.ndarray:
-        """Synthesize a sentence and return float32 audio (no quantization yet)."""
+    async def _synthesize_unit_f32(self, inp: str, is_phonemes: bool, voice: str, speed: float) -> np.ndarray:
         loop = asyncio.get_running_loop()
-        audio, _ = await loop.run_in_executor(
-            self._executor, self.kokoro.create, sentence, voice, speed
-        )
-        self._maybe_recycle_session()
+        owner = synthesis_priority.get()
+        await self._infer_gate.acquire(int(getattr(owner, "priority", 1)))
+        try:
+            kokoro = self._recycler.acquire()
+            try:
+                t0 = time.perf_counter()
+                audio, _ = await loop.run_in_executor(
+                    self._executor, self._infer, kokoro, inp, is_phonemes, voice, speed
+                )
+                self._observe_rtf(time.perf_counter() - t0, len(audio))
+            finally:
+                self._recycler.release()
+        finally:
+            self._infer_gate.release()
         return np.asarray(audio, dtype=np.float32)
 
+    def _observe_rtf(self, elapsed_s: float, samples: int) -> None:
+        if samples <= 0:
+            return
+        rtf = elapsed_s / (samples / float(self.sample_rate))
+        self._rtf = rtf if self._rtf is None else 0.9 * self._rtf + 0.1 * rtf
+        self._rtf_samples += 1
+
+    async def _infer_units_f32(
+        self,
+        units: List[tuple[str, bool, int]],
+        voice: str,
+        speed: float,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> np.ndarray:
+        """ONNX stage: synthesize prepared units and join them into one sentence."""
+        key = (voice, round(float(speed), 3), tuple((inp, pause_ms) for inp, _, pause_ms in units))
+        cached = self._audio_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if len(units) == 1:
+            inp, is_phonemes, _ = units[0]
+            audio = await self._synthesize_unit_f32(inp, is_phonemes, voice, speed)
+            self._audio_cache.put(key, audio)
+            return audio
+
+        parts: List[np.ndarray] = []
+        done = 0
+        for inp, is_phonemes, pause_ms in units:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            audio = await self._synthesize_unit_f32(inp, is_phonemes, voice, speed)
+            parts.append(self._apply_cosine_fade_f32(audio))
+            done += 1
+            if pause_ms > 0:
+                parts.append(np.zeros(int(self.sample_rate * (pause_ms / 1000.0)), dtype=np.float32))
+        if not parts:
+            return np.zeros(0, dtype=np.float32)
+        audio = np.concatenate(parts)
+        if done == len(units):
+            self._audio_cache.put(key, audio)  # Only complete sentences.
+        return audio
+
+    async def synthesize_sentence_f32(
+        self,
+        sentence: str,
+        voice: str,
+        speed: float,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> np.ndarray:
+        """Synthesize a sentence and return float32 audio (no quantization yet).
+
+        Sentences longer than `max_unit_phonemes` are synthesized as several
+        units (see split_synthesis_units) and rejoined with short fades and a
+        boundary-dependent pause, which bounds the latency and memory of each
+        inference call. If `cancel_event` is set between units, the audio
+        rendered so far is returned.
+        """
+        loop = asyncio.get_running_loop()
+        units = await loop.run_in_executor(self._text_executor, self._prepare_units, sentence)
+        if not units:
+            units = [(sentence, False, 0)]
+        audio = await self._infer_units_f32(units, voice, self._synthesis_speed(speed), cancel_event)
+        if self.speed_mode == "stretch":
+            audio = await loop.run_in_executor(None, self._apply_speed, audio, speed)
+        return audio
+
     async def synthesize_sentence_pcm16(self, sentence: str, voice: str, speed: float) -> bytes:
         """Backward-compatible: returns PCM16 bytes."""
         audio = await self.synthesize_sentence_f32(sentence, voice=voice, speed=speed)
@@ -358,6 +976,7 @@ class TTSEngine:
 
         frame_samples = int(self.sample_rate * (frame_ms / 1000.0))
         frame_bytes = frame_samples * 2  # int16 mono
+        errors: List[BaseException] = []
 
         async def producer() -> None:
             try:
@@ -368,6 +987,8 @@ class TTSEngine:
                         continue
                     pcm16 = await self.synthesize_sentence_pcm16(s, voice=voice, speed=speed)
                     await queue.put((s, pcm16))
+            except Exception as e:
+                errors.append(e)
             finally:
                 await queue.put(None)
 
@@ -376,6 +997,8 @@ class TTSEngine:
             while True:
                 item = await queue.get()
                 if item is None:
+                    if errors and not (cancel_event is not None and cancel_event.is_set()):
+                        raise errors[0]
                     break
                 sentence, pcm16 = item
                 for frame in self._iter_pcm_frames(pcm16, frame_bytes=frame_bytes):
@@ -480,22 +1103,70 @@ class TTSEngine:
         pause_question_ms: int = 260,
         pause_paragraph_extra_ms: int = 240,
         fade_ms: int = 6,
+        fast_start: bool = False,
+        fast_start_min_chars: int = 60,
+        clause_pause_ms: int = 90,
+        stats: Optional[dict] = None,
+        segments: Optional[List[tuple[int, int, str, bool, int, int]]] = None,
+        start: tuple[int, int] = (0, 0),
+        rendered: Optional[dict] = None,
+        rendered_limit: int = 32,
     ) -> AsyncIterator[tuple[int, int, str, bytes, int, int]]:
         """Yield sentence-atomic PCM chunks.
 
-        Returns (paragraph_index, sentence_index, sentence_text, pcm16_bytes).
+        Returns (paragraph_index, sentence_index, sentence_text, pcm16_bytes,
+        char_start, char_end).
 
         Each yielded `pcm16_bytes` contains the full sentence audio (smoothed by
         a short fade-in/out) *plus* a short silence pause appended.
 
         This is designed so that if buffering is needed, playback can only pause
         between sentences (at the end of the current chunk), not mid-sentence.
+
+        With `fast_start`, the first sentence (if at least
+        `fast_start_min_chars` long) is rendered clause by clause and each
+        clause is yielded as soon as it is ready, to cut time-to-first-audio.
+        Those chunks repeat the full sentence's text and char offsets; clause
+        joins get the usual fades plus `clause_pause_ms` of silence, and the
+        sentence pause follows the last clause.
+
+        Rendering runs as a pipeline of three stages connected by bounded
+        queues, each with its own worker: text (unit splitting and
+        phonemization, on the text thread), onnx (inference, on the inference
+        pool) and post (fades, pause, PCM16 conversion). While sentence N is in
+        inference, N+1 is being phonemized and N-1 post-processed. Per-stage
+        busy/wait times are added to pipeline_metrics() and, if `stats` is
+        given, written into it when the stream ends.
+
+        For seeking, pass the chapter's precomputed `segments` (from
+        split_paragraphs_with_offsets) and a `start` (paragraph, sentence):
+        sentences before it are skipped. `rendered` is a caller-owned dict of
+        (paragraph, sentence) -> pcm16 chunk; whole-sentence chunks are stored
+        in it (at most `rendered_limit`, oldest dropped) and reused instead of
+        being synthesized again, e.g. when seeking back to a sentence that was
+        already played.
+
+        An error in any stage ends the stream and is raised to the caller
+        (unless the stream was cancelled), so a partial chapter is never
+        mistaken for a complete one.
         """
 
-        segments = self.split_paragraphs_with_offsets(paragraphs)
-        queue: asyncio.Queue[Optional[tuple[int, int, str, bytes, int, int]]] = asyncio.Queue(
-            maxsize=max(1, prefetch_sentences)
-        )
+        if segments is None:
+            segments = self.split_paragraphs_with_offsets(paragraphs)
+        if start != (0, 0):
+            segments = [seg for seg in segments if (seg[0], seg[1]) >= tuple(start)]
+        depth = max(1, prefetch_sentences)
+        text_q: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        audio_q: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        queue: asyncio.Queue[Optional[tuple[int, int, str, bytes, int, int]]] = asyncio.Queue(maxsize=depth)
+        clocks = {name: _StageClock() for name in PIPELINE_STAGES}
+        loop = asyncio.get_running_loop()
+
+        def cancelled() -> bool:
+            return cancel_event is not None and cancel_event.is_set()
+
+        # First stage failure, re-raised once the stages have drained.
+        errors: List[BaseException] = []
 
         def pause_ms_for(sentence: str, is_last_in_paragraph: bool) -> int:
             s = sentence.rstrip()
@@ -510,45 +1181,131 @@ class TTSEngine:
                 base += pause_paragraph_extra_ms
             return max(0, int(base))
 
-        async def producer() -> None:
+        def jobs() -> Iterable[tuple[tuple[int, int, str, int, int, bool], str, int]]:
+            """(sentence meta, text to render, pause after) in playback order.
+
+            The meta's last field is False for clause chunks of a sentence.
+            """
+            first = fast_start
+            for p_idx, s_idx, s, is_last, cs, ce in segments:
+                if not s:
+                    continue
+                pause_ms = pause_ms_for(s, is_last)
+
+                clauses = None
+                if first and len(s) >= fast_start_min_chars:
+                    clauses = self.split_clauses_with_offsets(s)
+                first = False
+                if clauses and len(clauses) > 1:
+                    meta = (p_idx, s_idx, s, int(cs), int(ce), False)
+                    for i, (clause, _, _) in enumerate(clauses):
+                        last_clause = i == len(clauses) - 1
+                        yield meta, clause, pause_ms if last_clause else clause_pause_ms
+                    continue
+                yield (p_idx, s_idx, s, int(cs), int(ce), True), s, pause_ms
+
+        def post_process(audio_f32: np.ndarray, pause_ms: int) -> bytes:
+            # Stay in float32 for all processing; convert once at the end.
+            # Pauses are added after the stretch so they keep their length.
+            audio_f32 = self._apply_speed(audio_f32, speed)
+            if fade_ms and fade_ms > 0:
+                audio_f32 = self._apply_cosine_fade_f32(audio_f32, fade_ms=int(fade_ms))
+            if pause_ms > 0:
+                silence_samples = int(self.sample_rate * (pause_ms / 1000.0))
+                audio_f32 = np.concatenate([audio_f32, np.zeros(silence_samples, dtype=np.float32)])
+            return self._float32_to_pcm16_bytes(audio_f32)
+
+        async def text_stage() -> None:
+            clock = clocks["text"]
             try:
-                for p_idx, s_idx, s, is_last, cs, ce in segments:
-                    if cancel_event is not None and cancel_event.is_set():
+                for meta, text, pause_ms in jobs():
+                    if cancelled():
                         break
-                    if not s:
+                    ready = rendered.get(meta[:2]) if rendered is not None and meta[5] else None
+                    if ready is not None:
+                        await text_q.put((meta, None, pause_ms, ready))
                         continue
-                    # Stay in float32 for all processing; convert once at the end.
-                    audio_f32 = await self.synthesize_sentence_f32(s, voice=voice, speed=speed)
-                    if fade_ms and fade_ms > 0:
-                        audio_f32 = self._apply_cosine_fade_f32(audio_f32, fade_ms=int(fade_ms))
-                    pause_ms = pause_ms_for(s, is_last)
-
-                    # Append silence in float32 then convert the whole chunk once.
-                    if pause_ms > 0:
-                        silence_samples = int(self.sample_rate * (pause_ms / 1000.0))
-                        silence = np.zeros(silence_samples, dtype=np.float32)
-                        audio_f32 = np.concatenate([audio_f32, silence])
-
-                    pcm16 = self._float32_to_pcm16_bytes(audio_f32)
-                    await queue.put((p_idx, s_idx, s, pcm16, int(cs), int(ce)))
-            finally:
-                await queue.put(None)
-
-        producer_task = asyncio.create_task(producer())
+                    t0 = time.perf_counter()
+                    units = await loop.run_in_executor(self._text_executor, self._prepare_units, text)
+                    t1 = time.perf_counter()
+                    await text_q.put((meta, units or [(text, False, 0)], pause_ms, None))
+                    clock.add(busy=t1 - t0, wait_out=time.perf_counter() - t1)
+            except Exception as e:
+                logger.exception("Text stage failed")
+                errors.append(e)
+            await text_q.put(None)
+
+        async def onnx_stage() -> None:
+            clock = clocks["onnx"]
+            try:
+                while not cancelled():
+                    t0 = time.perf_counter()
+                    item = await text_q.get()
+                    if item is None:
+                        break
+                    t1 = time.perf_counter()
+                    meta, units, pause_ms, ready = item
+                    if ready is not None:
+                        await audio_q.put((meta, None, pause_ms, ready))
+                        continue
+                    audio = await self._infer_units_f32(units, voice, self._synthesis_speed(speed), cancel_event)
+                    t2 = time.perf_counter()
+                    await audio_q.put((meta, audio, pause_ms, None))
+                    clock.add(busy=t2 - t1, wait_in=t1 - t0, wait_out=time.perf_counter() - t2)
+            except Exception as e:
+                logger.exception("ONNX stage failed")
+                errors.append(e)
+            await audio_q.put(None)
+
+        async def post_stage() -> None:
+            clock = clocks["post"]
+            try:
+                while not cancelled():
+                    t0 = time.perf_counter()
+                    item = await audio_q.get()
+                    if item is None:
+                        break
+                    t1 = time.perf_counter()
+                    (p_idx, s_idx, s, cs, ce, whole), audio, pause_ms, ready = item
+                    if ready is not None:
+                        await queue.put((p_idx, s_idx, s, ready, cs, ce))
+                        continue
+                    pcm16 = await loop.run_in_executor(None, post_process, audio, pause_ms)
+                    t2 = time.perf_counter()
+                    if rendered is not None and whole and audio.size and not cancelled():
+                        rendered[(p_idx, s_idx)] = pcm16
+                        while len(rendered) > max(0, rendered_limit):
+                            rendered.pop(next(iter(rendered)))
+                    await queue.put((p_idx, s_idx, s, pcm16, cs, ce))
+                    clock.add(busy=t2 - t1, wait_in=t1 - t0, wait_out=time.perf_counter() - t2)
+            except Exception as e:
+                logger.exception("Post-processing stage failed")
+                errors.append(e)
+            await queue.put(None)
+
+        tasks = [asyncio.create_task(text_stage()), asyncio.create_task(onnx_stage()), asyncio.create_task(post_stage())]
         try:
             while True:
                 item = await queue.get()
                 if item is None:
+                    if errors and not cancelled():
+                        raise errors[0]
                     break
                 p_idx, s_idx, sentence, pcm16, cs, ce = item
-                if cancel_event is not None and cancel_event.is_set():
+                if cancelled():
                     return
 
                 yield (p_idx, s_idx, sentence, pcm16, cs, ce)
         finally:
-            producer_task.cancel()
-            with contextlib.suppress(BaseException):
-                await producer_task
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                with contextlib.suppress(BaseException):
+                    await task
+            for name, clock in clocks.items():
+                self._pipeline_totals[name].merge(clock)
+            if stats is not None:
+                stats.update({name: clock.as_dict() for name, clock in clocks.items()})
 
     @staticmethod
     def encode_pcm16_to_flac(pcm16_bytes: bytes, sample_rate: int = 24000) -> bytes:
@@ -0,0 +1,178 @@
+import contextlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+_ALIGN = 64
+
+# Kokoro voice ids start with a language letter and a gender letter, e.g.
+# "af_bella" is an American English female voice.
+VOICE_LANGUAGES = {
+    "a": "en-us",
+    "b": "en-gb",
+    "e": "es",
+    "f": "fr-fr",
+    "h": "hi",
+    "i": "it",
+    "j": "ja",
+    "p": "pt-br",
+    "z": "zh",
+}
+VOICE_GENDERS = {"f": "female", "m": "male"}
+
+
+def voice_metadata(name: str) -> dict:
+    """Language and gender implied by a Kokoro voice id's two-letter prefix."""
+    prefix = name.split("_", 1)[0]
+    return {
+        "id": name,
+        "language": VOICE_LANGUAGES.get(prefix[:1]),
+        "gender": VOICE_GENDERS.get(prefix[1:2]),
+    }
+
+
+def _read_bundle(path: Path) -> Dict[str, np.ndarray]:
+    """Load every voice array from a .bin/.npz bundle or a voices.json file."""
+    if path.suffix == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path} has no voice arrays")
+        return {str(k): np.asarray(v, dtype=np.float32) for k, v in data.items()}
+    # voices-v1.0.bin is a zip of <voice_id>.npy entries, same as an .npz.
+    with np.load(str(path)) as z:
+        return {name: np.asarray(z[name]) for name in z.files}
+
+
+class VoiceStore(Mapping):
+    """Read-only, memory-mapped voice pack.
+
+    The source bundle is converted once into a flat, uncompressed data file
+    plus a JSON index (name -> offset/shape/dtype and voice metadata). The
+    data file is mapped read-only, so every Kokoro session and every worker
+    process on the host shares the same page-cache pages; a voice's view is
+    only created, and its pages only touched, on first use.
+
+    Behaves like the mapping Kokoro keeps in `kokoro.voices`, so it can be
+    installed there directly.
+    """
+
+    def __init__(self, data_path: Path, index: dict):
+        self.data_path = data_path
+        self._entries: Dict[str, dict] = index["voices"]
+        self._mm: Optional[np.memmap] = None
+        self._views: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _source_stamp(source: Path) -> dict:
+        st = source.stat()
+        return {"path": str(source.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    @classmethod
+    def open(cls, source_path: str, cache_dir: Optional[str] = None) -> "VoiceStore":
+        """Open the converted store for `source_path`, converting it if missing or stale."""
+        source = Path(source_path)
+        base_dir = Path(__file__).resolve().parent
+        out_dir = Path(cache_dir or os.getenv("TTS_VOICE_CACHE_DIR") or "models/.voice_cache")
+        if not out_dir.is_absolute():
+            out_dir = base_dir / out_dir
+        data_path = out_dir / f"{source.stem}.voices.f32"
+        index_path = out_dir / f"{source.stem}.voices.json"
+
+        stamp = cls._source_stamp(source)
+        if index_path.exists() and data_path.exists():
+            try:
+                index = json.loads(index_path.read_text(encoding="utf-8"))
+                if index.get("version") == INDEX_VERSION and index.get("source") == stamp:
+                    return cls(data_path, index)
+            except Exception as e:
+                logger.warning("Ignoring unreadable voice index %s: %s", index_path, e)
+
+        index = cls.build(source, data_path, index_path, stamp)
+        return cls(data_path, index)
+
+    @staticmethod
+    def build(source: Path, data_path: Path, index_path: Path, stamp: dict) -> dict:
+        """Convert `source` into `data_path` + `index_path` (atomically)."""
+        voices = _read_bundle(source)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+
+        entries: Dict[str, dict] = {}
+        fd, tmp_data = tempfile.mkstemp(dir=str(data_path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                offset = 0
+                for name in sorted(voices):
+                    arr = np.ascontiguousarray(voices[name])
+                    pad = (-offset) % _ALIGN
+                    if pad:
+                        f.write(b"\0" * pad)
+                        offset += pad
+                    f.write(arr.tobytes())
+                    entries[name] = {
+                        "offset": offset,
+                        "shape": list(arr.shape),
+                        "dtype": arr.dtype.str,
+                        **voice_metadata(name),
+                    }
+                    offset += arr.nbytes
+            os.chmod(tmp_data, 0o644)
+            # The data file goes first: an index never points at missing data.
+            os.replace(tmp_data, data_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_data)
+            raise
+
+        index = {"version": INDEX_VERSION, "source": stamp, "voices": entries}
+        tmp_index = index_path.with_suffix(".json.tmp")
+        tmp_index.write_text(json.dumps(index, indent=1), encoding="utf-8")
+        os.replace(tmp_index, index_path)
+        logger.info("Converted %d voices from %s to %s", len(entries), source, data_path)
+        return index
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        view = self._views.get(name)
+        if view is not None:
+            return view
+        entry = self._entries[name]
+        if self._mm is None:
+            self._mm = np.memmap(self.data_path, dtype=np.uint8, mode="r")
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        start = int(entry["offset"])
+        view = self._mm[start : start + nbytes].view(dtype).reshape(shape)
+        self._views[name] = view
+        return view
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    def info(self, name: str) -> dict:
+        """Metadata for one voice, without touching its array."""
+        entry = self._entries[name]
+        return {"id": name, "language": entry.get("language"), "gender": entry.get("gender")}
+
+    def voice_index(self) -> List[dict]:
+        return [self.info(name) for name in sorted(self._entries)]
+
+    @property
+    def loaded(self) -> int:
+        """Number of voices mapped so far."""
+        return len(self._views)
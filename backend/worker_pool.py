@@ -0,0 +1,329 @@
+"""Split deployment: synthesis on a pool of remote workers (synth_worker.py).
+
+With TTS_WORKERS set (comma-separated synth_rpc addresses), server.py loads
+no model. Its engine is a RemoteTTSEngine, which keeps sentence splitting,
+the streaming pipeline and post-processing (fades, pauses, PCM16) in the
+frontend, and sends each sentence's synthesis to a worker.
+
+Each sentence goes to the healthy worker with the fewest in-flight requests
+per inference slot. Workers are health-checked every WORKER_HEALTH_S; a
+worker that drops its connection or misses a health check is taken out of
+rotation and its sentences are retried on other workers, so a chapter keeps
+playing when a worker fails mid-chapter. Failed workers are reconnected by
+the health loop.
+
+A sentence that gets no reply within its timeout (WORKER_TIMEOUT_S for live
+priorities, WORKER_BACKGROUND_TIMEOUT_S for downloads and background work,
+which may legitimately queue behind live work) is cancelled on that worker
+alone and retried on another; the worker stays in rotation.
+"""
+import asyncio
+import contextlib
+import itertools
+import logging
+import os
+from typing import Dict, List, NoReturn, Optional, Tuple
+
+import numpy as np
+
+from priority import synthesis_priority
+from synth_rpc import encode_message, open_connection, read_message
+from tts import TTSEngine
+
+logger = logging.getLogger(__name__)
+
+TTS_WORKERS = [a.strip() for a in (os.getenv("TTS_WORKERS", "") or "").split(",") if a.strip()]
+WORKER_HEALTH_S = float(os.getenv("WORKER_HEALTH_S", "2") or "2")
+# Longest a single sentence may take on a worker before it is retried elsewhere.
+WORKER_TIMEOUT_S = float(os.getenv("WORKER_TIMEOUT_S", "30") or "30")
+WORKER_BACKGROUND_TIMEOUT_S = float(os.getenv("WORKER_BACKGROUND_TIMEOUT_S", "300") or "300")
+# Priorities above this get WORKER_TIMEOUT_S (1 is the default for downloads).
+_BACKGROUND_PRIORITY = 1
+_CONNECT_TIMEOUT_S = 5.0
+
+
+class WorkerUnavailable(Exception):
+    pass
+
+
+class _Worker:
+    """One connection to a synthesis worker, multiplexing requests by id."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.healthy = False
+        self.active = 0  # In-flight requests from this frontend.
+        self.remote_active = 0  # In-flight requests on the worker (all frontends).
+        self.slots = 1
+        self.rtf: Optional[float] = None
+        self.rtf_samples = 0
+        self.info: dict = {}
+        self.served = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def load(self) -> float:
+        return max(self.active, self.remote_active) / max(1, self.slots)
+
+    async def connect(self, ids: "itertools.count") -> None:
+        reader, self._writer = await asyncio.wait_for(open_connection(self.address), _CONNECT_TIMEOUT_S)
+        self._reader_task = asyncio.create_task(self._read_loop(reader))
+        hello, _ = await self.request({"id": next(ids), "op": "hello"}, timeout=_CONNECT_TIMEOUT_S)
+        self.info = hello
+        self.slots = max(1, int(hello.get("slots") or 1))
+        self.healthy = True
+        self.last_error = None
+        logger.info("Synthesis worker %s connected (%d slots)", self.address, self.slots)
+
+    async def request(self, header: dict, payload: bytes = b"", *, timeout: float) -> Tuple[dict, bytes]:
+        if self._writer is None:
+            raise ConnectionError("not connected")
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[header["id"]] = fut
+        try:
+            async with self._write_lock:
+                self._writer.write(encode_message(header, payload))
+                await self._writer.drain()
+            return await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Stopped or too slow: let the worker drop the sentence too.
+            if header.get("op") == "synth" and self._writer is not None:
+                with contextlib.suppress(Exception):
+                    self._writer.write(encode_message({"id": header["id"], "op": "cancel"}))
+            raise
+        finally:
+            self._pending.pop(header["id"], None)
+
+    def mark_down(self, error: BaseException) -> None:
+        if self.healthy:
+            logger.warning("Synthesis worker %s down: %s", self.address, error)
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        self.close()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("worker connection closed"))
+        self._pending.clear()
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                header, payload = await read_message(reader)
+                fut = self._pending.get(header.get("id"))
+                if fut is not None and not fut.done():
+                    fut.set_result((header, payload))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.mark_down(e if not isinstance(e, asyncio.IncompleteReadError) else ConnectionError("connection lost"))
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        addresses: List[str],
+        *,
+        health_interval_s: float = WORKER_HEALTH_S,
+        timeout_s: float = WORKER_TIMEOUT_S,
+        background_timeout_s: float = WORKER_BACKGROUND_TIMEOUT_S,
+    ):
+        self.workers = [_Worker(a) for a in addresses]
+        self.health_interval_s = health_interval_s
+        self.timeout_s = timeout_s
+        self.background_timeout_s = background_timeout_s
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+        self._failovers = 0
+        self._timeouts = 0
+
+    async def start(self) -> None:
+        await asyncio.gather(*(self._connect(w) for w in self.workers))
+        self._task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for w in self.workers:
+            w.close()
+
+    async def synthesize(self, text: str, voice: str, speed: float, priority: int) -> np.ndarray:
+        """Float32 audio of one sentence, failing over to other workers."""
+        timeout = self.timeout_s if priority > _BACKGROUND_PRIORITY else self.background_timeout_s
+        tried = set()
+        timed_out = False
+        while True:
+            candidates = [w for w in self.workers if w.healthy and w not in tried]
+            if not candidates:
+                if timed_out:
+                    raise WorkerUnavailable(f"No synthesis worker replied within {timeout:g}s")
+                raise WorkerUnavailable("No synthesis worker available")
+            worker = min(candidates, key=lambda w: (w.load, w.active))
+            header = {"id": next(self._ids), "op": "synth", "text": text, "voice": voice, "speed": speed, "priority": priority}
+            worker.active += 1
+            try:
+                reply, payload = await worker.request(header, timeout=timeout)
+            except asyncio.TimeoutError:
+                # Slow is not down (health checks decide that): only this
+                # request was cancelled, the worker's other sentences go on.
+                tried.add(worker)
+                timed_out = True
+                self._timeouts += 1
+                continue
+            except (ConnectionError, OSError) as e:
+                worker.mark_down(e)
+                tried.add(worker)
+                self._failovers += 1
+                continue
+            finally:
+                worker.active -= 1
+            if not reply.get("ok"):
+                raise RuntimeError(reply.get("error") or "synthesis failed")
+            worker.served += 1
+            return np.frombuffer(payload, dtype="<f4")
+
+    # -- aggregate engine facts --------------------------------------------------
+
+    def _healthy(self) -> List[_Worker]:
+        return [w for w in self.workers if w.healthy]
+
+    def info(self, key: str, default=None):
+        for w in self.workers:
+            if key in w.info:
+                return w.info[key]
+        return default
+
+    def slots(self) -> int:
+        return sum(w.slots for w in self._healthy())
+
+    def rtf(self) -> Tuple[Optional[float], int]:
+        """Slot-weighted RTF of the healthy workers, and their sample count."""
+        measured = [w for w in self._healthy() if w.rtf is not None]
+        if not measured:
+            return None, 0
+        rtf = sum(w.rtf * w.slots for w in measured) / sum(w.slots for w in measured)
+        return rtf, sum(w.rtf_samples for w in measured)
+
+    def metrics(self) -> dict:
+        return {
+            "healthy": len(self._healthy()),
+            "failovers": self._failovers,
+            "timeouts": self._timeouts,
+            "workers": [
+                {
+                    "address": w.address,
+                    "healthy": w.healthy,
+                    "active": w.active,
+                    "remote_active": w.remote_active,
+                    "slots": w.slots,
+                    "rtf": round(w.rtf, 3) if w.rtf is not None else None,
+                    "served": w.served,
+                    "failures": w.failures,
+                    "last_error": w.last_error,
+                }
+                for w in self.workers
+            ],
+        }
+
+    # -- health --------------------------------------------------------------------
+
+    async def _connect(self, worker: _Worker) -> None:
+        try:
+            await worker.connect(self._ids)
+        except Exception as e:
+            if worker.failures == 0:
+                logger.warning("Synthesis worker %s unreachable: %s", worker.address, e)
+            worker.mark_down(e)
+
+    async def _check(self, worker: _Worker) -> None:
+        if not worker.healthy:
+            await self._connect(worker)
+            return
+        try:
+            reply, _ = await worker.request({"id": next(self._ids), "op": "health"}, timeout=self.health_interval_s * 2)
+        except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+            worker.mark_down(e if str(e) else TimeoutError("health check timed out"))
+            return
+        worker.remote_active = int(reply.get("active") or 0)
+        worker.slots = max(1, int(reply.get("slots") or worker.slots))
+        worker.rtf = reply.get("rtf")
+        worker.rtf_samples = int(reply.get("rtf_samples") or 0)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval_s)
+            await asyncio.gather(*(self._check(w) for w in self.workers))
+
+
+class RemoteTTSEngine(TTSEngine):
+    """TTSEngine whose inference runs on a WorkerPool.
+
+    No model is loaded: sentence splitting and the streaming pipeline are
+    inherited, the text stage passes sentences through unchanged and the
+    onnx stage sends them to the pool. Workers apply their own unit
+    splitting, phonemization and speed handling.
+    """
+
+    def __init__(self, pool: WorkerPool):
+        # Deliberately skips TTSEngine.__init__, which loads the model.
+        self.pool = pool
+        self.model_variant = f"remote:{pool.info('model_variant', 'fp32')}"
+        self._init_pipeline_state(int(pool.info("sample_rate", 24000)), "model", 0)
+
+    @property
+    def inference_threads(self) -> int:
+        return max(1, self.pool.slots())
+
+    @property
+    def kokoro(self) -> NoReturn:
+        raise RuntimeError("No local Kokoro session: synthesis runs on TTS_WORKERS")
+
+    @kokoro.setter
+    def kokoro(self, value: object) -> NoReturn:
+        raise RuntimeError("No local Kokoro session: synthesis runs on TTS_WORKERS")
+
+    async def _synthesize_unit_f32(self, inp: str, is_phonemes: bool, voice: str, speed: float) -> NoReturn:
+        raise RuntimeError("No local inference: synthesis runs on TTS_WORKERS")
+
+    def list_voices(self) -> List[str]:
+        return list(self.pool.info("voices", []))
+
+    def voice_index(self) -> List[dict]:
+        return list(self.pool.info("voice_index", []))
+
+    def synthesis_rtf(self) -> Tuple[Optional[float], int]:
+        return self.pool.rtf()
+
+    def recycle_metrics(self) -> dict:
+        return {"mode": "remote"}
+
+    def phoneme_metrics(self) -> Optional[dict]:
+        return None
+
+    def _prepare_units(self, text: str) -> List[tuple[str, bool, int]]:
+        return [(text, False, 0)]
+
+    async def _infer_units_f32(
+        self,
+        units: List[tuple[str, bool, int]],
+        voice: str,
+        speed: float,
+        cancel_event: Optional[asyncio.Event] = None,
+    ) -> np.ndarray:
+        priority = int(getattr(synthesis_priority.get(), "priority", 1))
+        return await self.pool.synthesize(" ".join(inp for inp, _, _ in units), voice, speed, priority)
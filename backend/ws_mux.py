@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import weakref
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Commands that steer a running stream instead of starting one.
+CONTROL_COMMANDS = {"pause", "resume", "stop", "seek", "credit", "priority"}
+
+# A message is ("json", dict) or ("bytes", bytes); a group is sent back to back.
+Message = Tuple[str, Any]
+
+
+class MuxStream:
+    """One command's output on a shared WebSocket connection.
+
+    `id` is the client's stream_id (None for the legacy one-command-at-a-time
+    protocol), added to every JSON event. Control commands for the stream are
+    queued on `controls`; `stop` also sets `cancel_event` right away.
+    """
+
+    def __init__(self, conn: "MuxConnection", stream_id: Optional[int], priority: int = 1):
+        self.conn = conn
+        self.id = stream_id
+        self.priority = max(1, int(priority))
+        self.cancel_event = asyncio.Event()
+        self.controls: asyncio.Queue[dict] = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        self.command: Optional[str] = None
+        # Named byte/size counters of what the running command holds, read
+        # only by the /debug accounting (e.g. buffered download audio).
+        self.gauges: Dict[str, Callable[[], int]] = {}
+
+    def control(self, message: dict) -> None:
+        cmd = message.get("command")
+        if cmd == "stop":
+            self.cancel_event.set()
+        elif cmd == "priority":
+            try:
+                self.priority = max(1, int(message.get("priority", self.priority)))
+            except (TypeError, ValueError):
+                pass
+        self.controls.put_nowait(message)
+
+    def reset(self) -> None:
+        """Clear cancellation and stale controls before reusing the stream."""
+        self.cancel_event.clear()
+        self.gauges.clear()
+        while not self.controls.empty():
+            self.controls.get_nowait()
+
+    def accounting(self) -> dict:
+        out = {
+            "stream_id": self.id,
+            "command": self.command,
+            "priority": self.priority,
+            "running": self.task is not None and not self.task.done(),
+            "controls_queued": self.controls.qsize(),
+        }
+        for name, gauge in list(self.gauges.items()):
+            try:
+                out[name] = int(gauge())
+            except Exception:
+                out[name] = None
+        return out
+
+    def event(self, payload: dict) -> dict:
+        if self.id is not None:
+            payload = {**payload, "stream_id": self.id}
+        return payload
+
+    async def send_json(self, payload: dict) -> None:
+        await self.conn.send(self, [("json", self.event(payload))])
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self.conn.send(self, [("bytes", data)])
+
+    async def send_group(self, messages: List[Message]) -> None:
+        """Send messages without another stream's output in between."""
+        await self.conn.send(self, [(kind, self.event(m) if kind == "json" else m) for kind, m in messages])
+
+
+class MuxConnection:
+    """Serializes the output of several streams onto one WebSocket.
+
+    Streams hand message groups to `send`, which returns once the group was
+    written. A single writer task picks the next group by weighted fair
+    queueing: each stream's virtual time advances by bytes sent divided by its
+    priority, and the backlogged stream with the smallest virtual time goes
+    next. A stream that stops sending (paused, out of credit) simply drops out
+    of the rotation, and because `send` blocks, a low-priority stream's
+    producer is slowed down instead of buffering without bound.
+    """
+
+    def __init__(self, websocket: Any):
+        self.ws = websocket
+        self._queues: Dict[MuxStream, Deque[Tuple[List[Message], asyncio.Future]]] = {}
+        self._vtime: Dict[MuxStream, float] = {}
+        self._now = 0.0
+        self._wake = asyncio.Event()
+        self._closed: Optional[BaseException] = None
+        self._streams: "weakref.WeakSet[MuxStream]" = weakref.WeakSet()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def open_stream(self, stream_id: Optional[int], priority: int = 1) -> MuxStream:
+        stream = MuxStream(self, stream_id, priority)
+        self._streams.add(stream)
+        return stream
+
+    def release(self, stream: MuxStream) -> None:
+        """Forget a finished stream's scheduling state."""
+        if stream not in self._queues:
+            self._vtime.pop(stream, None)
+
+    def accounting(self) -> dict:
+        """Output still queued for the socket and what each stream holds."""
+        queued = [messages for queue in self._queues.values() for messages, _ in queue]
+        return {
+            "queued_messages": sum(len(m) for m in queued),
+            "queued_bytes": sum(len(m) for messages in queued for kind, m in messages if kind == "bytes"),
+            "scheduled_streams": len(self._vtime),
+            "streams": [s.accounting() for s in list(self._streams)],
+        }
+
+    async def send(self, stream: MuxStream, messages: List[Message]) -> None:
+        if self._closed is not None:
+            raise self._closed
+        fut = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(stream)
+        if queue is None:
+            queue = self._queues[stream] = deque()
+            # A stream returning from idle starts at the current virtual time
+            # rather than claiming the bandwidth it did not use.
+            self._vtime[stream] = max(self._vtime.get(stream, 0.0), self._now)
+        queue.append((messages, fut))
+        self._wake.set()
+        await fut
+
+    def _next(self) -> Optional[Tuple[MuxStream, List[Message], asyncio.Future]]:
+        if not self._queues:
+            return None
+        stream = min(self._queues, key=lambda s: self._vtime[s])
+        queue = self._queues[stream]
+        messages, fut = queue.popleft()
+        if not queue:
+            del self._queues[stream]
+        cost = sum(len(m) if kind == "bytes" else 256 for kind, m in messages)
+        self._now = self._vtime[stream]
+        self._vtime[stream] += cost / stream.priority
+        return stream, messages, fut
+
+    async def _write_loop(self) -> None:
+        while True:
+            item = self._next()
+            if item is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            _, messages, fut = item
+            if fut.cancelled():
+                continue
+            try:
+                for kind, m in messages:
+                    if kind == "json":
+                        await self.ws.send_json(m)
+                    else:
+                        await self.ws.send_bytes(m)
+            except Exception as e:
+                self._fail(e)
+                if not fut.done():
+                    fut.set_exception(e)
+                return
+            if not fut.done():
+                fut.set_result(None)
+
+    def _fail(self, exc: BaseException) -> None:
+        self._closed = exc
+        for queue in self._queues.values():
+            for _, fut in queue:
+                if not fut.done():
+                    fut.set_exception(exc)
+        self._queues.clear()
+
+    async def close(self) -> None:
+        self._fail(ConnectionError("connection closed"))
+        self._writer.cancel()
+        try:
+            await self._writer
+        except (asyncio.CancelledError, Exception):
+            pass